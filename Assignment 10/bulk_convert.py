@@ -0,0 +1,486 @@
+"""
+Bulk conversion of the persons and activities between the repository backends (the values of the 'repository'
+setting). The source is read in chunks, the chunks are decoded and re-encoded for the target by a pool of worker
+processes (a bounded number of chunks is in flight at once, so the memory use does not grow with the size of the
+data) and the encoded chunks are written, in order, in batches: one write per chunk for the text and JSON files,
+one executemany per chunk (in a single transaction) for the database. The pickle and compact binary files hold
+a whole repository, so they are written once, at the end. The target files are replaced (the target tables are
+emptied); a journaled (or compact binary) target gets a fresh snapshot and no journal. The records can be written
+sorted (e.g. the activities by their start): they are then sorted by an external merge sort, which spills sorted
+runs to temporary files, so also the tables which do not fit in memory can be exported sorted. Run it from the
+'Assignment 10' directory:
+
+    python bulk_convert.py <source repository> <target repository> [--source-dir data] [--target-dir data]
+                           [--workers N] [--chunk-size N] [--sort-persons-by KEY] [--sort-activities-by KEY]
+                           [--descending] [--run-size N] [--temp-dir DIRECTORY]
+
+e.g. 'python bulk_convert.py textfiles database --target-dir converted' or
+'python bulk_convert.py database textfiles --target-dir export --sort-activities-by start'. The progress and the
+throughput (records/s) are reported on stderr.
+"""
+import argparse
+import os
+import pickle
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from compact_binary_repository.compact_binary_format import ActivityRecords, PersonRecords, write_compact_file
+from compact_binary_repository.compact_binary_repository import CompactBinaryActivityRepository, \
+    CompactBinaryPersonRepository
+from domain.activity import Activity
+from domain.person import Person
+from json_repository.json_journal_repository import JsonJournalActivityRepository, JsonJournalPersonRepository
+from json_repository.json_stream import encode_json_element, iter_json_array
+from pickle_repository.pickle_journal_repository import PickleJournalRepository
+from repository.repository_exceptions import RepositoryException
+from sql_repository import schema
+from sql_repository.lazy_sql_activity_repository import LazySqlActivityRepository
+from sql_repository.lazy_sql_person_repository import LazySqlPersonRepository
+from sql_repository.sql_activity_repository import SqlActivityRepository
+from text_file_repository import text_bulk_loader
+from text_file_repository.text_file_activity_repo import TextFileActivityRepository
+from text_file_repository.text_file_journal_repo import TextFileJournalActivityRepository, \
+    TextFileJournalPersonRepository
+from text_file_repository.text_file_person_repo import TextFilePersonRepository
+from utils.algorithms.external_merge_sort import RUN_SIZE, external_sort
+
+PERSONS = 'persons'
+ACTIVITIES = 'activities'
+
+# The files of every repository type: (persons file, activities file)
+FILES = {
+    'textfiles': ('persons.txt', 'activities.txt'),
+    'binaryfiles': ('persons.pickle', 'activities.pickle'),
+    'jsonfiles': ('persons.json', 'activities.json'),
+    'textjournal': ('persons.txt', 'activities.txt'),
+    'binaryjournal': ('persons.pickle', 'activities.pickle'),
+    'jsonjournal': ('persons.json', 'activities.json'),
+    'compactbinary': ('persons.cbr', 'activities.cbr'),
+    'database': ('sql_data.db', 'sql_data.db'),
+    'database_lazy': ('sql_data.db', 'sql_data.db'),
+}
+
+# The encoding of the chunks read from (and written to) every repository type: 'text' (lines of the text files),
+# 'json' (the dumped objects of the JSON files), 'sql' (rows) or 'entities' (Person and Activity objects)
+ENCODINGS = {
+    'textfiles': 'text', 'textjournal': 'text',
+    'jsonfiles': 'json', 'jsonjournal': 'json',
+    'binaryfiles': 'entities', 'binaryjournal': 'entities', 'compactbinary': 'entities',
+    'database': 'sql', 'database_lazy': 'sql',
+}
+
+CHUNK_SIZE = 10000
+
+# The keys the records can be sorted by, for every kind
+SORT_KEYS = {
+    PERSONS: {
+        'id': lambda person: person.id,
+        'name': lambda person: person.name,
+        'phone_number': lambda person: person.phone_number,
+    },
+    ACTIVITIES: {
+        'id': lambda activity: activity.id,
+        'start': lambda activity: activity.start_date_time,
+        'end': lambda activity: activity.end_date_time,
+        'description': lambda activity: activity.description,
+    },
+}
+
+
+# ------------------------------------------- #
+# ----------- DECODING AND ENCODING --------- #
+# ------------------------------------------- #
+
+def decode_chunk(kind, encoding, chunk):
+    """
+    Turns a chunk read from a source into a list of entities
+    """
+    if encoding == 'text':
+        if kind == PERSONS:
+            parse, fallback = text_bulk_loader.person_from_line, TextFilePersonRepository.person_from_line
+        else:
+            parse, fallback = text_bulk_loader.activity_from_line, TextFileActivityRepository.activity_from_line
+        entities = []
+        for line in chunk:
+            try:
+                entities.append(parse(line))
+            except (ValueError, IndexError):
+                entities.append(fallback(line))
+        return entities
+    if encoding == 'json':
+        entity_class = Person if kind == PERSONS else Activity
+        return [entity_class.json_load(dumped_entity) for dumped_entity in chunk]
+    return chunk
+
+
+def encode_chunk(kind, encoding, entities):
+    """
+    Turns a list of entities into a chunk for a target: the text of the lines, the list of the JSON texts of the
+    elements, the rows (for the activities, the pair (activity rows, activity_person rows)) or the entities
+    """
+    if encoding == 'text':
+        to_line = TextFilePersonRepository.person_to_line if kind == PERSONS else \
+            TextFileActivityRepository.activity_to_line
+        return ''.join(to_line(entity) + '\n' for entity in entities)
+    if encoding == 'json':
+        return [encode_json_element(entity.json_dump()) for entity in entities]
+    if encoding == 'sql':
+        if kind == PERSONS:
+            return [(person.id, person.name, person.phone_number) for person in entities]
+        to_sql_string = SqlActivityRepository.parse_datetime_to_sql_string
+        return ([(activity.id, to_sql_string(activity.start_date_time), to_sql_string(activity.end_date_time),
+                  activity.description) for activity in entities],
+                [(activity.id, person_id) for activity in entities for person_id in activity.persons_id])
+    return entities
+
+
+def convert_chunk(kind, source_encoding, target_encoding, chunk):
+    """
+    The work done by the worker processes: decodes a chunk of the source and encodes it for the target
+    :return: The pair (number of records, encoded chunk)
+    """
+    entities = decode_chunk(kind, source_encoding, chunk)
+    return len(entities), encode_chunk(kind, target_encoding, entities)
+
+
+# ------------------------------------------- #
+# ----------------- SOURCES ----------------- #
+# ------------------------------------------- #
+
+def iter_chunks(iterable, chunk_size):
+    chunk = []
+    for element in iterable:
+        chunk.append(element)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_journal_repository(repository):
+    # A journal has to be replayed over its snapshot, so the journaled repositories are loaded whole
+    try:
+        yield from repository.elements
+    finally:
+        repository.close()
+
+
+def iter_lazy_sql_repository(repository):
+    try:
+        yield from repository.elements
+    finally:
+        repository.connection.close()
+
+
+def iter_compact_binary_repository(repository):
+    # The records are decoded from the mapped file while iterating, merged with the changes of its journal
+    try:
+        yield from repository.elements
+    finally:
+        repository.close()
+
+
+def iter_json_file(file_name):
+    with open(file_name, 'r') as f:
+        yield from iter_json_array(f)
+
+
+def read_source(repo_type, file_name, kind):
+    """
+    Generates the elements of a source file, in the encoding source_encoding(repo_type) (the journaled
+    repositories are replayed, and the compact binary files and the databases are read through their lazy
+    repositories, so all of them give entities).
+    A database is opened read-only, so converting it never migrates it (an older schema version is read as it is).
+    """
+    if repo_type == 'textfiles':
+        return text_bulk_loader.iter_lines(file_name)
+    if repo_type == 'jsonfiles':
+        return iter_json_file(file_name)
+    if repo_type == 'binaryfiles':
+        with open(file_name, 'rb') as f:
+            try:
+                return iter(pickle.load(f))
+            except EOFError:
+                # raised if the file is empty
+                return iter([])
+    if repo_type == 'compactbinary':
+        repository_class = CompactBinaryPersonRepository if kind == PERSONS else CompactBinaryActivityRepository
+        return iter_compact_binary_repository(repository_class(file_name))
+    if repo_type in ('database', 'database_lazy'):
+        repository_class = LazySqlPersonRepository if kind == PERSONS else LazySqlActivityRepository
+        return iter_lazy_sql_repository(repository_class(file_name, read_only=True))
+    if repo_type == 'textjournal':
+        repository_class = TextFileJournalPersonRepository if kind == PERSONS else TextFileJournalActivityRepository
+    elif repo_type == 'jsonjournal':
+        repository_class = JsonJournalPersonRepository if kind == PERSONS else JsonJournalActivityRepository
+    else:
+        repository_class = PickleJournalRepository
+    return iter_journal_repository(repository_class(file_name))
+
+
+def source_encoding(repo_type):
+    return 'entities' if repo_type.endswith('journal') or ENCODINGS[repo_type] == 'sql' else ENCODINGS[repo_type]
+
+
+def read_sorted_source(repo_type, file_name, kind, sort_key, reverse=False, run_size=RUN_SIZE,
+                       temp_directory=None):
+    """
+    Generates the entities of a source file sorted by <sort_key>, through an external merge sort (at most
+    <run_size> entities are held in memory)
+    """
+    encoding = source_encoding(repo_type)
+    entities = (entity for chunk in iter_chunks(read_source(repo_type, file_name, kind), CHUNK_SIZE)
+                for entity in decode_chunk(kind, encoding, chunk))
+    return external_sort(entities, SORT_KEYS[kind][sort_key], reverse, run_size, directory=temp_directory)
+
+
+# ------------------------------------------- #
+# ----------------- TARGETS ----------------- #
+# ------------------------------------------- #
+
+class TextWriter:
+    def __init__(self, file_name):
+        self.__file = open(file_name, 'w')
+
+    def write(self, text):
+        self.__file.write(text)
+
+    def close(self):
+        self.__file.close()
+
+
+class JsonWriter:
+    """
+    Writes the JSON texts of the elements as one array, in the format of write_json_array
+    """
+
+    def __init__(self, file_name):
+        self.__file = open(file_name, 'w')
+        self.__separator = '[\n'
+
+    def write(self, encoded_elements):
+        for encoded_element in encoded_elements:
+            self.__file.write(self.__separator)
+            self.__file.write(encoded_element)
+            self.__separator = ',\n'
+
+    def close(self):
+        self.__file.write('[]' if self.__separator == '[\n' else '\n]')
+        self.__file.close()
+
+
+class SqlWriter:
+    """
+    Replaces the persons or the activities of a database, in a single transaction with one executemany per chunk
+    """
+
+    def __init__(self, file_name, kind):
+        self.__kind = kind
+        self.__connection = schema.connect(file_name)
+        self.__connection.execute("DELETE FROM persons;" if kind == PERSONS else "DELETE FROM activities;")
+        self.__connection.execute("DELETE FROM activity_person;")
+
+    def write(self, rows):
+        if self.__kind == PERSONS:
+            self.__connection.executemany("INSERT INTO persons (ID, Name, PhoneNumber) VALUES (?, ?, ?);", rows)
+        else:
+            activity_rows, participant_rows = rows
+            self.__connection.executemany("INSERT INTO activities (ID, StartDateTime, EndDateTime, Description) "
+                                          "VALUES (?, ?, ?, ?);", activity_rows)
+            self.__connection.executemany("INSERT INTO activity_person (ID_Activity, ID_Person) VALUES (?, ?);",
+                                          participant_rows)
+
+    def close(self):
+        self.__connection.commit()
+        self.__connection.close()
+
+
+class WholeFileWriter:
+    """
+    Collects the entities and writes them at the end, for the formats which hold a whole repository (pickle and
+    compact binary)
+    """
+
+    def __init__(self, file_name, write_file):
+        self.__file_name = file_name
+        self.__write_file = write_file
+        self.__entities = []
+
+    def write(self, entities):
+        self.__entities.extend(entities)
+
+    def close(self):
+        self.__write_file(self.__file_name, self.__entities)
+
+
+def write_pickle_file(file_name, entities):
+    with open(file_name, 'wb') as f:
+        pickle.dump(entities, f)
+
+
+def open_target(repo_type, file_name, kind):
+    if (repo_type.endswith('journal') or repo_type == 'compactbinary') and os.path.exists(file_name + '.journal'):
+        # The snapshot is replaced, so the journal written over the old one does not apply anymore
+        os.remove(file_name + '.journal')
+    encoding = ENCODINGS[repo_type]
+    if encoding == 'text':
+        return TextWriter(file_name)
+    if encoding == 'json':
+        return JsonWriter(file_name)
+    if encoding == 'sql':
+        return SqlWriter(file_name, kind)
+    if repo_type == 'compactbinary':
+        records = PersonRecords if kind == PERSONS else ActivityRecords
+        return WholeFileWriter(file_name, lambda name, entities: write_compact_file(name, entities, records))
+    return WholeFileWriter(file_name, write_pickle_file)
+
+
+# ------------------------------------------- #
+# ---------------- CONVERSION --------------- #
+# ------------------------------------------- #
+
+def convert_file(kind, source_type, source_file, target_type, target_file, executor=None, max_pending=2,
+                 chunk_size=CHUNK_SIZE, report=None, sort_key=None, reverse=False, run_size=RUN_SIZE,
+                 temp_directory=None):
+    """
+    Converts one file (the persons or the activities)
+    :param executor: The ProcessPoolExecutor the chunks are converted by; None to convert them in this process
+    :param max_pending: The maximum number of chunks submitted to the executor and not written yet
+    :param report: Called with (kind, records, seconds) after every chunk; None for no reporting
+    :param sort_key: The name of the key (in SORT_KEYS) the records are written sorted by; None for the source order
+    :param reverse: True to write the records in descending order of the key
+    :param run_size: The number of records sorted in memory at once
+    :param temp_directory: The directory of the temporary files of the sort; None for the default one
+    :return: The number of records converted
+    """
+    if sort_key is None:
+        chunks = iter_chunks(read_source(source_type, source_file, kind), chunk_size)
+        convert = (kind, source_encoding(source_type), ENCODINGS[target_type])
+    else:
+        # The source is parsed (in this process) while it is sorted, so the sorted chunks hold entities
+        chunks = iter_chunks(read_sorted_source(source_type, source_file, kind, sort_key, reverse, run_size,
+                                                temp_directory), chunk_size)
+        convert = (kind, 'entities', ENCODINGS[target_type])
+    if convert[1] == convert[2] == 'entities':
+        # Nothing to parse or serialise, the workers would only copy the entities back and forth
+        executor = None
+    writer = open_target(target_type, target_file, kind)
+    start = time.perf_counter()
+    records = 0
+
+    def write(result):
+        nonlocal records
+        converted_records, encoded_chunk = result
+        writer.write(encoded_chunk)
+        records += converted_records
+        if report is not None:
+            report(kind, records, time.perf_counter() - start)
+
+    try:
+        if executor is None:
+            for chunk in chunks:
+                write(convert_chunk(*convert, chunk))
+        else:
+            # The results are written in the order of the chunks
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(convert_chunk, *convert, chunk))
+                if len(pending) >= max_pending:
+                    write(pending.popleft().result())
+            while pending:
+                write(pending.popleft().result())
+    finally:
+        writer.close()
+    return records
+
+
+def convert(source_type, target_type, source_directory, target_directory, workers=None, chunk_size=CHUNK_SIZE,
+            report=None, sort_by=None, reverse=False, run_size=RUN_SIZE, temp_directory=None):
+    """
+    Converts the persons and then the activities (so the links of the activities to the persons can be checked)
+    :param workers: The number of worker processes; None for one per CPU, 0 to convert in this process
+    :param sort_by: Dictionary kind -> the name of the key (in SORT_KEYS) the records of the kind are written
+                    sorted by; the kinds missing from it keep the source order. None to keep the source order
+    :param reverse: True to write the sorted records in descending order
+    :param run_size: The number of records sorted in memory at once
+    :param temp_directory: The directory of the temporary files of the sorts; None for the default one
+    :return: Dictionary kind -> number of records converted
+    """
+    for repo_type in (source_type, target_type):
+        if repo_type not in FILES:
+            raise ValueError("Unknown repository type: " + repo_type + ". The repository types are: " +
+                             ', '.join(FILES) + '.')
+    sort_by = sort_by or {}
+    for kind, sort_key in sort_by.items():
+        if sort_key not in SORT_KEYS[kind]:
+            raise ValueError("Unknown sort key of the " + kind + ": " + sort_key + ". The sort keys are: " +
+                             ', '.join(SORT_KEYS[kind]) + '.')
+    os.makedirs(target_directory, exist_ok=True)
+    executor = ProcessPoolExecutor(workers) if workers != 0 else None
+    # Two chunks per worker are in flight, so the workers do not wait for the writes
+    max_pending = 2 * (workers or os.cpu_count() or 1)
+    try:
+        converted = {}
+        for position, kind in enumerate((PERSONS, ACTIVITIES)):
+            source_file = os.path.join(source_directory, FILES[source_type][position])
+            target_file = os.path.join(target_directory, FILES[target_type][position])
+            converted[kind] = convert_file(kind, source_type, source_file, target_type, target_file, executor,
+                                           max_pending, chunk_size, report, sort_by.get(kind), reverse, run_size,
+                                           temp_directory)
+        return converted
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def print_progress(kind, records, seconds):
+    print("\r%s: %d records (%.0f records/s)" % (kind, records, records / seconds if seconds > 0 else 0),
+          end='', file=sys.stderr, flush=True)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Converts the persons and activities between repository types.")
+    parser.add_argument('source', choices=FILES, help="the repository type of the source")
+    parser.add_argument('target', choices=FILES, help="the repository type of the target")
+    parser.add_argument('--source-dir', default='data', help="the directory of the source files (default: data)")
+    parser.add_argument('--target-dir', default='data', help="the directory of the target files (default: data)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="the number of worker processes (default: one per CPU; 0: no worker processes)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help="the number of records per chunk (default: %d)" % CHUNK_SIZE)
+    parser.add_argument('--sort-persons-by', choices=SORT_KEYS[PERSONS],
+                        help="write the persons sorted by this key (default: in the order of the source)")
+    parser.add_argument('--sort-activities-by', choices=SORT_KEYS[ACTIVITIES],
+                        help="write the activities sorted by this key (default: in the order of the source)")
+    parser.add_argument('--descending', action='store_true', help="sort in descending order")
+    parser.add_argument('--run-size', type=int, default=RUN_SIZE,
+                        help="the number of records sorted in memory at once (default: %d)" % RUN_SIZE)
+    parser.add_argument('--temp-dir', help="the directory of the temporary files of the sorts (default: the "
+                                           "system's temporary directory)")
+    arguments = parser.parse_args(arguments)
+    if os.path.abspath(os.path.join(arguments.source_dir, FILES[arguments.source][0])) == \
+            os.path.abspath(os.path.join(arguments.target_dir, FILES[arguments.target][0])):
+        parser.error("the source and the target files are the same")
+
+    start = time.perf_counter()
+    sort_by = {kind: sort_key for kind, sort_key in
+               ((PERSONS, arguments.sort_persons_by), (ACTIVITIES, arguments.sort_activities_by))
+               if sort_key is not None}
+    try:
+        converted = convert(arguments.source, arguments.target, arguments.source_dir, arguments.target_dir,
+                            arguments.workers, arguments.chunk_size, print_progress, sort_by, arguments.descending,
+                            arguments.run_size, arguments.temp_dir)
+    except RepositoryException as error:
+        parser.error(str(error))
+    seconds = time.perf_counter() - start
+    records = sum(converted.values())
+    print("\rConverted %d persons and %d activities in %.2fs (%.0f records/s)" %
+          (converted[PERSONS], converted[ACTIVITIES], seconds, records / seconds if seconds > 0 else 0),
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+"""
+Layout of a compact binary file (all the integers are little-endian):
+    header            magic b'CBR1', kind (b'A' for activities, b'P' for persons), version, number of records,
+                      number of participants in the participant heap, size of the string heap
+    record table      one fixed-size record per entity, in ascending order of the IDs
+    participant heap  the person IDs of all the activities, as 8-byte integers
+    string heap       the UTF-8 encoded strings (descriptions, names, phone numbers)
+An activity record is (id, start, end, description offset, description length, participants offset, number of
+participants), with the datetimes as minutes since 1970-01-01; a person record is (id, name offset, name length,
+phone number offset, phone number length). The offsets are relative to the start of their heap.
+The record table is sorted by ID, so a memory-mapped file is randomly addressable: an entity is found by a binary
+search over the table and an ID range is read by a scan from its first record, decoding only the records read.
+The changes made since the file was written are kept in a journal of change records (see encode_change()), so a
+change only appends its own record instead of rewriting the file.
+"""
+import datetime
+import mmap
+import os
+import struct
+
+from domain.activity import Activity
+from domain.person import Person
+from repository.repository_exceptions import RepositoryException
+
+
+MAGIC = b'CBR1'
+VERSION = 1
+HEADER = struct.Struct('<4scBxQQQ')
+EPOCH = datetime.datetime(1970, 1, 1)
+MINUTE = datetime.timedelta(minutes=1)
+ID = struct.Struct('<q')
+
+# A change record is (operation, number of participants, size of the strings), followed by the record of the entity
+# and its own participant and string heaps (SET, for an added or updated entity) or by the ID of the entity (DELETE)
+SET = b'S'
+DELETE = b'D'
+CHANGE_HEADER = struct.Struct('<cII')
+
+
+def to_epoch_minutes(date_time):
+    return (date_time - EPOCH) // MINUTE
+
+
+def from_epoch_minutes(minutes):
+    return EPOCH + minutes * MINUTE
+
+
+class ActivityRecords:
+    """
+    Record layout of the activities
+    """
+    KIND = b'A'
+    RECORD = struct.Struct('<qqqIIII')
+
+    @staticmethod
+    def pack(activity, strings, participants):
+        """
+        Returns the record of <activity>, appending its description and persons to the heaps
+        """
+        description = activity.description.encode('utf-8')
+        record = ActivityRecords.RECORD.pack(activity.id, to_epoch_minutes(activity.start_date_time),
+                                             to_epoch_minutes(activity.end_date_time), len(strings),
+                                             len(description), len(participants), len(activity.persons_id))
+        strings += description
+        participants.extend(activity.persons_id)
+        return record
+
+    @staticmethod
+    def unpack(record, buffer, participants_start, strings_start):
+        activity_id, start, end, description_offset, description_length, participants_offset, participants_count = \
+            record
+        description_start = strings_start + description_offset
+        description = bytes(buffer[description_start:description_start + description_length]).decode('utf-8')
+        persons_id = list(struct.unpack_from(f'<{participants_count}q', buffer,
+                                             participants_start + 8 * participants_offset))
+        return Activity(activity_id, from_epoch_minutes(start), from_epoch_minutes(end), description, persons_id)
+
+
+class PersonRecords:
+    """
+    Record layout of the persons
+    """
+    KIND = b'P'
+    RECORD = struct.Struct('<qIIII')
+
+    @staticmethod
+    def pack(person, strings, participants):
+        name = person.name.encode('utf-8')
+        phone_number = person.phone_number.encode('utf-8')
+        record = PersonRecords.RECORD.pack(person.id, len(strings), len(name), len(strings) + len(name),
+                                           len(phone_number))
+        strings += name + phone_number
+        return record
+
+    @staticmethod
+    def unpack(record, buffer, participants_start, strings_start):
+        person_id, name_offset, name_length, phone_number_offset, phone_number_length = record
+        name_start = strings_start + name_offset
+        phone_number_start = strings_start + phone_number_offset
+        return Person(person_id, bytes(buffer[name_start:name_start + name_length]).decode('utf-8'),
+                      bytes(buffer[phone_number_start:phone_number_start + phone_number_length]).decode('utf-8'))
+
+
+def write_compact_file(file_name, entities, records):
+    """
+    Writes the entities in the compact binary format (to a temporary file which then replaces <file_name>, so the
+    file is never left half written)
+    :param entities: Iterable of entities
+    :param records: The record layout of the entities (ActivityRecords or PersonRecords)
+    """
+    table = bytearray()
+    strings = bytearray()
+    participants = []
+    count = 0
+    for entity in sorted(entities, key=lambda entity: entity.id):
+        table += records.pack(entity, strings, participants)
+        count += 1
+    temporary_name = file_name + '.tmp'
+    with open(temporary_name, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, records.KIND, VERSION, count, len(participants), len(strings)))
+        f.write(table)
+        f.write(struct.pack(f'<{len(participants)}q', *participants))
+        f.write(strings)
+    os.replace(temporary_name, file_name)
+
+
+def encode_change(operation, argument, records):
+    """
+    Returns the change record of setting the entity <argument> (SET) or of deleting the entity with ID <argument>
+    (DELETE), as bytes
+    """
+    if operation == DELETE:
+        return CHANGE_HEADER.pack(DELETE, 0, 0) + ID.pack(argument)
+    strings = bytearray()
+    participants = []
+    record = records.pack(argument, strings, participants)
+    return CHANGE_HEADER.pack(SET, len(participants), len(strings)) + record + \
+        struct.pack(f'<{len(participants)}q', *participants) + strings
+
+
+def read_change(f, records):
+    """
+    Reads the next change record from the file <f> (opened in binary mode)
+    :return: The pair (SET, entity) or (DELETE, entity ID); None at the end of the file
+    :raise ValueError: If the record is incomplete or not a change record
+    """
+    header = f.read(CHANGE_HEADER.size)
+    if not header:
+        return None
+    if len(header) < CHANGE_HEADER.size:
+        raise ValueError("Incomplete change record.")
+    operation, participants_count, strings_size = CHANGE_HEADER.unpack(header)
+    if operation == DELETE:
+        size = ID.size
+    elif operation == SET:
+        size = records.RECORD.size + 8 * participants_count + strings_size
+    else:
+        raise ValueError("Unknown change record.")
+    data = f.read(size)
+    if len(data) < size:
+        raise ValueError("Incomplete change record.")
+    if operation == DELETE:
+        return DELETE, ID.unpack(data)[0]
+    participants_start = records.RECORD.size
+    return SET, records.unpack(records.RECORD.unpack_from(data, 0), data, participants_start,
+                               participants_start + 8 * participants_count)
+
+
+class CompactBinaryFile:
+    """
+    Read-only, memory-mapped view of a compact binary file: a record is only decoded when it is accessed, and
+    find_by_id() is a binary search over the record table, so neither needs to read the whole file; scan() reads
+    an ID range.
+    An empty file is read as a file without records. Use it as a context manager (or call close()).
+    :param file_name: The path of the file; string
+    :param records: The record layout of the file (ActivityRecords or PersonRecords)
+    :raise RepositoryException: If the file is not a compact binary file of the expected kind
+    """
+
+    def __init__(self, file_name, records):
+        self.__records = records
+        self.__count = 0
+        self.__buffer = b''
+        # The mapping keeps its own handle of the file, so the file is not kept open
+        with open(file_name, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            self.__buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, kind, version, self.__count, participants_count, strings_size = \
+                HEADER.unpack_from(self.__buffer, 0)
+        except struct.error:
+            magic, kind, version = None, None, None
+        if (magic, kind, version) != (MAGIC, records.KIND, VERSION):
+            self.close()
+            raise RepositoryException(f"{file_name} is not a compact binary file of the expected kind.")
+        self.__participants_start = HEADER.size + self.__count * records.RECORD.size
+        self.__strings_start = self.__participants_start + 8 * participants_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        if isinstance(self.__buffer, mmap.mmap):
+            self.__buffer.close()
+
+    def __len__(self):
+        return self.__count
+
+    def __getitem__(self, position):
+        """
+        Decodes the record at position <position> of the record table
+        """
+        if not 0 <= position < self.__count:
+            raise IndexError("Record index out of range.")
+        record = self.__records.RECORD.unpack_from(self.__buffer, HEADER.size + position * self.__records.RECORD.size)
+        return self.__records.unpack(record, self.__buffer, self.__participants_start, self.__strings_start)
+
+    def __iter__(self):
+        return self.scan()
+
+    def __contains__(self, entity_id):
+        position = self.__lower_bound(entity_id)
+        return position < self.__count and self.__id_at(position) == entity_id
+
+    def __id_at(self, position):
+        return ID.unpack_from(self.__buffer, HEADER.size + position * self.__records.RECORD.size)[0]
+
+    def __lower_bound(self, entity_id):
+        # The position of the first record whose ID is not smaller than <entity_id>
+        low, high = 0, self.__count
+        while low < high:
+            middle = (low + high) // 2
+            if self.__id_at(middle) < entity_id:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find_by_id(self, entity_id):
+        """
+        Returns the entity with ID <entity_id>; None if there is none
+        """
+        position = self.__lower_bound(entity_id)
+        if position < self.__count and self.__id_at(position) == entity_id:
+            return self[position]
+        return None
+
+    def ids(self, first_id=None, last_id=None):
+        """
+        Generates the IDs in the range [first_id, last_id] (unbounded where None), in ascending order, without
+        decoding the records
+        """
+        position = 0 if first_id is None else self.__lower_bound(first_id)
+        while position < self.__count:
+            entity_id = self.__id_at(position)
+            if last_id is not None and entity_id > last_id:
+                return
+            yield entity_id
+            position += 1
+
+    def scan(self, first_id=None, last_id=None):
+        """
+        Generates the entities whose IDs are in the range [first_id, last_id] (unbounded where None), in ascending
+        order of their IDs
+        """
+        position = 0 if first_id is None else self.__lower_bound(first_id)
+        while position < self.__count and (last_id is None or self.__id_at(position) <= last_id):
+            yield self[position]
+            position += 1
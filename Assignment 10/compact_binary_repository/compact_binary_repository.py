@@ -0,0 +1,341 @@
+import heapq
+import os
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+from itertools import islice, takewhile
+
+from compact_binary_repository.compact_binary_format import DELETE, SET, ActivityRecords, CompactBinaryFile, \
+    PersonRecords, encode_change, read_change, write_compact_file
+from repository.indexed_repo import IndexedRepository
+from repository.repository_exceptions import AddException, DeleteException, RepositoryException
+
+# The journal is compacted into a fresh file once it has more records than this and than there are entities
+# (so the cost of the compactions is amortised over the changes)
+COMPACTION_MIN_RECORDS = 1000
+
+# Number of entities read at once while iterating over the repository
+BATCH_SIZE = 500
+
+# Marks an entity of the mapped file which was deleted since the file was written
+_DELETED = object()
+
+
+class CompactBinaryIdView:
+    """
+    Live, read-only view of the IDs of a compact binary repository; 'in' is a binary search over the mapped file
+    (unless the entity was changed since the file was written) and len() is kept by the repository
+    """
+
+    def __init__(self, repository):
+        self.__repository = repository
+
+    def __contains__(self, entity_id):
+        return self.__repository.contains_id(entity_id)
+
+    def __len__(self):
+        return len(self.__repository)
+
+    def __iter__(self):
+        return iter(self.__repository.get_all_ids())
+
+
+class CompactBinaryEntityView:
+    """
+    Read-only sequence of all the entities of a compact binary repository, decoded from the mapped file while
+    iterating, in batches (see CompactBinaryRepository.scan()), so the file is never loaded in memory at once;
+    indexing reads the entities up to the position (slicing copies the entities into a list, like slicing a list
+    does)
+    """
+
+    def __init__(self, repository):
+        self.__repository = repository
+
+    def __len__(self):
+        return len(self.__repository)
+
+    def __iter__(self):
+        return self.__repository.scan()
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return list(self)[position]
+        if position < 0:
+            position += len(self)
+        entity = next(islice(self, position, None), None) if position >= 0 else None
+        if entity is None:
+            raise IndexError("Repository index out of range.")
+        return entity
+
+
+class CompactBinaryRepository(IndexedRepository):
+    """
+    Repository persisted in the compact binary format (see compact_binary_format), which leaves its entities in the
+    memory-mapped file instead of copying them in memory: find_by_id() and the ID membership checks are binary
+    searches over the record table and scan() reads an ID range, decoding only the records it reads.
+    The changes are not written into the file: every add, update and delete appends one change record to a journal
+    next to it ('<file_name>.journal') and the changed entities are kept in memory, over the file, until the
+    journal grows past the size of the repository; then a fresh file is written (to a temporary file which then
+    replaces the old one) and the journal is emptied. At startup the journal is replayed over the file; a change
+    record only sets (or removes) the entity with its ID, so replaying a journal over a file which already
+    contains its changes gives the same content, and a record cut off by a crash at the end of the journal is
+    dropped.
+    Like the lazy SQL repositories, elements and get_all_ids() are in ascending order of the IDs (the order of the
+    record table), and find_by_id() returns no position. The declared indexes (see IndexedRepository) are kept in
+    memory.
+    :param file_name: The path of the file; string
+    :param records: The record layout of the entities (ActivityRecords or PersonRecords)
+    :param compaction_min_records: The minimum number of records of the journal before compacting it
+    :raise RepositoryException: If the file could not be opened or is not a compact binary file of the expected
+    kind
+    """
+
+    def __init__(self, file_name, records, compaction_min_records=COMPACTION_MIN_RECORDS):
+        super().__init__()
+        self.__file_name = file_name
+        self.__journal_name = file_name + '.journal'
+        self.__records = records
+        self.__compaction_min_records = compaction_min_records
+        self.__journal_records = 0
+        self.__transaction_depth = 0
+        # ID -> the entity as changed since the file was written (_DELETED if it was deleted), and their IDs in
+        # ascending order
+        self.__changes = {}
+        self.__changed_ids = []
+        try:
+            self.__file = CompactBinaryFile(file_name, records)
+            self.__count = len(self.__file)
+            self.__replay_journal()
+            self.__journal = open(self.__journal_name, 'ab')
+        except IOError as ioe:
+            # raised if the file could not be opened
+            raise RepositoryException("An error occurred - " + str(ioe))
+
+    @property
+    def journal_records(self):
+        """
+        The number of records in the journal (i.e. the changes made since the file was written)
+        """
+        return self.__journal_records
+
+    def __replay_journal(self):
+        if not os.path.exists(self.__journal_name):
+            return
+        valid_size = 0
+        with open(self.__journal_name, 'rb') as journal:
+            while True:
+                try:
+                    record = read_change(journal, self.__records)
+                except (ValueError, UnicodeDecodeError):
+                    # The last record was only partly written
+                    break
+                if record is None:
+                    break
+                operation, argument = record
+                if operation == DELETE:
+                    if self.contains_id(argument):
+                        self.__remove(argument)
+                else:
+                    self.__set(argument)
+                self.__journal_records += 1
+                valid_size = journal.tell()
+        if valid_size < os.path.getsize(self.__journal_name):
+            os.truncate(self.__journal_name, valid_size)
+
+    def __set(self, entity):
+        if not self.contains_id(entity.id):
+            self.__count += 1
+        if entity.id not in self.__changes:
+            insort(self.__changed_ids, entity.id)
+        self.__changes[entity.id] = entity
+
+    def __remove(self, entity_id):
+        self.__count -= 1
+        if entity_id in self.__file:
+            if entity_id not in self.__changes:
+                insort(self.__changed_ids, entity_id)
+            self.__changes[entity_id] = _DELETED
+        else:
+            del self.__changes[entity_id]
+            del self.__changed_ids[bisect_left(self.__changed_ids, entity_id)]
+
+    def __append(self, operation, argument):
+        self.__journal.write(encode_change(operation, argument, self.__records))
+        self.__journal_records += 1
+        if self.__transaction_depth == 0:
+            self.__end_of_change()
+
+    def __end_of_change(self):
+        self.__journal.flush()
+        if self.__journal_records > max(self.__compaction_min_records, self.__count):
+            self.compact()
+
+    def compact(self):
+        """
+        Writes a fresh file with all the entities of the repository and empties the journal
+        """
+        entities = list(self.scan())
+        # A mapped file cannot be replaced on every platform, so the mapping is closed first (the iterations over
+        # the repository are not affected, every batch of them searches the file again)
+        self.__file.close()
+        try:
+            write_compact_file(self.__file_name, entities, self.__records)
+        finally:
+            # Also if the file could not be written: the old one is then still in place, with the journal
+            self.__file = CompactBinaryFile(self.__file_name, self.__records)
+        self.__changes = {}
+        self.__changed_ids = []
+        self.__journal.close()
+        self.__journal = open(self.__journal_name, 'wb')
+        self.__journal_records = 0
+
+    def close(self):
+        """
+        Closes the journal and the mapped file; the repository cannot be used anymore afterwards
+        """
+        self.__journal.close()
+        self.__file.close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Groups a series of changes ('with repo.transaction():'): their records are flushed to the journal (and the
+        journal is compacted, if needed) once, at the end of the outermost block
+        """
+        self.__transaction_depth += 1
+        try:
+            yield self
+        finally:
+            self.__transaction_depth -= 1
+            if self.__transaction_depth == 0:
+                self.__end_of_change()
+
+    def __len__(self):
+        return self.__count
+
+    def contains_id(self, entity_id):
+        """
+        Checks if there is an entity with ID <entity_id> (binary search over the file, unless the entity changed)
+        """
+        entity = self.__changes.get(entity_id)
+        if entity is not None:
+            return entity is not _DELETED
+        return entity_id in self.__file
+
+    def get_all_ids(self):
+        """
+        Returns all the entity IDs, in ascending order
+        """
+        file_ids = (entity_id for entity_id in self.__file.ids() if entity_id not in self.__changes)
+        changed_ids = (entity_id for entity_id in self.__changed_ids if self.__changes[entity_id] is not _DELETED)
+        return list(heapq.merge(file_ids, changed_ids))
+
+    @property
+    def ids(self):
+        """
+        Live, read-only view of the entity IDs; supports 'in' and len()
+        """
+        return CompactBinaryIdView(self)
+
+    @property
+    def elements(self):
+        """
+        Read-only view of all the entities, in ascending order of their IDs, decoded while iterating
+        """
+        return CompactBinaryEntityView(self)
+
+    def scan(self, first_id=None, last_id=None):
+        """
+        Generates the entities whose IDs are in the range [first_id, last_id] (unbounded where None), in ascending
+        order of their IDs: a range scan over the mapped file, merged with the entities changed since it was
+        written. The entities are read BATCH_SIZE at a time and every batch starts with a new binary search, so the
+        repository can be changed (and compacted) while iterating.
+        """
+        while True:
+            batch = self.__read_batch(first_id, last_id)
+            yield from batch
+            if len(batch) < BATCH_SIZE:
+                return
+            first_id = batch[-1].id + 1
+
+    def __read_batch(self, first_id, last_id):
+        def in_range(entity_id):
+            return last_id is None or entity_id <= last_id
+
+        file_entities = (entity for entity in self.__file.scan(first_id, last_id) if entity.id not in self.__changes)
+        start = 0 if first_id is None else bisect_left(self.__changed_ids, first_id)
+        changed_entities = (self.__changes[entity_id]
+                            for entity_id in takewhile(in_range, islice(self.__changed_ids, start, None))
+                            if self.__changes[entity_id] is not _DELETED)
+        return list(islice(heapq.merge(file_entities, changed_entities, key=lambda entity: entity.id), BATCH_SIZE))
+
+    def search(self, attribute, text, normalise=None):
+        """
+        Returns the entities whose attribute <attribute> contains the string <text> (partial string matching)
+        :param attribute: The name of the searched attribute; string
+        :param text: The string to search for
+        :param normalise: Function applied on the attribute values before searching them; None for identity
+        :return: List with the matching entities, in ascending order of their IDs
+        """
+        normalise = (lambda value: value) if normalise is None else normalise
+        return [elem for elem in self.scan() if text in normalise(getattr(elem, attribute))]
+
+    def find_by_id(self, entity_id):
+        """
+        Finds an entity by ID, among the changed entities or else by a binary search over the mapped file
+        :param entity_id: The ID of the entity to be searched; integer
+        :return: The entity with ID <entity_id> and None (there is no position in memory to return) if it was
+        found in the repository; (None, None) otherwise
+        """
+        entity = self.__changes.get(entity_id)
+        if entity is None:
+            entity = self.__file.find_by_id(entity_id)
+        if entity is None or entity is _DELETED:
+            return None, None
+        return entity, None
+
+    def add_to_repo(self, entity):
+        """
+        Adds a new entity to the repository
+        :raise AddException: if the entity is already in the repository
+        """
+        if self.contains_id(entity.id):
+            raise AddException("The entity is already in the repository.")
+        self._check_unique(entity, AddException)
+        self.__set(entity)
+        self._index_add(entity)
+        self.__append(SET, entity)
+
+    def delete_by_id(self, entity_id):
+        """
+        Deletes an entity from the repository by ID
+        :raise DeleteException: If there is no entity with ID <entity_id> in the repository
+        """
+        entity, _ = self.find_by_id(entity_id)
+        if entity is None:
+            raise DeleteException("The entity is not in the repository.")
+        self.__remove(entity_id)
+        self._index_remove(entity)
+        self.__append(DELETE, entity_id)
+
+    def update(self, entity):
+        """
+        Updates an entity of the repository
+        :raise RepositoryException: If the entity does not exist in the repository
+        """
+        old_entity, _ = self.find_by_id(entity.id)
+        if old_entity is None:
+            raise RepositoryException("The entity to be updated doesn't exist.")
+        self._check_unique(entity, RepositoryException)
+        self.__set(entity)
+        self._index_replace(old_entity, entity)
+        self.__append(SET, entity)
+
+
+class CompactBinaryActivityRepository(CompactBinaryRepository):
+    def __init__(self, file_name, compaction_min_records=COMPACTION_MIN_RECORDS):
+        super().__init__(file_name, ActivityRecords, compaction_min_records)
+
+
+class CompactBinaryPersonRepository(CompactBinaryRepository):
+    def __init__(self, file_name, compaction_min_records=COMPACTION_MIN_RECORDS):
+        super().__init__(file_name, PersonRecords, compaction_min_records)
@@ -0,0 +1,56 @@
+import json
+
+from domain.activity import Activity
+from domain.person import Person
+from json_repository.json_stream import iter_json_array, write_json_array
+from repository.journal_repo import COMPACTION_MIN_RECORDS, DELETE, JournalRepository
+
+
+class JsonJournalRepository(JournalRepository):
+    """
+    Journaled repository in the JSON format: the snapshot has the format of the JSON repositories (a list of dumped
+    entities) and the journal has one compact JSON object per line: {"op": <operation>, "entity": <dumped entity>}
+    or {"op": "delete", "id": <entity ID>}
+    :param entity_class: The class of the entities (it provides json_load)
+    """
+
+    def __init__(self, file_name, entity_class, compaction_min_records=COMPACTION_MIN_RECORDS):
+        self.__entity_class = entity_class
+        super().__init__(file_name, compaction_min_records)
+
+    def _read_snapshot(self, file_name):
+        with open(file_name, 'r') as f:
+            for dumped_entity in iter_json_array(f):
+                yield self.__entity_class.json_load(dumped_entity)
+
+    def _write_snapshot(self, file_name, entities):
+        with open(file_name, 'w') as f:
+            write_json_array(f, (entity.json_dump() for entity in entities))
+
+    def _encode_record(self, operation, argument):
+        if operation == DELETE:
+            record = {'op': operation, 'id': argument}
+        else:
+            record = {'op': operation, 'entity': argument.json_dump()}
+        return (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+
+    def _read_record(self, journal):
+        line = journal.readline()
+        if not line:
+            return None
+        if not line.endswith(b'\n'):
+            raise ValueError("Incomplete journal record.")
+        record = json.loads(line)
+        if record['op'] == DELETE:
+            return DELETE, record['id']
+        return record['op'], self.__entity_class.json_load(record['entity'])
+
+
+class JsonJournalActivityRepository(JsonJournalRepository):
+    def __init__(self, file_name, compaction_min_records=COMPACTION_MIN_RECORDS):
+        super().__init__(file_name, Activity, compaction_min_records)
+
+
+class JsonJournalPersonRepository(JsonJournalRepository):
+    def __init__(self, file_name, compaction_min_records=COMPACTION_MIN_RECORDS):
+        super().__init__(file_name, Person, compaction_min_records)
@@ -1,9 +1,11 @@
-import json
+from contextlib import contextmanager
 from json.decoder import JSONDecodeError
 
 from domain.person import Person
 # from repository.in_memory_repo import Repository
-from repository.custom_repo import Repository
+# from repository.custom_repo import Repository
+from repository.hashed_repo import Repository
+from json_repository.json_stream import iter_json_array, write_json_array
 from repository.repository_exceptions import RepositoryException
 
 
@@ -11,28 +13,40 @@ class JsonPersonRepository(Repository):
     def __init__(self, file_name):
         super().__init__()
         self.__file_name = file_name
+        self.__transaction_depth = 0
         self._read_json_file()
 
+    @contextmanager
+    def transaction(self):
+        """
+        Groups a series of changes ('with repo.transaction():'): the file is rewritten once, at the end of the
+        outermost block, instead of after every change
+        """
+        self.__transaction_depth += 1
+        try:
+            yield self
+        finally:
+            self.__transaction_depth -= 1
+            self._write_json_file()
+
     def _write_json_file(self):
+        if self.__transaction_depth != 0:
+            return
         with open(self.__file_name, 'w') as f:
-            json_string = json.dumps([person.json_dump() for person in self.elements], indent=2)
-            f.write(json_string)
+            write_json_array(f, (person.json_dump() for person in self.elements))
 
     def _read_json_file(self):
+        # The persons are parsed one at a time (an empty file holds no persons)
         try:
             with open(self.__file_name, 'r') as f:
-                data = f.read()
-                persons = [Person.json_load(dumped_pers) for dumped_pers in json.loads(data)]
-        except (EOFError, JSONDecodeError):
-            # raised if the file is empty, if we try to load an empty JSON file, respectively
-            persons = []
+                for dumped_pers in iter_json_array(f):
+                    super().add_to_repo(Person.json_load(dumped_pers))
+        except JSONDecodeError as jde:
+            raise RepositoryException("The JSON file is not valid - " + str(jde))
         except IOError as ioe:
             # raised if the file could not be opened
             raise RepositoryException("An error occurred - " + str(ioe))
 
-        for person in persons:
-            super().add_to_repo(person)
-
     def add_to_repo(self, entity):
         super().add_to_repo(entity)
         self._write_json_file()
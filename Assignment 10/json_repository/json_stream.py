@@ -0,0 +1,102 @@
+import json
+from json.decoder import JSONDecodeError
+
+# Number of characters read from the file at once by the streaming reader
+CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = ' \t\n\r'
+
+
+def iter_json_array(file, chunk_size=CHUNK_SIZE):
+    """
+    Parses a file holding a JSON array incrementally and yields its elements one at a time, so only the current
+    element (plus one chunk of the file) is held in memory. An empty file is read as an empty array.
+    :param file: The file to read from, opened in text mode
+    :param chunk_size: The number of characters read at once
+    :raise JSONDecodeError: If the file is not a valid JSON array
+    """
+    buffer = ''
+    position = 0
+    end_of_file = False
+
+    def read_more():
+        # Drops the consumed part of the buffer and appends the next chunk of the file
+        nonlocal buffer, position, end_of_file
+        chunk = file.read(chunk_size)
+        end_of_file = chunk == ''
+        buffer = buffer[position:] + chunk
+        position = 0
+
+    def skip_whitespace():
+        # Returns the next significant character (without consuming it); '' at the end of the file
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            if end_of_file:
+                return ''
+            read_more()
+
+    decoder = json.JSONDecoder()
+    read_more()
+    first = skip_whitespace()
+    if first == '':
+        return
+    if first != '[':
+        raise JSONDecodeError("Expecting '['", buffer, position)
+    position += 1
+    if skip_whitespace() == ']':
+        position += 1
+    else:
+        while True:
+            skip_whitespace()
+            while True:
+                try:
+                    element, end = decoder.raw_decode(buffer, position)
+                    # A value is only known to be complete once the delimiter after it was read (e.g. the number
+                    # '3' at the end of the buffer may continue as '3.25' in the next chunk)
+                    following = end
+                    while following < len(buffer) and buffer[following] in _WHITESPACE:
+                        following += 1
+                    if (following < len(buffer) and buffer[following] in ',]') or end_of_file:
+                        break
+                except JSONDecodeError:
+                    if end_of_file:
+                        raise
+                read_more()
+            position = end
+            yield element
+            separator = skip_whitespace()
+            position += 1
+            if separator == ']':
+                break
+            if separator != ',':
+                raise JSONDecodeError("Expecting ',' delimiter", buffer, position - 1)
+    if skip_whitespace() != '':
+        raise JSONDecodeError("Extra data", buffer, position)
+
+
+def encode_json_element(element, indent=2):
+    """
+    Returns the text of <element> as written by write_json_array (indented one level, as an element of the array)
+    """
+    prefix = ' ' * indent
+    return prefix + json.dumps(element, indent=indent).replace('\n', '\n' + prefix)
+
+
+def write_json_array(file, elements, indent=2):
+    """
+    Writes the elements as a JSON array, one element at a time (the output is the same as the one of
+    json.dumps(list(elements), indent=indent), without building it in memory)
+    :param file: The file to write to, opened in text mode
+    :param elements: Iterable of JSON serializable objects
+    :param indent: The indentation used by json.dumps
+    """
+    separator = '[\n'
+    for element in elements:
+        file.write(separator)
+        file.write(encode_json_element(element, indent))
+        separator = ',\n'
+    file.write('[]' if separator == '[\n' else '\n]')
@@ -1,20 +1,31 @@
 import sys
 import traceback
 
+from compact_binary_repository.compact_binary_repository import CompactBinaryActivityRepository, \
+    CompactBinaryPersonRepository
 from domain.validators import DateTimeValidator, PersonIDValidator, PhoneNumberValidator
 from json_repository.json_activity_repository import JsonActivityRepository
+from json_repository.json_journal_repository import JsonJournalActivityRepository, JsonJournalPersonRepository
 from json_repository.json_person_repository import JsonPersonRepository
 from pickle_repository.pickle_activity_repository import PickleActivityRepository
+from pickle_repository.pickle_journal_repository import PickleJournalRepository
 from pickle_repository.pickle_person_repository import PicklePersonRepository
 # from repository.in_memory_repo import Repository
-from repository.custom_repo import Repository
+# from repository.custom_repo import Repository
+from repository.hashed_repo import Repository
+from repository.write_behind_repo import WriteBehindRepository
 from settings_handler import Settings, SettingsException
+from sql_repository.lazy_sql_activity_repository import LazySqlActivityRepository
+from sql_repository.lazy_sql_person_repository import LazySqlPersonRepository
 from sql_repository.sql_activity_repository import SqlActivityRepository
 from sql_repository.sql_person_repository import SqlPersonRepository
 from text_file_repository.text_file_activity_repo import TextFileActivityRepository
+from text_file_repository.text_file_journal_repo import TextFileJournalActivityRepository, \
+    TextFileJournalPersonRepository
 from text_file_repository.text_file_person_repo import TextFilePersonRepository
 from services.activity_service import ActivityService
 from services.person_service import PersonService
+from repository.undo_redo_log import UndoRedoLog
 from repository.undo_redo_repo import UndoRepository, RedoRepository
 from services.redo_service import RedoService
 from services.undo_service import UndoService
@@ -34,6 +45,9 @@ if __name__ == "__main__":
         elif settings_parser.repo_type == 'database':
             person_repo = SqlPersonRepository('data/' + settings_parser.files[0])
             activity_repo = SqlActivityRepository('data/' + settings_parser.files[0])
+        elif settings_parser.repo_type == 'database_lazy':
+            person_repo = LazySqlPersonRepository('data/' + settings_parser.files[0])
+            activity_repo = LazySqlActivityRepository('data/' + settings_parser.files[0])
         elif settings_parser.repo_type == 'textfiles':
             person_repo = TextFilePersonRepository('data/' + settings_parser.files[0])
             activity_repo = TextFileActivityRepository('data/' + settings_parser.files[1])
@@ -43,24 +57,41 @@ if __name__ == "__main__":
         elif settings_parser.repo_type == 'jsonfiles':
             person_repo = JsonPersonRepository('data/' + settings_parser.files[0])
             activity_repo = JsonActivityRepository('data/' + settings_parser.files[1])
+        elif settings_parser.repo_type == 'textjournal':
+            person_repo = TextFileJournalPersonRepository('data/' + settings_parser.files[0])
+            activity_repo = TextFileJournalActivityRepository('data/' + settings_parser.files[1])
+        elif settings_parser.repo_type == 'binaryjournal':
+            person_repo = PickleJournalRepository('data/' + settings_parser.files[0])
+            activity_repo = PickleJournalRepository('data/' + settings_parser.files[1])
+        elif settings_parser.repo_type == 'jsonjournal':
+            person_repo = JsonJournalPersonRepository('data/' + settings_parser.files[0])
+            activity_repo = JsonJournalActivityRepository('data/' + settings_parser.files[1])
+        elif settings_parser.repo_type == 'compactbinary':
+            person_repo = CompactBinaryPersonRepository('data/' + settings_parser.files[0])
+            activity_repo = CompactBinaryActivityRepository('data/' + settings_parser.files[1])
         else:
             raise SettingsException("Invalid settings.")
 
+        # The database repositories are already transactional, and write-behind would copy them in memory
+        if settings_parser.write_behind and settings_parser.repo_type not in ('inmemory', 'database',
+                                                                             'database_lazy'):
+            person_repo = WriteBehindRepository(person_repo)
+            activity_repo = WriteBehindRepository(activity_repo)
+
         datetime_validator_class = DateTimeValidator
         persons_id_validator_class = PersonIDValidator
         phone_number_validator_class = PhoneNumberValidator
 
-        undo_repository = UndoRepository()
-        redo_repository = RedoRepository()
+        # A redo mirrors an undo, so only the undo stack coalesces the operations
+        undo_repository = UndoRepository(settings_parser.undo_depth, settings_parser.undo_memory,
+                                         settings_parser.undo_coalesce)
+        redo_repository = RedoRepository(settings_parser.undo_depth, settings_parser.undo_memory)
         activity_service = ActivityService(activity_repo, person_repo, datetime_validator_class,
                                            persons_id_validator_class, undo_repository, redo_repository)
         person_service = PersonService(person_repo, persons_id_validator_class, phone_number_validator_class,
                                        undo_repository, redo_repository)
-        double_pop_fns = (person_service.add_person, activity_service.delete_person_from_activities)
-        double_pop_fns_counter_part = (person_service.delete_person_by_id, activity_service.add_person_to_activities)
-
-        undo_service = UndoService(undo_repository, double_pop_fns, double_pop_fns_counter_part)
-        redo_service = RedoService(redo_repository, double_pop_fns, double_pop_fns_counter_part)
+        undo_service = UndoService(undo_repository)
+        redo_service = RedoService(redo_repository)
 
         # If we use in-memory repository, fill the person and activity repositories for demonstration purposes
         if settings_parser.repo_type == 'inmemory':
@@ -81,14 +112,30 @@ if __name__ == "__main__":
         undo_repository.clear_stack()
         redo_repository.clear_stack()
 
-        if settings_parser.gui:
-            qApp = QtWidgets.QApplication(sys.argv)
-            home = Home(person_service, activity_service, undo_service, redo_service)
-            home.show()
-            sys.exit(qApp.exec_())
-        else:
-            console = Console(activity_service, person_service, undo_service, redo_service)
-            console.run_console()
+        undo_redo_log = None
+        if settings_parser.undo_log and settings_parser.repo_type != 'inmemory':
+            # One log per repository file, so the history of one repository is never replayed on another one
+            undo_redo_log = UndoRedoLog('data/' + settings_parser.files[0] + '.undo.log',
+                                        {'persons': person_service, 'activities': activity_service},
+                                        tail=settings_parser.undo_depth)
+            undo_redo_log.attach(undo_repository, redo_repository)
+
+        try:
+            if settings_parser.gui:
+                qApp = QtWidgets.QApplication(sys.argv)
+                home = Home(person_service, activity_service, undo_service, redo_service)
+                home.show()
+                sys.exit(qApp.exec_())
+            else:
+                console = Console(activity_service, person_service, undo_service, redo_service)
+                console.run_console()
+        finally:
+            # The changes still waiting to be written by the write-behind repositories are written now
+            for repo in (person_repo, activity_repo):
+                if isinstance(repo, WriteBehindRepository):
+                    repo.close()
+            if undo_redo_log is not None:
+                undo_redo_log.close()
 
         # while True:
         #     console_or_gui = input("Do you want to run the app with GUI?(Y/N)\n").strip().lower()
@@ -1,17 +1,35 @@
 import pickle
+from contextlib import contextmanager
 
 # from repository.in_memory_repo import Repository
 from repository.repository_exceptions import RepositoryException
-from repository.custom_repo import Repository
+# from repository.custom_repo import Repository
+from repository.hashed_repo import Repository
 
 
 class PickleActivityRepository(Repository):
     def __init__(self, file_name):
         super().__init__()
         self.__file_name = file_name
+        self.__transaction_depth = 0
         self._read_binary_file()
 
+    @contextmanager
+    def transaction(self):
+        """
+        Groups a series of changes ('with repo.transaction():'): the file is rewritten once, at the end of the
+        outermost block, instead of after every change
+        """
+        self.__transaction_depth += 1
+        try:
+            yield self
+        finally:
+            self.__transaction_depth -= 1
+            self._write_binary_file()
+
     def _write_binary_file(self):
+        if self.__transaction_depth != 0:
+            return
         with open(self.__file_name, 'wb') as f:
             pickle.dump(self.elements, f)
 
@@ -0,0 +1,32 @@
+import pickle
+
+from repository.journal_repo import JournalRepository
+
+
+class PickleJournalRepository(JournalRepository):
+    """
+    Journaled repository in the binary format, for persons as well as activities: the snapshot has the format of
+    the pickle repositories (a pickled list of entities) and every record of the journal is a pickled
+    (operation, entity or entity ID) pair
+    """
+
+    def _read_snapshot(self, file_name):
+        with open(file_name, 'rb') as f:
+            try:
+                return pickle.load(f)
+            except EOFError:
+                # raised if the file is empty
+                return []
+
+    def _write_snapshot(self, file_name, entities):
+        with open(file_name, 'wb') as f:
+            pickle.dump(list(entities), f)
+
+    def _encode_record(self, operation, argument):
+        return pickle.dumps((operation, argument), protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _read_record(self, journal):
+        if not journal.peek(1):
+            return None
+        return pickle.load(journal)
+
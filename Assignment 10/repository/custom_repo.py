@@ -1,15 +1,26 @@
+from contextlib import contextmanager
+
 from utils.iterable_object import MyIterableObject
+from repository.indexed_repo import IndexedRepository
 from repository.repository_exceptions import DeleteException, AddException, RepositoryException
 
 
-class Repository:
+class Repository(IndexedRepository):
     def __init__(self):
+        super().__init__()
         self.__entities = MyIterableObject()
+        self.__ids = set()
 
     def get_all_ids(self):
         return [elem.id for elem in self.elements]
 
+    @property
+    def ids(self):
+        return self.__ids
+
     def find_by_id(self, entity_id):
+        if entity_id not in self.__ids:
+            return None, None
         return next(((elem, idx) for idx, elem in enumerate(self.elements) if elem.id == entity_id), (None, None))
 
     def delete_by_id(self, entity_id):
@@ -17,19 +28,34 @@ class Repository:
         if obj_to_delete is None:
             raise DeleteException("The entity is not in the repository.")
         del self.__entities[idx_to_delete]
+        self.__ids.discard(entity_id)
+        self._index_remove(obj_to_delete)
 
     def add_to_repo(self, entity):
         already_in, idx_in = self.find_by_id(entity.id)
         if already_in is not None:
             raise AddException("The entity is already in the repository.")
+        self._check_unique(entity, AddException)
         self.__entities.append(entity)
+        self.__ids.add(entity.id)
+        self._index_add(entity)
 
     def update(self, entity):
         obj_to_update, idx_update = self.find_by_id(entity.id)
         if obj_to_update is None:
             raise RepositoryException("The entity to be updated doesn't exist.")
+        self._check_unique(entity, RepositoryException)
         del self.__entities[idx_update]
         self.__entities.insert(idx_update, entity)
+        self._index_replace(obj_to_update, entity)
+
+    def search(self, attribute, text, normalise=None):
+        normalise = (lambda value: value) if normalise is None else normalise
+        return [elem for elem in self.elements if text in normalise(getattr(elem, attribute))]
+
+    @contextmanager
+    def transaction(self):
+        yield self
 
     @property
     def elements(self):
@@ -0,0 +1,127 @@
+from contextlib import contextmanager
+
+from utils.iterable_object import MyIterableObject
+from repository.indexed_repo import IndexedRepository
+from repository.repository_exceptions import DeleteException, AddException, RepositoryException
+
+# Marks a slot whose entity was deleted; the slot is reclaimed on the next compaction
+_DELETED = object()
+
+
+class Repository(IndexedRepository):
+    """
+    Generic repository which keeps an ID -> slot dictionary next to the insertion-ordered store of entities.
+    Lookups, additions and updates take O(1), deletions take amortised O(1) (the deleted slot is only marked
+    and the store is compacted once enough slots were freed). Iteration order is the order of insertion.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.__entities = MyIterableObject()
+        self.__slots = {}
+        self.__deleted_count = 0
+
+    def get_all_ids(self):
+        """
+        Returns all the entity IDs, in order of insertion
+        """
+        return list(self.__slots)
+
+    @property
+    def ids(self):
+        """
+        Live, read-only view of the entity IDs; supports 'in' and len() in O(1) and always reflects
+        the current content of the repository
+        """
+        return self.__slots.keys()
+
+    def find_by_id(self, entity_id):
+        """
+        Finds an entity from the repository by ID
+        :param entity_id: The ID of the entity to be searched; integer
+        :return: The entity with ID <entity_id> and its slot in the store if it was found in the
+        repository; (None, None) otherwise
+        """
+        slot = self.__slots.get(entity_id)
+        if slot is None:
+            return None, None
+        return self.__entities[slot], slot
+
+    def delete_by_id(self, entity_id):
+        """
+        Deletes an entity from the repository by ID
+        :param entity_id: The ID of the entity to be deleted; integer
+        :raise DeleteException: If there is no entity with ID <entity_id> in the repository
+        """
+        slot = self.__slots.pop(entity_id, None)
+        if slot is None:
+            raise DeleteException("The entity is not in the repository.")
+        self._index_remove(self.__entities[slot])
+        self.__entities[slot] = _DELETED
+        self.__deleted_count += 1
+        if 2 * self.__deleted_count > len(self.__entities):
+            self.__compact()
+
+    def add_to_repo(self, entity):
+        """
+        Adds a new entity to the repository
+        :param entity: The entity to be added to the repository
+        :raise AddException: if the entity is already in the repository
+        """
+        if entity.id in self.__slots:
+            raise AddException("The entity is already in the repository.")
+        self._check_unique(entity, AddException)
+        self.__slots[entity.id] = len(self.__entities)
+        self.__entities.append(entity)
+        self._index_add(entity)
+
+    def update(self, entity):
+        """
+        Updates an element from the repository (in place, the entity keeps its position)
+        :param entity: The entity to be updated
+        :raise RepositoryException: If the entity does not exist in the repository
+        """
+        slot = self.__slots.get(entity.id)
+        if slot is None:
+            raise RepositoryException("The entity to be updated doesn't exist.")
+        self._check_unique(entity, RepositoryException)
+        self._index_replace(self.__entities[slot], entity)
+        self.__entities[slot] = entity
+
+    def __compact(self):
+        """
+        Drops the slots of the deleted entities and renumbers the remaining ones
+        """
+        self.__entities = MyIterableObject([elem for elem in self.__entities if elem is not _DELETED])
+        # Rebuilt in place, so the views of the IDs handed out before (see ids) stay live
+        slots = {elem.id: slot for slot, elem in enumerate(self.__entities)}
+        self.__slots.clear()
+        self.__slots.update(slots)
+        self.__deleted_count = 0
+
+    def search(self, attribute, text, normalise=None):
+        """
+        Returns the entities whose attribute <attribute> contains the string <text> (partial string matching)
+        :param attribute: The name of the searched attribute; string
+        :param text: The string to search for
+        :param normalise: Function applied on the attribute values before searching them (e.g. str.lower for
+        a case-insensitive search); None for identity
+        :return: List with the matching entities, in the order of the repository
+        """
+        normalise = (lambda value: value) if normalise is None else normalise
+        return [elem for elem in self.elements if text in normalise(getattr(elem, attribute))]
+
+    @contextmanager
+    def transaction(self):
+        """
+        Groups a series of changes into one unit of work ('with repo.transaction():'). The in-memory repository
+        applies every change right away, so there is nothing to do here; the persistent repositories override
+        it to write all the changes of the block at once.
+        """
+        yield self
+
+    @property
+    def elements(self):
+        if self.__deleted_count:
+            self.__compact()
+        return self.__entities.elements
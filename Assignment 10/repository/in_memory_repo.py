@@ -1,13 +1,18 @@
+from contextlib import contextmanager
+
+from repository.indexed_repo import IndexedRepository
 from repository.repository_exceptions import AddException, DeleteException, RepositoryException
 
 
-class Repository:
+class Repository(IndexedRepository):
     """
     Class representing a generic repository
     """
 
     def __init__(self):
+        super().__init__()
         self.__entities = []
+        self.__ids = set()
 
     def get_all_ids(self):
         """
@@ -15,12 +20,22 @@ class Repository:
         """
         return [elem.id for elem in self.elements]
 
+    @property
+    def ids(self):
+        """
+        Live set of the entity IDs, kept in sync by add_to_repo() and delete_by_id(); used for O(1) membership
+        checks. It must not be modified by the caller.
+        """
+        return self.__ids
+
     def find_by_id(self, entity_id):
         """
         Finds an entity from the repository by ID
         :param entity_id: The ID of the entity to be searched; integer
         :return: The entity with ID <entity_id> if it was found in the repository; None otherwise
         """
+        if entity_id not in self.__ids:
+            return None, None
         return next(((ent, idx) for idx, ent in enumerate(self.elements) if ent.id == entity_id), (None, None))
 
     def delete_by_id(self, entity_id):
@@ -35,6 +50,8 @@ class Repository:
         if obj_to_delete is None:
             raise DeleteException("The entity is not in the repository.")
         del self.__entities[idx_to_delete]
+        self.__ids.discard(entity_id)
+        self._index_remove(obj_to_delete)
 
     def add_to_repo(self, entity):
         """
@@ -47,7 +64,10 @@ class Repository:
         already_in, idx_in = self.find_by_id(entity.id)
         if already_in is not None:
             raise AddException("The entity is already in the repository.")
+        self._check_unique(entity, AddException)
         self.__entities.append(entity)
+        self.__ids.add(entity.id)
+        self._index_add(entity)
 
     def update(self, entity):
         """
@@ -60,8 +80,31 @@ class Repository:
         # we shouldn't raise the RepositoryException exception (but it's useful independently)
         if obj_to_update is None:
             raise RepositoryException("The entity to be updated doesn't exist.")
+        self._check_unique(entity, RepositoryException)
         del self.__entities[idx_update]
         self.__entities.insert(idx_update, entity)
+        self._index_replace(obj_to_update, entity)
+
+    def search(self, attribute, text, normalise=None):
+        """
+        Returns the entities whose attribute <attribute> contains the string <text> (partial string matching)
+        :param attribute: The name of the searched attribute; string
+        :param text: The string to search for
+        :param normalise: Function applied on the attribute values before searching them (e.g. str.lower for
+        a case-insensitive search); None for identity
+        :return: List with the matching entities, in the order of the repository
+        """
+        normalise = (lambda value: value) if normalise is None else normalise
+        return [elem for elem in self.elements if text in normalise(getattr(elem, attribute))]
+
+    @contextmanager
+    def transaction(self):
+        """
+        Groups a series of changes into one unit of work ('with repo.transaction():'). The in-memory repository
+        applies every change right away, so there is nothing to do here; the persistent repositories override
+        it to write all the changes of the block at once.
+        """
+        yield self
 
     @property
     def elements(self):
@@ -0,0 +1,85 @@
+from repository.interval_index import IntervalIndex
+from repository.inverted_index import InvertedIndex
+from repository.repository_exceptions import RepositoryException
+from repository.unique_index import UniqueIndex
+
+
+class IndexedRepository:
+    """
+    Secondary indexes of a repository (see unique_index, inverted_index and interval_index), shared by all the
+    repository engines: a declared index is filled with the entities already in the repository (the engine
+    provides the 'elements' property), and the engines keep the indexes up to date by calling _check_unique()
+    and the _index_*() methods from their add_to_repo(), update() and delete_by_id()
+    """
+
+    def __init__(self):
+        self.__indexes = {}
+
+    def add_unique_index(self, attribute, normalise=None):
+        """
+        Declares a unique secondary index over an attribute of the entities; the entities already in the
+        repository are indexed right away and the index is kept up to date by every add, update and delete
+        :param attribute: The name of the indexed attribute; string
+        :param normalise: Function applied on the attribute values before comparing them; None for identity
+        :raise RepositoryException: If two entities already in the repository have the same indexed value
+        """
+        index = UniqueIndex(attribute, normalise)
+        for elem in self.elements:
+            if index.conflicts_with(elem):
+                raise RepositoryException(f"The {attribute} of the entity {elem.id} is not unique.")
+            index.add(elem)
+        self._set_index(attribute, index)
+
+    def add_inverted_index(self, attribute):
+        """
+        Declares an inverted index over a list attribute of the entities (value -> IDs of the entities whose list
+        contains it); the entities already in the repository are indexed right away and the index is kept up to
+        date by every add, update and delete
+        :param attribute: The name of the indexed attribute; string
+        """
+        index = InvertedIndex(attribute)
+        for elem in self.elements:
+            index.add(elem)
+        self._set_index(attribute, index)
+
+    def add_interval_index(self, start_attribute, end_attribute):
+        """
+        Declares an interval index over the [start, end] intervals of the entities, registered under the name of
+        its start attribute; the entities already in the repository are indexed right away and the index is kept
+        up to date by every add, update and delete
+        :param start_attribute: The name of the attribute holding the start of the intervals; string
+        :param end_attribute: The name of the attribute holding the end of the intervals; string
+        """
+        index = IntervalIndex(start_attribute, end_attribute)
+        for elem in self.elements:
+            index.add(elem)
+        self._set_index(start_attribute, index)
+
+    def _set_index(self, attribute, index):
+        self.__indexes[attribute] = index
+
+    def get_index(self, attribute):
+        """
+        Returns the index (unique, inverted or interval) declared over the attribute <attribute>
+        """
+        return self.__indexes[attribute]
+
+    def _check_unique(self, entity, exception_class):
+        """
+        Raises <exception_class> if another entity of the repository already has one of the unique indexed values
+        of <entity>
+        """
+        if any(index.conflicts_with(entity) for index in self.__indexes.values()):
+            raise exception_class("An entity with the same unique attributes is already in the repository.")
+
+    def _index_add(self, entity):
+        for index in self.__indexes.values():
+            index.add(entity)
+
+    def _index_remove(self, entity):
+        for index in self.__indexes.values():
+            index.remove(entity)
+
+    def _index_replace(self, old_entity, entity):
+        for index in self.__indexes.values():
+            index.replace(old_entity, entity)
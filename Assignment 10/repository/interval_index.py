@@ -0,0 +1,180 @@
+import random
+
+
+class _Node:
+    """
+    Node of the interval tree; besides its own interval it keeps the greatest end of its subtree
+    """
+    __slots__ = ('key', 'start', 'end', 'entity_id', 'priority', 'left', 'right', 'max_end')
+
+    def __init__(self, start, end, entity_id):
+        self.key = (start, end, entity_id)
+        self.start = start
+        self.end = end
+        self.entity_id = entity_id
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        self.max_end = end
+
+
+class IntervalIndex:
+    """
+    Secondary index over the [start, end] intervals of the entities (e.g. the start and end datetimes of the
+    activities). The intervals are kept in an augmented balanced search tree (a treap ordered by the start of the
+    intervals, in which every node also knows the greatest end of its subtree), so an insertion or a deletion takes
+    O(log n) and a query returns its k matching entities in O(log n + k) instead of scanning the whole repository.
+    The index never rejects an entity; it can be registered next to the other indexes of a repository.
+    :param start_attribute: The name of the attribute holding the start of the interval; string
+    :param end_attribute: The name of the attribute holding the end of the interval; string
+    """
+
+    def __init__(self, start_attribute, end_attribute):
+        self.__start_attribute = start_attribute
+        self.__end_attribute = end_attribute
+        self.__root = None
+        self.__size = 0
+
+    def __len__(self):
+        return self.__size
+
+    @property
+    def attribute(self):
+        return self.__start_attribute
+
+    def overlapping(self, start, end):
+        """
+        Returns the IDs of the entities whose interval overlaps the open interval (start, end), i.e. the entities
+        that start before <end> and end after <start> (touching intervals do not overlap)
+        :return: List of entity IDs, in ascending order of the start of their intervals
+        """
+        result = []
+        self.__collect(self.__root, start, end, False, result)
+        return result
+
+    def containing(self, instant):
+        """
+        Returns the IDs of the entities whose (closed) interval contains <instant>
+        :return: List of entity IDs, in ascending order of the start of their intervals
+        """
+        return self.touching(instant, instant)
+
+    def touching(self, start, end):
+        """
+        Returns the IDs of the entities whose (closed) interval has at least one point in common with the closed
+        interval [start, end] (e.g. all the activities of a day, when given the first and the last moment of the day)
+        :return: List of entity IDs, in ascending order of the start of their intervals
+        """
+        result = []
+        self.__collect(self.__root, start, end, True, result)
+        return result
+
+    def conflicts_with(self, entity):
+        """
+        Any number of entities can share an interval, so there is never a conflict
+        """
+        return False
+
+    def add(self, entity):
+        """
+        Registers the interval of <entity>
+        """
+        start, end = self.__interval(entity)
+        self.__root = self.__insert(self.__root, _Node(start, end, entity.id))
+        self.__size += 1
+
+    def remove(self, entity):
+        """
+        Unregisters the interval of <entity>
+        """
+        start, end = self.__interval(entity)
+        self.__root = self.__delete(self.__root, (start, end, entity.id))
+
+    def replace(self, old_entity, new_entity):
+        """
+        Moves the interval of <old_entity> to the interval of <new_entity> (only if the interval changed)
+        """
+        if self.__interval(old_entity) != self.__interval(new_entity):
+            self.remove(old_entity)
+            self.add(new_entity)
+
+    def __interval(self, entity):
+        return getattr(entity, self.__start_attribute), getattr(entity, self.__end_attribute)
+
+    @staticmethod
+    def __update(node):
+        node.max_end = node.end
+        if node.left is not None and node.left.max_end > node.max_end:
+            node.max_end = node.left.max_end
+        if node.right is not None and node.right.max_end > node.max_end:
+            node.max_end = node.right.max_end
+
+    def __rotate_right(self, node):
+        pivot = node.left
+        node.left = pivot.right
+        pivot.right = node
+        self.__update(node)
+        self.__update(pivot)
+        return pivot
+
+    def __rotate_left(self, node):
+        pivot = node.right
+        node.right = pivot.left
+        pivot.left = node
+        self.__update(node)
+        self.__update(pivot)
+        return pivot
+
+    def __insert(self, node, new_node):
+        if node is None:
+            return new_node
+        if new_node.key < node.key:
+            node.left = self.__insert(node.left, new_node)
+            if node.left.priority > node.priority:
+                return self.__rotate_right(node)
+        else:
+            node.right = self.__insert(node.right, new_node)
+            if node.right.priority > node.priority:
+                return self.__rotate_left(node)
+        self.__update(node)
+        return node
+
+    def __delete(self, node, key):
+        if node is None:
+            return None
+        if key < node.key:
+            node.left = self.__delete(node.left, key)
+        elif key > node.key:
+            node.right = self.__delete(node.right, key)
+        else:
+            self.__size -= 1
+            return self.__merge(node.left, node.right)
+        self.__update(node)
+        return node
+
+    def __merge(self, left, right):
+        """
+        Merges two treaps, knowing that all the keys of <left> are smaller than the keys of <right>
+        """
+        if left is None:
+            return right
+        if right is None:
+            return left
+        if left.priority > right.priority:
+            left.right = self.__merge(left.right, right)
+            self.__update(left)
+            return left
+        right.left = self.__merge(left, right.left)
+        self.__update(right)
+        return right
+
+    def __collect(self, node, start, end, closed, result):
+        # No interval of this subtree ends late enough to reach <start>
+        if node is None or node.max_end < start or (not closed and node.max_end == start):
+            return
+        self.__collect(node.left, start, end, closed, result)
+        # The intervals of the right subtree start even later than this one
+        if node.start < end or (closed and node.start == end):
+            if node.end > start or (closed and node.end == start):
+                result.append(node.entity_id)
+            self.__collect(node.right, start, end, closed, result)
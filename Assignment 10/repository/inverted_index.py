@@ -0,0 +1,70 @@
+class InvertedIndex:
+    """
+    Secondary index over an attribute of the entities which holds a list of values (e.g. the person IDs of an
+    activity). Maps every value to the IDs of the entities whose list contains it, so finding the entities that
+    contain a given value costs O(number of such entities) instead of a scan of the whole repository.
+    The index never rejects an entity; it can be registered next to the unique indexes of a repository.
+    :param attribute: The name of the indexed attribute of the entities; string
+    """
+
+    def __init__(self, attribute):
+        self.__attribute = attribute
+        # value -> {entity ID: None}; a dictionary is used as an insertion-ordered set
+        self.__ids = {}
+
+    def __len__(self):
+        return len(self.__ids)
+
+    def __contains__(self, value):
+        return value in self.__ids
+
+    @property
+    def attribute(self):
+        return self.__attribute
+
+    def get(self, value):
+        """
+        Returns the IDs of the entities whose indexed list contains <value>, as a new list (in the order in which
+        the value was added to them)
+        """
+        return list(self.__ids.get(value, ()))
+
+    def conflicts_with(self, entity):
+        """
+        An inverted index allows any number of entities per value, so there is never a conflict
+        """
+        return False
+
+    def add(self, entity):
+        """
+        Registers every value of the indexed list of <entity>
+        """
+        for value in getattr(entity, self.__attribute):
+            self.__ids.setdefault(value, {})[entity.id] = None
+
+    def remove(self, entity):
+        """
+        Unregisters every value of the indexed list of <entity>
+        """
+        for value in getattr(entity, self.__attribute):
+            self.__discard(value, entity.id)
+
+    def replace(self, old_entity, new_entity):
+        """
+        Updates the index when <old_entity> is replaced by <new_entity>; only the values which were removed from
+        or added to the indexed list are touched
+        """
+        old_values = set(getattr(old_entity, self.__attribute))
+        new_values = set(getattr(new_entity, self.__attribute))
+        for value in old_values - new_values:
+            self.__discard(value, old_entity.id)
+        for value in new_values - old_values:
+            self.__ids.setdefault(value, {})[new_entity.id] = None
+
+    def __discard(self, value, entity_id):
+        entity_ids = self.__ids.get(value)
+        if entity_ids is None:
+            return
+        entity_ids.pop(entity_id, None)
+        if not entity_ids:
+            del self.__ids[value]
@@ -0,0 +1,165 @@
+import os
+import pickle
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+# from repository.in_memory_repo import Repository
+# from repository.custom_repo import Repository
+from repository.hashed_repo import Repository
+from repository.repository_exceptions import RepositoryException
+
+ADD = 'add'
+UPDATE = 'update'
+DELETE = 'delete'
+
+# The journal is compacted into a fresh snapshot once it has more records than this and than there are entities
+# (so the cost of the compactions is amortised over the changes)
+COMPACTION_MIN_RECORDS = 1000
+
+
+class JournalRepository(Repository, ABC):
+    """
+    Repository persisted as a snapshot file (in the format of the corresponding file repository) plus an
+    append-only journal next to it ('<file_name>.journal'). Every add, update and delete appends one compact record
+    to the journal instead of rewriting the whole file; at startup the snapshot is loaded and the journal is
+    replayed over it. Once the journal grows past the size of the repository, a fresh snapshot is written (to a
+    temporary file which then replaces the old snapshot) and the journal is emptied.
+    Replaying a record only sets (or removes) the entity with the recorded ID, so replaying a journal over a
+    snapshot that already contains its changes (e.g. after a crash during a compaction) gives the same content,
+    and a record cut off by a crash at the end of the journal is dropped.
+    The subclasses implement the format: reading and writing the snapshot, encoding and reading the records (the
+    abstract methods below).
+    :param file_name: The path of the snapshot; string
+    :param compaction_min_records: The minimum number of records of the journal before compacting it
+    """
+
+    def __init__(self, file_name, compaction_min_records=COMPACTION_MIN_RECORDS):
+        super().__init__()
+        self.__file_name = file_name
+        self.__journal_name = file_name + '.journal'
+        self.__compaction_min_records = compaction_min_records
+        self.__journal_records = 0
+        self.__transaction_depth = 0
+        try:
+            if os.path.exists(self.__file_name):
+                for entity in self._read_snapshot(self.__file_name):
+                    super().add_to_repo(entity)
+            self.__replay_journal()
+            self.__journal = open(self.__journal_name, 'ab')
+        except IOError as ioe:
+            raise RepositoryException("An error occurred - " + str(ioe))
+
+    @property
+    def journal_records(self):
+        """
+        The number of records in the journal (i.e. the changes made since the last snapshot)
+        """
+        return self.__journal_records
+
+    def __replay_journal(self):
+        if not os.path.exists(self.__journal_name):
+            return
+        valid_size = 0
+        with open(self.__journal_name, 'rb') as journal:
+            while True:
+                try:
+                    record = self._read_record(journal)
+                except (ValueError, IndexError, EOFError, pickle.UnpicklingError):
+                    # The last record was only partly written
+                    break
+                if record is None:
+                    break
+                self.__apply(*record)
+                self.__journal_records += 1
+                valid_size = journal.tell()
+        if valid_size < os.path.getsize(self.__journal_name):
+            os.truncate(self.__journal_name, valid_size)
+
+    def __apply(self, operation, argument):
+        if operation == DELETE:
+            if argument in self.ids:
+                super().delete_by_id(argument)
+        elif argument.id in self.ids:
+            super().update(argument)
+        else:
+            super().add_to_repo(argument)
+
+    def __append(self, operation, argument):
+        self.__journal.write(self._encode_record(operation, argument))
+        self.__journal_records += 1
+        if self.__transaction_depth == 0:
+            self.__end_of_change()
+
+    def __end_of_change(self):
+        self.__journal.flush()
+        if self.__journal_records > max(self.__compaction_min_records, len(self.ids)):
+            self.compact()
+
+    def compact(self):
+        """
+        Writes a fresh snapshot of the repository and empties the journal
+        """
+        temporary_name = self.__file_name + '.tmp'
+        self._write_snapshot(temporary_name, self.elements)
+        os.replace(temporary_name, self.__file_name)
+        self.__journal.close()
+        self.__journal = open(self.__journal_name, 'wb')
+        self.__journal_records = 0
+
+    def close(self):
+        """
+        Closes the journal; the repository cannot be changed anymore afterwards
+        """
+        self.__journal.close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Groups a series of changes ('with repo.transaction():'): their records are flushed to the journal (and the
+        journal is compacted, if needed) once, at the end of the outermost block
+        """
+        self.__transaction_depth += 1
+        try:
+            yield self
+        finally:
+            self.__transaction_depth -= 1
+            if self.__transaction_depth == 0:
+                self.__end_of_change()
+
+    def add_to_repo(self, entity):
+        super().add_to_repo(entity)
+        self.__append(ADD, entity)
+
+    def delete_by_id(self, entity_id):
+        super().delete_by_id(entity_id)
+        self.__append(DELETE, entity_id)
+
+    def update(self, entity):
+        super().update(entity)
+        self.__append(UPDATE, entity)
+
+    @abstractmethod
+    def _read_snapshot(self, file_name):
+        """
+        Returns the entities of the snapshot <file_name> (an iterable of entities)
+        """
+
+    @abstractmethod
+    def _write_snapshot(self, file_name, entities):
+        """
+        Writes the entities to the snapshot <file_name>
+        """
+
+    @abstractmethod
+    def _encode_record(self, operation, argument):
+        """
+        Returns the record of a change as bytes; <argument> is the entity for ADD and UPDATE and its ID for DELETE
+        """
+
+    @abstractmethod
+    def _read_record(self, journal):
+        """
+        Reads the next record from the journal (opened in binary mode)
+        :return: The pair (operation, argument) of the record; None at the end of the journal
+        :raise ValueError: (or IndexError, EOFError, pickle.UnpicklingError) If the record is incomplete
+        """
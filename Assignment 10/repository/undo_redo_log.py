@@ -0,0 +1,166 @@
+import json
+import os
+from collections import deque
+
+from domain.validators import UndoRedoException
+from repository.repository_exceptions import RepositoryException
+from repository.undo_redo_repo import CompositeOperation
+
+UNDO = 'undo'
+REDO = 'redo'
+
+# The log is compacted (rewritten with only the operations on the stacks) once it has more records than this and
+# than there are operations on the stacks
+COMPACTION_MIN_RECORDS = 1000
+
+
+class UndoRedoLog:
+    """
+    Persists the undo and redo stacks in an append-only log, so the history survives a restart (or a crash) and
+    can be shared by the console and the GUI. Every change of a stack appends one compact record, a JSON line:
+    ["undo" or "redo", "push" or "replace", operation], ["undo" or "redo", "pop"] or ["undo" or "redo", "clear"],
+    where an operation is [service name, method name, [args...]] or ["batch", [operations...]] (a
+    CompositeOperation). At startup the log is replayed, only the last <tail> operations of every stack are kept,
+    and the log is rewritten with only them (to a temporary file which then replaces the log). Every record is
+    flushed (and, with <sync>, written to the disk) before the change returns; a record cut off by a crash at the
+    end of the log is dropped.
+    Only the operations which the services can invert are loaded back, so the log cannot call arbitrary methods.
+    :param file_name: The path of the log; string
+    :param services: Dictionary service name -> service (e.g. {'persons': person_service, ...}); the services
+    whose operations are on the stacks
+    :param tail: The maximum number of operations of every stack loaded at startup; None for all of them
+    :param compaction_min_records: The minimum number of records of the log before compacting it
+    :param sync: If every record should be written to the disk (os.fsync) or only flushed; bool
+    """
+
+    def __init__(self, file_name, services, tail=None, compaction_min_records=COMPACTION_MIN_RECORDS, sync=True):
+        self.__file_name = file_name
+        self.__services = services
+        self.__service_names = {service: name for name, service in services.items()}
+        self.__tail = tail
+        self.__compaction_min_records = compaction_min_records
+        self.__sync = sync
+        self.__repositories = {}
+        self.__records = 0
+        self.__log = None
+
+    @property
+    def records(self):
+        """
+        The number of records in the log (i.e. the changes of the stacks since the last compaction, plus the
+        operations on the stacks at that time)
+        """
+        return self.__records
+
+    def attach(self, undo_repository, redo_repository):
+        """
+        Loads the history from the log into the (empty) undo and redo repositories, then logs their changes
+        :raise RepositoryException: If the log cannot be read or written, or holds an unknown operation
+        """
+        self.__repositories = {UNDO: undo_repository, REDO: redo_repository}
+        try:
+            stacks = self.__replay()
+            for stack_name, repository in self.__repositories.items():
+                repository.restore([self.__decode(operation) for operation in stacks[stack_name]])
+            self.compact()
+        except IOError as ioe:
+            raise RepositoryException("An error occurred - " + str(ioe))
+        for stack_name, repository in self.__repositories.items():
+            repository.set_listener(lambda action, *operation, stack_name=stack_name:
+                                    self.__append(stack_name, action, *operation))
+
+    def __replay(self):
+        """
+        Returns the records of the operations on the stacks at the end of the log (at most <tail> per stack)
+        """
+        stacks = {UNDO: deque(maxlen=self.__tail), REDO: deque(maxlen=self.__tail)}
+        if not os.path.exists(self.__file_name):
+            return stacks
+        with open(self.__file_name, 'r') as log:
+            for line in log:
+                try:
+                    record = json.loads(line)
+                    stack = stacks[record[0]]
+                    if record[1] == 'push':
+                        stack.append(record[2])
+                    elif record[1] == 'replace':
+                        if stack:
+                            stack[-1] = record[2]
+                        else:
+                            stack.append(record[2])
+                    elif record[1] == 'pop':
+                        # The stack is empty if the popped operation was older than the tail
+                        if stack:
+                            stack.pop()
+                    elif record[1] == 'clear':
+                        stack.clear()
+                except (ValueError, IndexError, KeyError, TypeError):
+                    # The last record was only partly written (the rest of the log is rewritten by the compaction)
+                    break
+        return stacks
+
+    def __encode(self, fn, args):
+        if isinstance(fn, CompositeOperation):
+            return ['batch', [self.__encode(*operation) for operation in fn.operations]]
+        return [self.__service_names[fn.__self__], fn.__name__, list(args)]
+
+    def __decode(self, operation):
+        """
+        Returns the (inverse_function, args) pair of an operation record
+        :raise RepositoryException: If the operation is not one the services can invert
+        """
+        try:
+            if operation[0] == 'batch':
+                return CompositeOperation([self.__decode(inner_operation) for inner_operation in operation[1]],
+                                          (self.__repositories[UNDO], self.__repositories[REDO])), ()
+            service = self.__services[operation[0]]
+            fn, args = getattr(service, operation[1]), tuple(operation[2])
+            # Raises UndoRedoException if <fn> is not an invertible operation
+            service.get_inverse_operation_and_args(fn, *args)
+            return fn, args
+        except (IndexError, KeyError, TypeError, AttributeError, UndoRedoException):
+            raise RepositoryException("The undo/redo log holds an unknown operation: " + json.dumps(operation))
+
+    def __write_record(self, record):
+        self.__log.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self.__records += 1
+
+    def __append(self, stack_name, action, *operation):
+        record = [stack_name, action]
+        if operation:
+            record.append(self.__encode(*operation))
+        self.__write_record(record)
+        self.__log.flush()
+        if self.__sync:
+            os.fsync(self.__log.fileno())
+        operations = sum(len(repository) for repository in self.__repositories.values())
+        if self.__records > max(self.__compaction_min_records, operations):
+            self.compact()
+
+    def compact(self):
+        """
+        Rewrites the log with only the operations on the stacks
+        """
+        if self.__log is not None:
+            self.__log.close()
+        self.__records = 0
+        temporary_name = self.__file_name + '.tmp'
+        with open(temporary_name, 'w') as log:
+            self.__log = log
+            for stack_name, repository in self.__repositories.items():
+                for operation in repository.operations:
+                    self.__write_record([stack_name, 'push', self.__encode(*operation)])
+            log.flush()
+            os.fsync(log.fileno())
+        os.replace(temporary_name, self.__file_name)
+        self.__log = open(self.__file_name, 'a')
+
+    def close(self):
+        """
+        Stops logging the changes of the stacks and closes the log
+        """
+        for repository in self.__repositories.values():
+            repository.set_listener(None)
+        if self.__log is not None:
+            self.__log.close()
+            self.__log = None
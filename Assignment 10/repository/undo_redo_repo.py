@@ -1,12 +1,104 @@
+import sys
+from collections import deque
+from contextlib import contextmanager
+
 from domain.validators import UndoException, UndoRedoException, RedoException
 
+# The bytes counted for every entry of a stack, besides its arguments (the entry tuple and the deque slot)
+ENTRY_OVERHEAD = 100
+
+
+def estimate_size(obj):
+    """
+    Estimates the memory (in bytes) taken by the arguments of an operation: the size of the object plus, for the
+    tuples, lists, sets and dictionaries, the sizes of their elements
+    """
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (tuple, list, set, frozenset)):
+        size += sum(estimate_size(elem) for elem in obj)
+    elif isinstance(obj, dict):
+        size += sum(estimate_size(key) + estimate_size(value) for key, value in obj.items())
+    return size
+
+
+class CompositeOperation:
+    """
+    The inverse of a batch of operations (see batch): when called, it calls the inverses of the operations, in
+    reverse order, inside a new batch, so their own inverses are recorded as a single operation as well
+    :param operations: The (inverse function, args) pairs recorded during the batch, in their order
+    :param repositories: The undo and redo repositories the batch was recorded on
+    """
+    def __init__(self, operations, repositories):
+        self.operations = operations
+        self.repositories = repositories
+        self.size = sum(ENTRY_OVERHEAD + estimate_size(args) for _, args in operations)
+
+    def __call__(self, record_undo=True, record_redo=False, as_redo=False):
+        with batch(*self.repositories):
+            for fn, args in reversed(self.operations):
+                fn(*args, record_undo=record_undo, record_redo=record_redo, as_redo=as_redo)
+
+
+@contextmanager
+def batch(*repositories):
+    """
+    Context manager which records all the operations done inside it as a single operation on each of the given
+    repositories (its inverse is a CompositeOperation), so e.g. the deletion of a person together with its removal
+    from the activities, or a bulk import, is undone in one step. Batches can be nested (only the outermost one
+    records the operation). The operations done before an exception are recorded as well.
+    :param repositories: The undo and redo repositories shared by the services
+    """
+    for repository in repositories:
+        repository.begin_batch()
+    try:
+        yield
+    finally:
+        for repository in repositories:
+            repository.end_batch(repositories)
+
+
+def keep_first(old_args, new_args):
+    """
+    Coalescing rule of the operations which set a value of an entity (the first argument is the ID of the
+    entity): undoing the older operation alone restores the value from before both
+    """
+    return old_args if old_args[0] == new_args[0] else None
+
+
+def merge_id_lists(old_args, new_args):
+    """
+    Coalescing rule of the operations which add (or remove) a list of IDs to (or from) an entity (the first
+    argument is the ID of the entity, the second one the list of IDs): the lists are joined
+    """
+    if old_args[0] != new_args[0]:
+        return None
+    return (old_args[0], list(old_args[1]) + [id_ for id_ in new_args[1] if id_ not in old_args[1]]) + old_args[2:]
+
 
 class UndoRedoRepository:
     """
-    Generic repository used for both the undo and redo stacks
+    Generic repository used for both the undo and redo stacks. The stack can be bounded by a depth (the number
+    of operations) and by a byte budget (the estimated memory of the arguments of the operations): when a new
+    operation goes over a bound, the oldest operations are evicted (the newest one is always kept). Consecutive
+    compatible operations can be coalesced into one (see add_coalescing_rule), so e.g. a run of updates of the
+    same description is undone at once and takes the space of a single operation.
+    :param max_depth: The maximum number of operations on the stack; None for no limit
+    :param max_bytes: The maximum estimated memory of the operations on the stack, in bytes; None for no limit
+    :param coalesce: If the consecutive compatible operations should be coalesced or not; bool
     """
-    def __init__(self):
-        self.__undo_or_redo_stack = []
+    def __init__(self, max_depth=None, max_bytes=None, coalesce=False):
+        self.__undo_or_redo_stack = deque()
+        self.__max_depth = max_depth
+        self.__max_bytes = max_bytes
+        self.__coalesce = coalesce
+        self.__coalescing_rules = {}
+        self.__bytes = 0
+        # Only an operation recorded right after another one can be coalesced with it (not one recorded after
+        # the top of the stack was popped)
+        self.__can_coalesce = False
+        self.__batch_depth = 0
+        self.__batch_operations = []
+        self.__listener = None
 
     def __len__(self):
         return len(self.__undo_or_redo_stack)
@@ -14,6 +106,48 @@ class UndoRedoRepository:
     # def __str__(self):
     #     return str(self.__undo_or_redo_stack)
 
+    @property
+    def size_in_bytes(self):
+        """
+        The estimated memory taken by the operations on the stack, in bytes
+        """
+        return self.__bytes
+
+    @property
+    def operations(self):
+        """
+        The (inverse_function, args) pairs on the stack, from the bottom to the top
+        """
+        return [(fn, args) for fn, args, _ in self.__undo_or_redo_stack]
+
+    def set_listener(self, listener):
+        """
+        Sets the function told about every change of the stack (e.g. to persist it, see UndoRedoLog), called
+        with ('push', fn, args), ('replace', fn, args) (the top of the stack was coalesced with a new operation),
+        ('pop',) or ('clear',); the evictions of the oldest operations are not told
+        :param listener: The function; None for no listener
+        """
+        self.__listener = listener
+
+    def restore(self, operations):
+        """
+        Puts operations on the stack as they are (neither coalesced nor told to the listener), e.g. when the
+        history is loaded from a log
+        :param operations: The (inverse_function, args) pairs, from the bottom to the top
+        """
+        for fn, args in operations:
+            self.__push(fn, args)
+        self.__can_coalesce = False
+
+    def add_coalescing_rule(self, fn, rule):
+        """
+        Registers how the consecutive operations with the function <fn> are coalesced
+        :param fn: The (inverse) function recorded on the stack
+        :param rule: Function (old_args, new_args) -> the arguments of the coalesced operation, or None if the
+        operations cannot be coalesced (see keep_first and merge_id_lists)
+        """
+        self.__coalescing_rules[fn] = rule
+
     def check_empty(self):
         """
         Checks if the stack is empty. If it is, it raises an UndoRedoException (generic exception)
@@ -21,30 +155,90 @@ class UndoRedoRepository:
         if len(self) == 0:
             raise UndoRedoException("The operation stack is empty!")
 
+    def begin_batch(self):
+        """
+        Starts (or nests) a batch: until its end, the recorded operations are kept aside (see batch)
+        """
+        self.__batch_depth += 1
+
+    def end_batch(self, repositories):
+        """
+        Ends a batch; at the end of the outermost one, the operations recorded during it are put on the stack as a
+        single CompositeOperation (a single operation is put on the stack as it is)
+        :param repositories: The repositories the composite operation runs its batch on
+        """
+        self.__batch_depth -= 1
+        if self.__batch_depth > 0:
+            return
+        operations, self.__batch_operations = self.__batch_operations, []
+        if len(operations) == 1:
+            self.record_inverse_operations(operations[0][0], *operations[0][1])
+        elif operations:
+            self.record_inverse_operations(CompositeOperation(operations, repositories))
+
     def record_inverse_operations(self, fn, *args):
         """
-        Appends a new inverse function (and its arguments) on the stack
+        Appends a new inverse function (and its arguments) on the stack, or coalesces it with the operation on
+        the top of the stack, then evicts the oldest operations while the stack is over its bounds. During a
+        batch, the operation is kept aside until the end of the batch.
         """
-        self.__undo_or_redo_stack.append((fn, args))
+        if self.__batch_depth > 0:
+            self.__batch_operations.append((fn, args))
+            return
+        coalesced = False
+        if self.__coalesce and self.__can_coalesce and fn in self.__coalescing_rules:
+            top_fn, top_args, top_size = self.__undo_or_redo_stack[-1]
+            coalesced_args = self.__coalescing_rules[fn](top_args, args) if top_fn == fn else None
+            if coalesced_args is not None:
+                self.__undo_or_redo_stack.pop()
+                self.__bytes -= top_size
+                args = coalesced_args
+                coalesced = True
+        self.__push(fn, args)
+        self.__can_coalesce = True
+        if self.__listener is not None:
+            self.__listener('replace' if coalesced else 'push', fn, args)
+
+    def __push(self, fn, args):
+        size = ENTRY_OVERHEAD + estimate_size(args)
+        if isinstance(fn, CompositeOperation):
+            size += fn.size
+        self.__undo_or_redo_stack.append((fn, args, size))
+        self.__bytes += size
+        while len(self) > 1 and ((self.__max_depth is not None and len(self) > self.__max_depth) or
+                                 (self.__max_bytes is not None and self.__bytes > self.__max_bytes)):
+            self.__bytes -= self.__undo_or_redo_stack.popleft()[2]
 
     def get_reverse_operation(self):
         """
         Pops the last inserted function on the stack and returns it
         """
-        return self.__undo_or_redo_stack.pop()
+        fn, args, size = self.__undo_or_redo_stack.pop()
+        self.__bytes -= size
+        self.__can_coalesce = False
+        if self.__listener is not None:
+            self.__listener('pop')
+        return fn, args
 
     def clear_stack(self):
         """
         Empties the stack
         """
+        was_empty = len(self) == 0
         self.__undo_or_redo_stack.clear()
+        self.__bytes = 0
+        self.__can_coalesce = False
+        # The redo stack is cleared by every new operation, so only the clearing of a non-empty stack is told
+        if self.__listener is not None and not was_empty:
+            self.__listener('clear')
 
     def see_top_of_stack(self):
         """
         Returns the (inverse_function, *args) tuple from the top of the stack. Notice: Different from
         the function get_reverse_operation(), as this function doesn't pop the top element from the stack.
         """
-        return self.__undo_or_redo_stack[-1]
+        fn, args, _ = self.__undo_or_redo_stack[-1]
+        return fn, args
 
 
 class UndoRepository(UndoRedoRepository):
@@ -0,0 +1,61 @@
+class UniqueIndex:
+    """
+    Secondary index over one attribute of the entities of a repository. Maps the normalised value of the
+    attribute to the ID of the only entity having it, so uniqueness checks and exact lookups take O(1).
+    :param attribute: The name of the indexed attribute of the entities; string
+    :param normalise: Function applied on the attribute values (and on the searched values) before they
+    are compared, e.g. to ignore the case of a name; the identity by default
+    """
+
+    def __init__(self, attribute, normalise=None):
+        self.__attribute = attribute
+        self.__normalise = (lambda value: value) if normalise is None else normalise
+        self.__ids = {}
+
+    def __len__(self):
+        return len(self.__ids)
+
+    def __contains__(self, value):
+        return self.__normalise(value) in self.__ids
+
+    @property
+    def attribute(self):
+        return self.__attribute
+
+    def get(self, value):
+        """
+        Returns the ID of the entity whose attribute matches <value> (after normalisation); None if there is none
+        """
+        return self.__ids.get(self.__normalise(value))
+
+    def conflicts_with(self, entity):
+        """
+        Checks if another entity (i.e. one with a different ID) already has the indexed value of <entity>
+        :return: True if adding/updating <entity> would break the uniqueness of the index; False otherwise
+        """
+        owner_id = self.__ids.get(self.__key(entity))
+        return owner_id is not None and owner_id != entity.id
+
+    def add(self, entity):
+        """
+        Registers the indexed value of <entity>
+        """
+        self.__ids[self.__key(entity)] = entity.id
+
+    def remove(self, entity):
+        """
+        Unregisters the indexed value of <entity> (if the value belongs to it)
+        """
+        key = self.__key(entity)
+        if self.__ids.get(key) == entity.id:
+            del self.__ids[key]
+
+    def replace(self, old_entity, new_entity):
+        """
+        Moves the index entry of <old_entity> to the value of <new_entity> (used when an entity is updated)
+        """
+        self.remove(old_entity)
+        self.add(new_entity)
+
+    def __key(self, entity):
+        return self.__normalise(getattr(entity, self.__attribute))
@@ -0,0 +1,150 @@
+import threading
+
+# from repository.in_memory_repo import Repository
+# from repository.custom_repo import Repository
+from repository.hashed_repo import Repository
+from repository.repository_exceptions import RepositoryException
+
+# The dirty entities are written to the persistent repository this often (in seconds), or as soon as there are
+# this many of them
+FLUSH_INTERVAL = 1.0
+FLUSH_COUNT = 100
+
+
+class WriteBehindRepository(Repository):
+    """
+    Write-behind wrapper of a persistent repository. The entities are copied in memory at the start and every
+    add, update and delete is applied to the in-memory copy right away, so it returns without waiting for the
+    storage; the changed IDs are only marked as dirty (several changes of the same entity are coalesced into its
+    last state). A background thread writes the dirty entities to the persistent repository, in one transaction,
+    every <flush_interval> seconds or as soon as there are <flush_count> of them. flush() writes them right away
+    and close() writes them and stops the thread, so nothing is lost on exit.
+    If a background write fails, its entities stay dirty and are written again by the next flush (writing an
+    entity only sets or removes the entity with its ID, so writing it twice is harmless); the failure is kept and
+    raised by the next flush() or close().
+    The persistent repository has to keep its entities in memory and write them from there (like the file
+    repositories do), since whether a dirty entity is added or updated is decided by its in-memory IDs, and it is
+    used by the background thread. The database repositories (thread_bound) are refused.
+    :param repository: The persistent repository (a file repository, with the interface of the in-memory ones)
+    :param flush_interval: The number of seconds between the background writes; positive number
+    :param flush_count: The number of dirty entities which triggers a background write right away; positive integer
+    """
+
+    def __init__(self, repository, flush_interval=FLUSH_INTERVAL, flush_count=FLUSH_COUNT):
+        if getattr(repository, 'thread_bound', False):
+            raise RepositoryException(f"A {type(repository).__name__} cannot be written by a background thread.")
+        super().__init__()
+        self.__repository = repository
+        self.__flush_interval = flush_interval
+        self.__flush_count = flush_count
+        for entity in repository.elements:
+            super().add_to_repo(entity)
+        # ID -> the last state of the entity (None if it was deleted), in the order of the last changes
+        self.__dirty = {}
+        self.__lock = threading.RLock()
+        self.__changed = threading.Condition(self.__lock)
+        # Only one write to the persistent repository at a time (the background one or flush())
+        self.__write_lock = threading.Lock()
+        self.__closed = False
+        # The last failure of a background write, until flush() or close() raises it
+        self.__background_error = None
+        self.__thread = threading.Thread(target=self.__run, name='write-behind', daemon=True)
+        self.__thread.start()
+
+    @property
+    def dirty_count(self):
+        """
+        The number of entities changed since they were last written to the persistent repository
+        """
+        with self.__lock:
+            return len(self.__dirty)
+
+    def __mark_dirty(self, entity_id, entity):
+        self.__dirty.pop(entity_id, None)
+        self.__dirty[entity_id] = entity
+        if len(self.__dirty) >= self.__flush_count:
+            self.__changed.notify()
+
+    def __run(self):
+        while True:
+            with self.__lock:
+                if not self.__closed and len(self.__dirty) < self.__flush_count:
+                    self.__changed.wait(self.__flush_interval)
+                if self.__closed:
+                    return
+            try:
+                self.__write_dirty()
+            except Exception as error:
+                # The entities stay dirty; the failure is raised by the next flush()
+                with self.__lock:
+                    self.__background_error = error
+
+    def __write_dirty(self):
+        with self.__write_lock:
+            with self.__lock:
+                dirty, self.__dirty = self.__dirty, {}
+            if not dirty:
+                return
+            try:
+                with self.__repository.transaction():
+                    for entity_id, entity in dirty.items():
+                        if entity is None:
+                            if entity_id in self.__repository.ids:
+                                self.__repository.delete_by_id(entity_id)
+                        elif entity_id in self.__repository.ids:
+                            self.__repository.update(entity)
+                        else:
+                            self.__repository.add_to_repo(entity)
+            except Exception:
+                with self.__lock:
+                    # The changes made in the meantime are newer than the ones which could not be written
+                    for entity_id, entity in dirty.items():
+                        if entity_id not in self.__dirty:
+                            self.__dirty[entity_id] = entity
+                raise
+
+    def flush(self):
+        """
+        Writes the dirty entities to the persistent repository
+        :raise RepositoryException: If they could not be written (they stay dirty), or if a background write failed
+        since the last flush (even if its entities have been written now)
+        """
+        with self.__lock:
+            background_error, self.__background_error = self.__background_error, None
+        try:
+            self.__write_dirty()
+        except Exception as error:
+            raise RepositoryException("The changes could not be saved - " + str(error))
+        if background_error is not None:
+            raise RepositoryException("The changes could not be saved in the background - " + str(background_error))
+
+    def close(self):
+        """
+        Stops the background thread, writes the dirty entities and closes the persistent repository (if it can be
+        closed); the repository cannot be changed anymore afterwards
+        :raise RepositoryException: If the dirty entities could not be written
+        """
+        with self.__lock:
+            self.__closed = True
+            self.__changed.notify()
+        self.__thread.join()
+        try:
+            self.flush()
+        finally:
+            if hasattr(self.__repository, 'close'):
+                self.__repository.close()
+
+    def add_to_repo(self, entity):
+        with self.__lock:
+            super().add_to_repo(entity)
+            self.__mark_dirty(entity.id, entity)
+
+    def delete_by_id(self, entity_id):
+        with self.__lock:
+            super().delete_by_id(entity_id)
+            self.__mark_dirty(entity_id, None)
+
+    def update(self, entity):
+        with self.__lock:
+            super().update(entity)
+            self.__mark_dirty(entity.id, entity)
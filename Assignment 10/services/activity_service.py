@@ -5,7 +5,10 @@ from domain.activity import Activity
 from domain.validators import ActivityIDException, \
     ActivityDateException, PersonIDException, ActivityIDValidator, ActivityTimeException, PersonNameException, \
     UndoRedoException
+from repository.undo_redo_repo import batch, keep_first, merge_id_lists
+from utils.algorithms.algorithm import Algorithm
 from utils.filter import Filter
+from utils.partial_sort import PartialSort
 from utils.sorting import Sorting
 
 
@@ -29,6 +32,14 @@ class ActivityService:
         self.__redo_repository = redo_repository
         self.__filter = Filter().filter
         self.__sort = Sorting().sort
+        self.__activity_repository.add_inverted_index('persons_id')
+        self.__activity_repository.add_interval_index('start_date_time', 'end_date_time')
+        for repository in (self.__undo_repository, self.__redo_repository):
+            repository.add_coalescing_rule(self.update_activity_start_date_time, keep_first)
+            repository.add_coalescing_rule(self.update_activity_end_date_time, keep_first)
+            repository.add_coalescing_rule(self.update_activity_description, keep_first)
+            repository.add_coalescing_rule(self.add_persons_by_id_to_activity, merge_id_lists)
+            repository.add_coalescing_rule(self.remove_persons_by_id_from_activity, merge_id_lists)
 
     def get_inverse_operation_and_args(self, fn, *args):
         """
@@ -76,6 +87,15 @@ class ActivityService:
         inverse_op, args = self.get_inverse_operation_and_args(fn, *args)
         self.__redo_repository.record_inverse_operations(inverse_op, *args)
 
+    def batch(self):
+        """
+        Returns a context manager which records all the operations done inside it (also by the other services
+        sharing the undo and redo stacks) as a single undo operation, e.g.
+            with activity_service.batch():
+                ...
+        """
+        return batch(self.__undo_repository, self.__redo_repository)
+
     def add_activity(self, activity_id, start_date_time, end_date_time, description="",
                      persons_id=None, record_undo=True, record_redo=False, as_redo=False):
         """
@@ -106,7 +126,7 @@ class ActivityService:
 
         if start_date_time > end_date_time:
             raise ActivityDateException("The end of the time interval goes after the start (duh).")
-        if activity_id in self.__activity_repository.get_all_ids():
+        if activity_id in self.__activity_repository.ids:
             raise ActivityIDException(f"An activity with the ID {activity_id} is already registered.")
         if start_date_time < datetime.datetime.now():
             raise ActivityDateException("Error! You're trying to set an activity in the past!")
@@ -191,24 +211,25 @@ class ActivityService:
             raise ActivityIDException(f"Cannot add persons to activity {activity_id} since there is no "
                                       f"activity registered under this ID.")
 
-        non_existent_ids = [id_ for id_ in passed_valid
-                            if id_ not in self.__person_repository.get_all_ids()]
-        already_registered_ids = [id_ for id_ in passed_valid
-                                  if id_ in activity_to_add_to.get_all_person_ids_in_activity()]
+        person_ids_in_repository = self.__person_repository.ids
+        person_ids_in_activity = set(activity_to_add_to.get_all_person_ids_in_activity())
+        non_existent_ids = [id_ for id_ in passed_valid if id_ not in person_ids_in_repository]
+        already_registered_ids = [id_ for id_ in passed_valid if id_ in person_ids_in_activity]
 
         not_passed_valid.extend([PersonIDException(str(non_existent_id) + " - ID not registered in the database.\n")
                                  for non_existent_id in non_existent_ids])
         not_passed_valid.extend([PersonIDException(str(already_registered_id) + " - ID is already registered "
                                                                                 "for this activity.\n")
                                  for already_registered_id in already_registered_ids])
-        passed_valid = [id_ for id_ in passed_valid
-                        if id_ not in non_existent_ids and id_ not in already_registered_ids]
+        rejected_ids = set(non_existent_ids).union(already_registered_ids)
+        passed_valid = [id_ for id_ in passed_valid if id_ not in rejected_ids]
 
+        # Only the activities overlapping this one (found through the interval index) can cause conflicts
         overlapped_person_ids = {id_: [] for id_ in passed_valid}
-        for id_ in passed_valid:
-            all_activities_of_this_person = self.get_all_activities_of_person_id(id_)
-            overlapped_person_ids[id_].extend([activity.id for activity in all_activities_of_this_person
-                                               if ActivityService.check_overlap(activity_to_add_to, activity)])
+        for activity in self.get_overlapping_activities(activity_to_add_to):
+            for id_ in activity.persons_id:
+                if id_ in overlapped_person_ids:
+                    overlapped_person_ids[id_].append(activity.id)
 
         not_passed_valid.extend([ActivityTimeException(f"{id_} - This person is registered for activities "
                                                        f"{', '.join(str(act) for act in overlap_with_activities_list)}"
@@ -255,23 +276,24 @@ class ActivityService:
             raise ActivityIDException(f"Cannot remove persons from activity {activity_id} since there is no "
                                       f"activity registered under this ID.")
 
-        non_existent_ids = [id_ for id_ in passed_valid
-                            if id_ not in self.__person_repository.get_all_ids()]
-        already_removed_ids = [id_ for id_ in passed_valid
-                               if id_ not in activity_to_remove_from.get_all_person_ids_in_activity()]
+        person_ids_in_repository = self.__person_repository.ids
+        person_ids_in_activity = set(activity_to_remove_from.get_all_person_ids_in_activity())
+        non_existent_ids = [id_ for id_ in passed_valid if id_ not in person_ids_in_repository]
+        already_removed_ids = [id_ for id_ in passed_valid if id_ not in person_ids_in_activity]
 
         not_passed_valid.extend([PersonIDException(str(non_existent_id) + " - ID not registered in the database.\n")
                                  for non_existent_id in non_existent_ids])
         not_passed_valid.extend([PersonIDException(str(already_removed_id) + " - ID is not registered for this "
                                                                              "activity.\n")
                                  for already_removed_id in already_removed_ids
-                                 if already_removed_id not in non_existent_ids])
-        passed_valid = [id_ for id_ in passed_valid
-                        if id_ not in non_existent_ids and id_ not in already_removed_ids]
+                                 if already_removed_id in person_ids_in_repository])
+        rejected_ids = set(non_existent_ids).union(already_removed_ids)
+        passed_valid = [id_ for id_ in passed_valid if id_ not in rejected_ids]
 
+        removed_ids = set(passed_valid)
         new_persons_ids = []
         for id_ in activity_to_remove_from.persons_id:
-            if id_ not in passed_valid:
+            if id_ not in removed_ids:
                 new_persons_ids.append(id_)
         updated_activity = Activity(activity_to_remove_from.id, activity_to_remove_from.start_date_time,
                                     activity_to_remove_from.end_date_time, activity_to_remove_from.description,
@@ -288,7 +310,8 @@ class ActivityService:
 
     def get_all_activities_of_person_id(self, person_id):
         """
-        Returns all the IDs of the persons which are registered for this activity
+        Returns all the activities which a person is registered for. The activities are found through the
+        person ID -> activity IDs index of the activity repository, so only the activities of this person are visited
         :param person_id: The ID of the person whose activities we want to return; positive integer
         :return: list of activities which the person is registered for
         """
@@ -298,10 +321,27 @@ class ActivityService:
             raise PersonIDException("Person ID must be an integer.")
         if person_id <= 0:
             raise PersonIDException("Person ID must be a positive integer.")
-        if person_id not in self.__person_repository.get_all_ids():
+        if person_id not in self.__person_repository.ids:
             raise PersonIDException(f"There is no person with ID {person_id} registered in the database.")
 
-        return self.__filter(self.get_all_activities(), lambda x: self.check_person_id_in_activity(x, person_id))
+        return self.__find_activities(self.__activity_repository.get_index('persons_id').get(person_id))
+
+    def get_overlapping_activities(self, activity):
+        """
+        Returns all the other activities which overlap with a given activity (see check_overlap()), found through
+        the interval index of the activity repository
+        :param activity: The activity to check; Activity class instance
+        :return: list of the overlapping activities, in ascending order of their starting datetime
+        """
+        overlapping_ids = self.__activity_repository.get_index('start_date_time').overlapping(
+            activity.start_date_time, activity.end_date_time)
+        return self.__find_activities([id_ for id_ in overlapping_ids if id_ != activity.id])
+
+    def __find_activities(self, activity_ids):
+        """
+        Returns the activities having the given IDs (IDs taken from the indexes of the activity repository)
+        """
+        return [self.__activity_repository.find_by_id(activity_id)[0] for activity_id in activity_ids]
 
     @staticmethod
     def check_person_id_in_activity(activity, person_id):
@@ -448,8 +488,7 @@ class ActivityService:
         :param description: The given description to search for in the activity database
         :return: All activities whose description match the argument <description>; list of <Activity> instances
         """
-        return self.__filter(self.get_all_activities(),
-                             lambda x: description.lower().strip() in x.description.lower().strip())
+        return self.__activity_repository.search('description', description.lower().strip(), str.lower)
 
     def search_by_datetime(self, search_datetime):
         """
@@ -461,7 +500,7 @@ class ActivityService:
         in which case it will find all activities which overlap with that exact date.
         :param search_datetime: String representing the date/time/datetime to search for; Can be '<hour>:<minute>,
         <year>/<month>/<day>', or '<year>/<month>/<day> <hour>:<minute>'
-        :return:
+        :return: All activities occupying the given date/time/datetime; list of <Activity> instances
         """
         now_datetime = datetime.datetime.now()
         helper_combined_datetimes = self.parse_input_date_time_for_activity(now_datetime, search_datetime)
@@ -477,21 +516,14 @@ class ActivityService:
                 helper_combined_datetimes.minute == now_datetime.minute:
             search_date = datetime.date(helper_combined_datetimes.year, helper_combined_datetimes.month,
                                         helper_combined_datetimes.day)
-            return self.__filter(all_activities, lambda x: datetime.date(x.start_year, x.start_month, x.start_day) <=
-                                 search_date <= datetime.date(x.end_year, x.end_month, x.end_day))
+            return self.get_activities_in_date(search_date)
 
         else:
             search_date_and_time = datetime.datetime(helper_combined_datetimes.year, helper_combined_datetimes.month,
                                                      helper_combined_datetimes.day, helper_combined_datetimes.hour,
                                                      helper_combined_datetimes.minute)
-
-            def get_start_end_info(x, start=True):
-                if start:
-                    return x.start_year, x.start_month, x.start_day, x.start_hour, x.start_minute
-                return x.end_year, x.end_month, x.end_day, x.end_hour, x.end_minute
-
-            return self.__filter(all_activities, lambda x: datetime.datetime(*get_start_end_info(x)) <=
-                                 search_date_and_time <= datetime.datetime(*get_start_end_info(x, False)))
+            activity_ids = self.__activity_repository.get_index('start_date_time').containing(search_date_and_time)
+            return self.__find_activities(activity_ids)
 
     def sorted_activities_in_given_date(self, input_date):
         """
@@ -500,13 +532,20 @@ class ActivityService:
         :return: List with all the activities sorted by their start time
         """
         search_date = self.__datetime_validator.validate(input_date)
+        # The interval index already returns the activities in ascending order of their start
+        return self.get_activities_in_date(search_date)
 
-        activities_on_date = self.__filter(self.get_all_activities(),
-                                           lambda x: datetime.date(x.start_year, x.start_month, x.start_day) <=
-                                           search_date <= datetime.date(x.end_year, x.end_month, x.end_day))
-        self.__sort(activities_on_date,
-                    lambda x: (x.start_year, x.start_month, x.start_day, x.start_hour, x.start_minute))
-        return activities_on_date
+    def get_activities_in_date(self, search_date):
+        """
+        Returns all activities which take place (at least partly) in a given date, using the interval index of the
+        activity repository
+        :param search_date: The date to search for; datetime.date variable
+        :return: List with the activities of that date, in ascending order of their start datetime
+        """
+        day_start = datetime.datetime.combine(search_date, datetime.time.min)
+        day_end = datetime.datetime.combine(search_date, datetime.time.max)
+        interval_index = self.__activity_repository.get_index('start_date_time')
+        return self.__find_activities(interval_index.touching(day_start, day_end))
 
     def search_person_by_id_or_name(self, person_info):
         """
@@ -527,30 +566,40 @@ class ActivityService:
         if isinstance(person_info, int) and person_info <= 0:
             raise PersonIDException("Person ID has to be a positive integer.")
 
-        all_persons = self.__person_repository.elements
         if isinstance(person_info, int):
-            found_person = next((person for person in all_persons if person.id == person_info), None)
+            found_person, _ = self.__person_repository.find_by_id(person_info)
             if found_person is None:
                 raise PersonIDException(f"There is no person with the ID {person_info} registered.")
 
         else:
-            found_person = next((person for person in all_persons if person.name.lower() == person_info.lower()), None)
+            # The search narrows the persons down to those whose name contains <person_info>
+            matching_persons = self.__person_repository.search('name', person_info.lower(), str.lower)
+            found_person = next((person for person in matching_persons
+                                 if person.name.lower() == person_info.lower()), None)
             if found_person is None:
                 raise PersonNameException(f"There is no person with the name {person_info.title()} registered.")
         return found_person
 
-    def activities_with_given_person(self, person_info):
+    def activities_with_given_person(self, person_info, limit=None):
         """
         Returns all activities to which a given person will participate in, sorted by their starting time
         :param person_info: String representing name if search is done by name; Integer representing person ID if
         search is done by person ID
+        :param limit: The maximum number of activities returned (the first ones, e.g. the first page of the GUI),
+        selected in O(n log limit) without sorting all of them; None for all the activities
         :return: List with all the activities that the given person will participate in, sorted by their
         starting time
         """
         found_person = self.search_person_by_id_or_name(person_info)
-        person_activities = self.__filter(self.get_all_activities(), lambda x: found_person.id in x.persons_id)
-        self.__sort(person_activities,
-                    lambda x: (x.start_year, x.start_month, x.start_day, x.start_hour, x.start_minute))
+        person_activities = self.get_all_activities_of_person_id(found_person.id)
+
+        def start(activity):
+            return activity.start_year, activity.start_month, activity.start_day, activity.start_hour, \
+                activity.start_minute
+
+        if limit is not None:
+            return PartialSort.top_k(person_activities, limit, start)
+        self.__sort(person_activities, start, algorithm=Algorithm.TIM_SORT)
         return person_activities
 
     def person_activities_per_day(self, person_info):
@@ -598,7 +647,7 @@ class ActivityService:
                     total_minutes_used.append(int(time_diff.total_seconds() / 60))
         return dates, start_times, end_times, total_minutes_used
 
-    def busiest_days_person(self, person_info):
+    def busiest_days_person(self, person_info, limit=None):
         """
         Returns the busiest days of a person, sorted in descending order of the free time in that day. Along with
         this list of busiest days, it also returns the starting time and ending time of each interval of free time.
@@ -608,16 +657,28 @@ class ActivityService:
         free time of each day
                  free_time_start - The list of the start of each free time interval in each date
                  free_time_end - The list of the end of each free time interval in each date
+        :param limit: The maximum number of days returned (the busiest ones, e.g. the first page of the GUI),
+        selected in O(n log limit); None for all the days
         """
         dates, start_times, end_times, total_minutes_used = self.person_activities_per_day(person_info)
-        sorted_dates = [date for _, date in sorted(zip(total_minutes_used, dates), reverse=False)]
-        sorted_start_times = [start_time for _, start_time in
-                              sorted(zip(total_minutes_used, start_times), reverse=False)]
-        sorted_end_times = [end_time for _, end_time in sorted(zip(total_minutes_used, end_times), reverse=False)]
-        sorted_total_minutes = sorted(total_minutes_used, reverse=False)
 
-        free_time_start = [[] for _ in range(len(dates))]
-        free_time_end = [[] for _ in range(len(dates))]
+        # The positions of the days are ordered once (by the time used, then by the date) and the lists are read
+        # in that order
+        def busyness(index):
+            return total_minutes_used[index], dates[index]
+
+        if limit is not None:
+            order = PartialSort.top_k(range(len(dates)), limit, busyness)
+        else:
+            order = list(range(len(dates)))
+            self.__sort(order, busyness, algorithm=Algorithm.TIM_SORT)
+        sorted_dates = [dates[index] for index in order]
+        sorted_start_times = [start_times[index] for index in order]
+        sorted_end_times = [end_times[index] for index in order]
+        sorted_total_minutes = [total_minutes_used[index] for index in order]
+
+        free_time_start = [[] for _ in range(len(order))]
+        free_time_end = [[] for _ in range(len(order))]
 
         for date_nr, (date, start_time, end_time, total_minutes) in enumerate(zip(sorted_dates, sorted_start_times,
                                                                                   sorted_end_times,
@@ -662,15 +723,15 @@ class ActivityService:
             raise PersonIDException(f"No person registered under the ID {person_id}.")
 
         add_to, _ = self.__persons_id_validator.validate(activity_ids)
-        all_activities = self.get_all_activities()[:]
         added_to_ids = []
-        for activity in all_activities:
-            if activity.id in add_to and person_id not in activity.persons_id:
-                new_persons_id = activity.persons_id + [person_id]
-                updated_activity = Activity(activity.id, activity.start_date_time, activity.end_date_time,
-                                            activity.description, new_persons_id)
-                self.__activity_repository.update(updated_activity)
-                added_to_ids.append(activity.id)
+        with self.__activity_repository.transaction():
+            for activity in self.__find_activities(dict.fromkeys(add_to)):
+                if activity is not None and person_id not in activity.persons_id:
+                    new_persons_id = activity.persons_id + [person_id]
+                    updated_activity = Activity(activity.id, activity.start_date_time, activity.end_date_time,
+                                                activity.description, new_persons_id)
+                    self.__activity_repository.update(updated_activity)
+                    added_to_ids.append(activity.id)
 
         added_to_ids_str = ', '.join(map(str, added_to_ids))
         if record_undo:
@@ -707,16 +768,17 @@ class ActivityService:
             activity_ids = ', '.join(map(str, self.get_all_activity_ids()))
 
         remove_from, _ = self.__persons_id_validator.validate(activity_ids)
-        all_activities = self.get_all_activities()[:]
+        remove_from = set(remove_from)
         removed_from_ids = []
-        for activity in all_activities:
-            if activity.id in remove_from and person_id in activity.persons_id:
-                new_persons_id = list(activity.persons_id)
-                new_persons_id.remove(person_id)
-                updated_activity = Activity(activity.id, activity.start_date_time, activity.end_date_time,
-                                            activity.description, new_persons_id)
-                self.__activity_repository.update(updated_activity)
-                removed_from_ids.append(activity.id)
+        with self.__activity_repository.transaction():
+            for activity in self.get_all_activities_of_person_id(person_id):
+                if activity.id in remove_from:
+                    new_persons_id = list(activity.persons_id)
+                    new_persons_id.remove(person_id)
+                    updated_activity = Activity(activity.id, activity.start_date_time, activity.end_date_time,
+                                                activity.description, new_persons_id)
+                    self.__activity_repository.update(updated_activity)
+                    removed_from_ids.append(activity.id)
 
         removed_from_ids_str = ', '.join(map(str, removed_from_ids))
         if record_undo:
@@ -729,7 +791,7 @@ class ActivityService:
         """
         Return all the activity IDs currently registered in the database as a list of ints
         """
-        return [activity.id for activity in self.get_all_activities()]
+        return self.__activity_repository.get_all_ids()
 
     @staticmethod
     def parse_input_date_time_for_activity(activity_date_time, date_time):
@@ -847,8 +909,21 @@ class ActivityService:
             s = s + f"{index + 1}) {activity}\n"
         return s
 
-    def get_busiest_days_person_string(self, person_info):
-        sorted_dates, free_time_start, free_time_end = self.busiest_days_person(person_info)
+    @staticmethod
+    def __more_string(count, limit):
+        """
+        Returns the line which tells that only the first <limit> results are shown, if there are more of them
+        (the string versions ask for one result more than <limit> to know it)
+        """
+        if limit is None or count <= limit:
+            return ""
+        return f"... (only the first {limit} are shown)\n"
+
+    def get_busiest_days_person_string(self, person_info, limit=None):
+        sorted_dates, free_time_start, free_time_end = \
+            self.busiest_days_person(person_info, None if limit is None else limit + 1)
+        more = self.__more_string(len(sorted_dates), limit)
+        sorted_dates = sorted_dates[:limit]
         s = f"These are the busiest days of {person_info}, sorted in descending order of free time in the day:\n"
         for index, (date, start, end) in enumerate(zip(sorted_dates, free_time_start, free_time_end)):
             s = s + f"{index + 1}) {str(date)}\n"
@@ -857,11 +932,13 @@ class ActivityService:
             #     pass
         #          s = s + f"\tFree from {str(s.hour).zfill(2)}:{str(s.minute).zfill(2)} to " \
         #                  f"{str(e.hour).zfill(2)}:{str(e.minute).zfill(2)}\n"
-        return s
+        return s + more
 
-    def get_activities_with_given_person_string(self, given_person):
-        sorted_person_activities = self.activities_with_given_person(given_person)
+    def get_activities_with_given_person_string(self, given_person, limit=None):
+        sorted_person_activities = self.activities_with_given_person(given_person,
+                                                                     None if limit is None else limit + 1)
+        more = self.__more_string(len(sorted_person_activities), limit)
         s = f"These are all the upcoming activities of {given_person}:\n"
-        for index, activity in enumerate(sorted_person_activities):
+        for index, activity in enumerate(sorted_person_activities[:limit]):
             s = s + f"{index + 1}) {activity}\n"
-        return s
+        return s + more
@@ -3,7 +3,7 @@ import re
 
 from domain.person import Person
 from domain.validators import PersonIDException, PersonNameException, PersonPhoneNumberException, UndoRedoException
-from utils.filter import Filter
+from repository.undo_redo_repo import batch, keep_first
 
 
 class PersonService:
@@ -22,7 +22,11 @@ class PersonService:
         self.__phone_number_validator = phone_number_validator
         self.__undo_repository = undo_repository
         self.__redo_repository = redo_repository
-        self.__filter = Filter().filter
+        self.__person_repository.add_unique_index('name', PersonService.normalise_name)
+        self.__person_repository.add_unique_index('phone_number', PersonService.normalise_phone_number)
+        for repository in (self.__undo_repository, self.__redo_repository):
+            repository.add_coalescing_rule(self.update_person_name, keep_first)
+            repository.add_coalescing_rule(self.update_person_phone_number, keep_first)
 
     def get_inverse_operation_and_args(self, fn, *args):
         """
@@ -64,6 +68,15 @@ class PersonService:
         inverse_op, args = self.get_inverse_operation_and_args(fn, *args)
         self.__redo_repository.record_inverse_operations(inverse_op, *args)
 
+    def batch(self):
+        """
+        Returns a context manager which records all the operations done inside it (also by the other services
+        sharing the undo and redo stacks) as a single undo operation, e.g.
+            with person_service.batch():
+                ...
+        """
+        return batch(self.__undo_repository, self.__redo_repository)
+
     def add_person(self, person_id, name, phone_number, record_undo=True, record_redo=False, as_redo=False):
         """
         Adds a new person to the person repository
@@ -99,11 +112,11 @@ class PersonService:
 
         if person_id <= 0:
             raise PersonIDException("Error! The person ID must be a positive integer!")
-        if person_id in self.__person_repository.get_all_ids():
+        if person_id in self.__person_repository.ids:
             raise PersonIDException(f"The ID '{person_id}' is already registered.")
-        if name in self.get_all_names():
+        if name in self.__person_repository.get_index('name'):
             raise PersonNameException(f"The name '{name}' is already registered.")
-        if phone_number in self.get_all_phone_numbers():
+        if phone_number in self.__person_repository.get_index('phone_number'):
             raise PersonPhoneNumberException(f"The phone number '{phone_number}' is already registered.")
 
         new_person = Person(person_id, name, phone_number)
@@ -172,7 +185,7 @@ class PersonService:
         if person_id <= 0:
             raise PersonIDException("Error! The person ID has to be a positive integer!")
 
-        if new_phone_number in self.get_all_phone_numbers():
+        if new_phone_number in self.__person_repository.get_index('phone_number'):
             raise PersonPhoneNumberException(f"Error! The phone number '{new_phone_number}' is already registered.")
 
         person, _ = self.find_person_by_id(person_id)
@@ -214,7 +227,7 @@ class PersonService:
             raise PersonIDException("Error! The person ID has to be a positive integer!")
 
         person_new_name = person_new_name.strip().title()
-        if person_new_name in self.get_all_names():
+        if person_new_name in self.__person_repository.get_index('name'):
             raise PersonNameException(f"Error! The name '{person_new_name}' is already registered in the database.")
 
         person, _ = self.find_person_by_id(person_id)
@@ -293,7 +306,7 @@ class PersonService:
         :param name: The string the program will search for in the persons database
         :return: All persons whose name match the argument <name>; list of <Person> instances
         """
-        return self.__filter(self.get_all_persons(), lambda x: name.lower().strip() in x.name.lower().strip())
+        return self.__person_repository.search('name', name.lower().strip(), str.lower)
 
     def search_by_phone_number(self, phone_number):
         """
@@ -308,18 +321,38 @@ class PersonService:
         phone_number = phone_number.replace(' ', '')
         phone_number = phone_number.replace('-', '')
         phone_number = phone_number.replace('+4', '')
-        return self.__filter(self.get_all_persons(), lambda x: phone_number in x.phone_number.replace(' ', ''))
+        if len(phone_number) == 10:
+            # A full phone number can only match exactly, so the phone number index answers directly
+            person_id = self.__person_repository.get_index('phone_number').get(phone_number)
+            found_person, _ = self.__person_repository.find_by_id(person_id)
+            return [] if found_person is None else [found_person]
+        return self.__person_repository.search('phone_number', phone_number, lambda value: value.replace(' ', ''))
+
+    @staticmethod
+    def normalise_name(name):
+        """
+        Returns the form of a name used by the unique name index (case and extra whitespace are ignored)
+        """
+        return ' '.join(name.split()).lower()
+
+    @staticmethod
+    def normalise_phone_number(phone_number):
+        """
+        Returns the form of a phone number used by the unique phone number index (only the digits are kept)
+        """
+        return ''.join(char for char in phone_number if char.isdigit())
 
     def fill_repo_with_random_persons(self, n=10, id_lb=1, id_ub=100):
         """
-        Fills the repository with randomly generated persons
+        Fills the repository with randomly generated persons (undone in one step)
         :param n: How many random persons to fill the person repository with
         :param id_lb: The lower bound of the random IDs to be generated
         :param id_ub: The upper bound of the random IDs to be generated
         """
         random_ids, random_names, random_phone_numbers = self.generate_random_persons(n, id_lb, id_ub)
-        for id_, name, phone_num in zip(random_ids, random_names, random_phone_numbers):
-            self.add_person(id_, ' '.join(name), phone_num)
+        with self.__person_repository.transaction(), self.batch():
+            for id_, name, phone_num in zip(random_ids, random_names, random_phone_numbers):
+                self.add_person(id_, ' '.join(name), phone_num)
 
     def generate_random_persons(self, n=10, id_lb=1, id_ub=100):
         """
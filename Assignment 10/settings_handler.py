@@ -14,7 +14,14 @@ class Settings:
         self._repo_type = self._reader['Settings']['repository']
         self._files = []
         self._gui = False
+        self._write_behind = False
+        self._undo_depth = None
+        self._undo_memory = None
+        self._undo_coalesce = True
+        self._undo_log = False
         self._set_ui()
+        self._set_write_behind()
+        self._set_undo()
         self._set_files()
 
     def _set_ui(self):
@@ -22,12 +29,31 @@ class Settings:
         if ui_type.lower() == 'gui':
             self._gui = True
 
+    def _set_write_behind(self):
+        write_behind = self._reader['Settings'].get('write_behind', 'false').replace('"', '')
+        if write_behind.lower() == 'true':
+            self._write_behind = True
+
+    def _set_undo(self):
+        settings = self._reader['Settings']
+        try:
+            undo_depth = int(settings.get('undo_depth', '1000').replace('"', ''))
+            undo_memory = int(settings.get('undo_memory', '16777216').replace('"', ''))
+        except ValueError:
+            raise SettingsException("Invalid settings. The undo depth and memory should be integers.")
+        # 0 (or a negative value) means no limit
+        self._undo_depth = undo_depth if undo_depth > 0 else None
+        self._undo_memory = undo_memory if undo_memory > 0 else None
+        self._undo_coalesce = settings.get('undo_coalesce', 'true').replace('"', '').lower() == 'true'
+        self._undo_log = settings.get('undo_log', 'false').replace('"', '').lower() == 'true'
+
     def _set_files(self):
         if self._repo_type == 'inmemory':
             return None
-        elif self._repo_type == 'database':
+        elif self._repo_type in ('database', 'database_lazy'):
             self._files.append('sql_data.db')
-        elif self._repo_type in ('binaryfiles', 'textfiles', 'jsonfiles'):
+        elif self._repo_type in ('binaryfiles', 'textfiles', 'jsonfiles', 'binaryjournal', 'textjournal',
+                                 'jsonjournal', 'compactbinary'):
             self._files.append(self._reader['Settings']['persons'].replace('"', ''))
             self._files.append(self._reader['Settings']['activities'].replace('"', ''))
 
@@ -39,6 +65,26 @@ class Settings:
     def gui(self):
         return self._gui
 
+    @property
+    def write_behind(self):
+        return self._write_behind
+
+    @property
+    def undo_depth(self):
+        return self._undo_depth
+
+    @property
+    def undo_memory(self):
+        return self._undo_memory
+
+    @property
+    def undo_coalesce(self):
+        return self._undo_coalesce
+
+    @property
+    def undo_log(self):
+        return self._undo_log
+
     @property
     def files(self):
         return self._files
@@ -46,8 +92,22 @@ class Settings:
 
 """
 All possible (accepted) settings:
-repository - inmemory, textfiles, binaryfiles, jsonfiles, database
-persons - "", "persons.txt", "persons.pickle", "persons.json", ""
-activities - "", "activities.txt", "activities.pickle", "activities.json", ""
+repository - inmemory, textfiles, binaryfiles, jsonfiles, database, database_lazy, textjournal, binaryjournal,
+             jsonjournal (the *journal values keep the files of the corresponding *files value, plus a journal),
+             compactbinary (memory-mapped files of fixed-size records, plus a journal of the changes)
+persons - "", "persons.txt", "persons.pickle", "persons.json", "", "", "persons.cbr"
+activities - "", "activities.txt", "activities.pickle", "activities.json", "", "", "activities.cbr"
 ui - "Console", "GUI"
+write_behind - "true", "false" (optional, "false" by default; with "true", the changes are written to the files by a
+               background thread, see repository/write_behind_repo.py; ignored for inmemory, database and
+               database_lazy)
+undo_depth - the maximum number of operations kept for undo (and for redo); optional, 1000 by default, 0 for no limit
+undo_memory - the maximum memory (in bytes) of the operations kept for undo (and for redo); optional, 16777216
+              (16 MB) by default, 0 for no limit. Over either limit, the oldest operations are forgotten
+undo_coalesce - "true", "false" (optional, "true" by default; with "true", consecutive updates of the same field of
+                the same person or activity, and consecutive additions or removals of persons to or from the same
+                activity, are undone at once)
+undo_log - "true", "false" (optional, "false" by default; with "true", the undo and redo history is kept in
+           data/<persons file>.undo.log (data/sql_data.db.undo.log for the databases), so it is restored after a
+           restart, see repository/undo_redo_log.py; ignored for the inmemory repository)
 """
\ No newline at end of file
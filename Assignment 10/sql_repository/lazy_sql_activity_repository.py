@@ -0,0 +1,177 @@
+from domain.activity import Activity
+from repository.repository_exceptions import RepositoryException
+from sql_repository.lazy_sql_repository import LazySqlRepository
+from sql_repository.schema import SORTABLE_END as END, SORTABLE_START as START
+from sql_repository.sql_activity_repository import SqlActivityRepository
+
+
+class SqlParticipantIndex:
+    """
+    Inverted index person ID -> activity IDs of a lazy SQL activity repository, with the same interface as
+    repository.inverted_index.InvertedIndex. The activity_person table already is such an index (with an SQLite
+    index on ID_Person), so the index only queries it; the repository keeps the table up to date.
+    """
+
+    def __init__(self, connection):
+        self.__connection = connection
+
+    def __contains__(self, person_id):
+        return self.__connection.execute("SELECT 1 FROM activity_person WHERE ID_Person = ?;",
+                                         (person_id,)).fetchone() is not None
+
+    @property
+    def attribute(self):
+        return 'persons_id'
+
+    def get(self, person_id):
+        """
+        Returns the IDs of the activities of the person with ID <person_id>, as a new list
+        """
+        rows = self.__connection.execute("SELECT ID_Activity FROM activity_person WHERE ID_Person = ? ORDER BY rowid;",
+                                         (person_id,))
+        return [row[0] for row in rows]
+
+    def conflicts_with(self, entity):
+        return False
+
+    def add(self, entity):
+        pass
+
+    def remove(self, entity):
+        pass
+
+    def replace(self, old_entity, new_entity):
+        pass
+
+
+class SqlIntervalIndex:
+    """
+    Interval index of a lazy SQL activity repository, with the same interface as
+    repository.interval_index.IntervalIndex. The queries run on the SQLite index of the activities table over
+    the (sortable) start and end datetimes; the repository keeps the table up to date.
+    """
+
+    def __init__(self, connection):
+        self.__connection = connection
+
+    @property
+    def attribute(self):
+        return 'start_date_time'
+
+    def overlapping(self, start, end):
+        """
+        Returns the IDs of the activities that start before <end> and end after <start>
+        :return: List of activity IDs, in ascending order of their start
+        """
+        return self.__query(('<', end), ('>', start))
+
+    def containing(self, instant):
+        """
+        Returns the IDs of the activities whose (closed) interval contains <instant>
+        """
+        return self.touching(instant, instant)
+
+    def touching(self, start, end):
+        """
+        Returns the IDs of the activities whose (closed) interval has at least one point in common with the closed
+        interval [start, end]
+        :return: List of activity IDs, in ascending order of their start
+        """
+        return self.__query(('<=', end), ('>=', start))
+
+    def conflicts_with(self, entity):
+        return False
+
+    def add(self, entity):
+        pass
+
+    def remove(self, entity):
+        pass
+
+    def replace(self, old_entity, new_entity):
+        pass
+
+    def __query(self, start_condition, end_condition):
+        start_operator, start_key = self.__minute_bound(*start_condition)
+        end_operator, end_key = self.__minute_bound(*end_condition)
+        sql_command = f"SELECT ID FROM activities WHERE {START} {start_operator} ? AND {END} {end_operator} ? " \
+                      f"ORDER BY {START}, {END}, ID;"
+        return [row[0] for row in self.__connection.execute(sql_command, (start_key, end_key))]
+
+    @staticmethod
+    def __minute_bound(operator, value):
+        """
+        The stored datetimes only have minutes, so 'column <operator> value' is rewritten as a comparison with the
+        minute of <value>; if <value> falls between two minutes, '<' and '>=' have to include/exclude that minute
+        """
+        if value.second or value.microsecond:
+            operator = {'<': '<=', '>=': '>'}.get(operator, operator)
+        return operator, value.strftime('%Y%m%d%H%M')
+
+
+class LazySqlActivityRepository(LazySqlRepository):
+    """
+    Activity repository which reads the activities (and their persons) from the 'activities' and 'activity_person'
+    tables on demand (see LazySqlRepository)
+    """
+
+    def __init__(self, file_name, cache_size=1024, read_only=False):
+        super().__init__(file_name, 'activities', {'id': 'ID', 'start_date_time': 'StartDateTime',
+                                                   'end_date_time': 'EndDateTime', 'description': 'Description'},
+                         cache_size, read_only)
+
+    def add_inverted_index(self, attribute):
+        if attribute != 'persons_id':
+            raise RepositoryException(f"The repository cannot index the attribute {attribute}.")
+        self._set_index(attribute, SqlParticipantIndex(self.connection))
+
+    def add_interval_index(self, start_attribute, end_attribute):
+        if (start_attribute, end_attribute) != ('start_date_time', 'end_date_time'):
+            raise RepositoryException(f"The repository cannot index the interval {start_attribute}-{end_attribute}.")
+        self._set_index(start_attribute, SqlIntervalIndex(self.connection))
+
+    def _entities_from_rows(self, rows):
+        if not rows:
+            return []
+        # The persons of all the activities are read with one query
+        persons_of_activity = {row[0]: [] for row in rows}
+        placeholders = ', '.join('?' * len(persons_of_activity))
+        sql_command = f"SELECT ID_Activity, ID_Person FROM activity_person WHERE ID_Activity IN ({placeholders}) " \
+                      f"ORDER BY rowid;"
+        for activity_id, person_id in self.connection.execute(sql_command, tuple(persons_of_activity)):
+            persons_of_activity[activity_id].append(person_id)
+        return [Activity(activity_id, SqlActivityRepository.parse_sql_string_to_datetime(start),
+                         SqlActivityRepository.parse_sql_string_to_datetime(end), description,
+                         persons_of_activity[activity_id])
+                for activity_id, start, end, description in rows]
+
+    def _insert_rows(self, entity):
+        new_entry = (entity.id, SqlActivityRepository.parse_datetime_to_sql_string(entity.start_date_time),
+                     SqlActivityRepository.parse_datetime_to_sql_string(entity.end_date_time), entity.description)
+        sql_command = "INSERT INTO activities (ID, StartDateTime, EndDateTime, Description) VALUES (?, ?, ?, ?);"
+        self.connection.execute(sql_command, new_entry)
+        sql_command = "INSERT INTO activity_person (ID_Activity, ID_Person) VALUES (?, ?);"
+        self.connection.executemany(sql_command, [(entity.id, person_id) for person_id in entity.persons_id])
+
+    def _update_rows(self, old_entity, entity):
+        if (old_entity.start_date_time, old_entity.end_date_time, old_entity.description) != \
+                (entity.start_date_time, entity.end_date_time, entity.description):
+            update_helper = (SqlActivityRepository.parse_datetime_to_sql_string(entity.start_date_time),
+                             SqlActivityRepository.parse_datetime_to_sql_string(entity.end_date_time),
+                             entity.description, entity.id)
+            sql_command = "UPDATE activities SET StartDateTime = ?, EndDateTime = ?, Description = ? WHERE ID = ?;"
+            self.connection.execute(sql_command, update_helper)
+
+        # Only the persons which were removed from or added to the activity are touched
+        old_person_ids = set(old_entity.persons_id)
+        new_person_ids = set(entity.persons_id)
+        sql_command = "DELETE FROM activity_person WHERE ID_Activity = ? AND ID_Person = ?;"
+        self.connection.executemany(sql_command, [(entity.id, person_id) for person_id in old_entity.persons_id
+                                                  if person_id not in new_person_ids])
+        sql_command = "INSERT INTO activity_person (ID_Activity, ID_Person) VALUES (?, ?);"
+        self.connection.executemany(sql_command, [(entity.id, person_id) for person_id in entity.persons_id
+                                                  if person_id not in old_person_ids])
+
+    def _delete_rows(self, entity_id):
+        self.connection.execute("DELETE FROM activities WHERE ID = ?;", (entity_id,))
+        self.connection.execute("DELETE FROM activity_person WHERE ID_Activity = ?;", (entity_id,))
@@ -0,0 +1,28 @@
+from domain.person import Person
+from sql_repository.lazy_sql_repository import LazySqlRepository
+
+
+class LazySqlPersonRepository(LazySqlRepository):
+    """
+    Person repository which reads the persons from the 'persons' table on demand (see LazySqlRepository)
+    """
+
+    def __init__(self, file_name, cache_size=1024, read_only=False):
+        super().__init__(file_name, 'persons', {'id': 'ID', 'name': 'Name', 'phone_number': 'PhoneNumber'},
+                         cache_size, read_only)
+
+    def _entities_from_rows(self, rows):
+        return [Person(row[0], row[1], row[2]) for row in rows]
+
+    def _insert_rows(self, entity):
+        new_entry = (entity.id, entity.name, entity.phone_number)
+        sql_command = "INSERT INTO persons (ID, Name, PhoneNumber) VALUES (?, ?, ?);"
+        self.connection.execute(sql_command, new_entry)
+
+    def _update_rows(self, old_entity, entity):
+        update_helper = (entity.name, entity.phone_number, entity.id)
+        sql_command = "UPDATE persons SET Name = ?, PhoneNumber = ? WHERE ID = ?;"
+        self.connection.execute(sql_command, update_helper)
+
+    def _delete_rows(self, entity_id):
+        self.connection.execute("DELETE FROM persons WHERE ID = ?;", (entity_id,))
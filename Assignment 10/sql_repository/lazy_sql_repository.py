@@ -0,0 +1,385 @@
+import sqlite3
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from repository.indexed_repo import IndexedRepository
+from repository.repository_exceptions import AddException, DeleteException, RepositoryException
+from sql_repository import schema
+
+# Number of rows read from the database at once while iterating over a table (it also has to stay below the
+# maximum number of parameters of an SQLite statement, since the IDs of a batch can be bound in an 'IN (...)')
+BATCH_SIZE = 500
+
+
+class SqlIdView:
+    """
+    Live, read-only view of the IDs of a lazy SQL repository; 'in' and len() are answered by the database
+    """
+
+    def __init__(self, repository):
+        self.__repository = repository
+
+    def __contains__(self, entity_id):
+        return self.__repository.contains_id(entity_id)
+
+    def __len__(self):
+        return len(self.__repository)
+
+    def __iter__(self):
+        return iter(self.__repository.get_all_ids())
+
+
+class SqlEntityView:
+    """
+    Read-only sequence of all the entities of a lazy SQL repository. The entities are read from the database
+    in batches while iterating, so the table is never loaded in memory at once; len() is a COUNT query and
+    indexing reads one row (slicing copies the entities into a list, like slicing a list does).
+    """
+
+    def __init__(self, repository):
+        self.__repository = repository
+
+    def __len__(self):
+        return len(self.__repository)
+
+    def __iter__(self):
+        return self.__repository.iter_entities()
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return list(self)[position]
+        if position < 0:
+            position += len(self)
+        entities = self.__repository.select_entities("ORDER BY ID LIMIT 1 OFFSET ?", (max(position, 0),))
+        if position < 0 or not entities:
+            raise IndexError("Repository index out of range.")
+        return entities[0]
+
+
+class SqlUniqueIndex:
+    """
+    Unique index of a lazy SQL repository, with the same interface as repository.unique_index.UniqueIndex.
+    The normalised values are computed by Python (the normalising function is registered in the connection), so
+    they are kept in a temporary table of the connection, which SQLite indexes and stores on disk and which is
+    dropped when the connection is closed; it is filled once, when the index is declared.
+    :param connection: The connection to the database of the repository
+    :param table: The table of the indexed entities; string
+    :param column: The column of the indexed attribute; string
+    :param attribute: The name of the indexed attribute of the entities; string
+    :param normalise: Function applied on the attribute values (and on the searched values) before they
+    are compared; the identity by default
+    :raise RepositoryException: If two entities already in the table have the same normalised value
+    """
+
+    def __init__(self, connection, table, column, attribute, normalise=None):
+        self.__connection = connection
+        self.__attribute = attribute
+        self.__normalise = (lambda value: value) if normalise is None else normalise
+        self.__key_table = f"{table}_{attribute}_index"
+        function_name = f"normalise_{table}_{attribute}"
+        self.__connection.create_function(function_name, 1, self.__normalise, deterministic=True)
+        self.__connection.execute(f"DROP TABLE IF EXISTS temp.{self.__key_table};")
+        self.__connection.execute(f"CREATE TEMP TABLE {self.__key_table} (Value PRIMARY KEY, ID INTEGER NOT NULL);")
+        try:
+            self.__connection.execute(f"INSERT INTO temp.{self.__key_table} (Value, ID) "
+                                      f"SELECT {function_name}({column}), ID FROM {table};")
+        except sqlite3.IntegrityError:
+            raise RepositoryException(f"The {attribute} of the entities is not unique.")
+
+    def __len__(self):
+        return self.__connection.execute(f"SELECT COUNT(*) FROM temp.{self.__key_table};").fetchone()[0]
+
+    def __contains__(self, value):
+        return self.get(value) is not None
+
+    @property
+    def attribute(self):
+        return self.__attribute
+
+    def get(self, value):
+        """
+        Returns the ID of the entity whose attribute matches <value> (after normalisation); None if there is none
+        """
+        row = self.__connection.execute(f"SELECT ID FROM temp.{self.__key_table} WHERE Value = ?;",
+                                        (self.__normalise(value),)).fetchone()
+        return None if row is None else row[0]
+
+    def conflicts_with(self, entity):
+        """
+        Checks if another entity (i.e. one with a different ID) already has the indexed value of <entity>
+        """
+        owner_id = self.get(getattr(entity, self.__attribute))
+        return owner_id is not None and owner_id != entity.id
+
+    def add(self, entity):
+        self.__connection.execute(f"INSERT OR REPLACE INTO temp.{self.__key_table} (Value, ID) VALUES (?, ?);",
+                                  (self.__key(entity), entity.id))
+
+    def remove(self, entity):
+        self.__connection.execute(f"DELETE FROM temp.{self.__key_table} WHERE Value = ? AND ID = ?;",
+                                  (self.__key(entity), entity.id))
+
+    def replace(self, old_entity, new_entity):
+        self.remove(old_entity)
+        self.add(new_entity)
+
+    def __key(self, entity):
+        return self.__normalise(getattr(entity, self.__attribute))
+
+
+class LazySqlRepository(IndexedRepository, ABC):
+    """
+    Generic repository which leaves its entities in an SQLite table instead of copying them in memory: lookups,
+    ID membership checks, iteration and searches are SQL queries, and a bounded LRU cache keeps the entities that
+    were looked up recently (the indexes the queries rely on are created by the schema module). It has the
+    interface of the in-memory repositories (plus search()), so the services work with it unchanged. One
+    difference: elements and get_all_ids() are in ascending order of the IDs (the batches are read by keyset
+    pagination on the primary key), not in the order the entities were added in; the same order the eager SQL
+    repositories load the tables in.
+    The subclasses describe their table and turn rows into entities and back (the abstract methods below).
+    :param file_name: The path of the SQLite database; string
+    :param table: The table of the entities; string
+    :param columns: Dictionary attribute name -> column name, for every attribute stored in the table
+    (the ID included, as 'id' -> 'ID')
+    :param cache_size: The maximum number of entities kept in the LRU cache; positive integer
+    :param read_only: If the database is opened read-only, without migrating it (see schema.connect()); bool
+    """
+
+    # The SQLite connection can only be used by the thread which opened it, so the repository cannot be wrapped in
+    # a WriteBehindRepository (its writes are made by a background thread)
+    thread_bound = True
+
+    def __init__(self, file_name, table, columns, cache_size=1024, read_only=False):
+        super().__init__()
+        self.__file_name = file_name
+        self.__read_only = read_only
+        self.__connection = self._create_connection()
+        self.__transaction_depth = 0
+        self.__table = table
+        self.__columns = columns
+        self.__cache = OrderedDict()
+        self.__cache_size = cache_size
+
+    def _create_connection(self):
+        return schema.connect(self.__file_name, self.__read_only)
+
+    @property
+    def connection(self):
+        return self.__connection
+
+    def _commit(self):
+        # Inside a transaction the commit is left to the end of the transaction
+        if self.__transaction_depth != 0:
+            return
+        try:
+            self.__connection.commit()
+        except sqlite3.Error as error:
+            # E.g. a foreign key violation (they are checked when committing); nothing of the transaction is kept
+            self.__connection.rollback()
+            self.__cache.clear()
+            raise RepositoryException(f"The changes could not be saved in the database: {error}")
+
+    @contextmanager
+    def transaction(self):
+        """
+        Unit of work: all the changes made inside the 'with repo.transaction():' block are committed once, at the
+        end of the outermost block. If the block raises an exception, its changes are rolled back and the cache is
+        emptied, so no entity changed by the block is served from it.
+        """
+        self.__transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self.__transaction_depth -= 1
+            if self.__transaction_depth == 0:
+                self.__connection.rollback()
+                self.__cache.clear()
+            raise
+        self.__transaction_depth -= 1
+        self._commit()
+
+    def __len__(self):
+        return self.__connection.execute(f"SELECT COUNT(*) FROM {self.__table};").fetchone()[0]
+
+    def contains_id(self, entity_id):
+        """
+        Checks if there is an entity with ID <entity_id> (primary key lookup, unless the entity is cached)
+        """
+        if entity_id in self.__cache:
+            return True
+        return self.__connection.execute(f"SELECT 1 FROM {self.__table} WHERE ID = ?;",
+                                         (entity_id,)).fetchone() is not None
+
+    def get_all_ids(self):
+        """
+        Returns all the entity IDs, in ascending order
+        """
+        return [row[0] for row in self.__connection.execute(f"SELECT ID FROM {self.__table} ORDER BY ID;")]
+
+    @property
+    def ids(self):
+        """
+        Live, read-only view of the entity IDs; supports 'in' and len(), both answered by the database
+        """
+        return SqlIdView(self)
+
+    @property
+    def elements(self):
+        """
+        Read-only view of all the entities, in ascending order of their IDs, read in batches while iterating
+        """
+        return SqlEntityView(self)
+
+    def select_entities(self, clause="", parameters=()):
+        """
+        Reads the entities selected by an SQL clause (WHERE/ORDER BY/LIMIT) on the table of the repository
+        :return: List with the selected entities
+        """
+        columns = ', '.join(self.__columns.values())
+        rows = self.__connection.execute(f"SELECT {columns} FROM {self.__table} {clause};", parameters).fetchall()
+        return self._entities_from_rows(rows)
+
+    def iter_entities(self):
+        """
+        Generates all the entities in ascending order of their IDs, reading them BATCH_SIZE at a time (every batch
+        is a separate query, so the repository can be changed while iterating)
+        """
+        last_id = None
+        while True:
+            if last_id is None:
+                batch = self.select_entities("ORDER BY ID LIMIT ?", (BATCH_SIZE,))
+            else:
+                batch = self.select_entities("WHERE ID > ? ORDER BY ID LIMIT ?", (last_id, BATCH_SIZE))
+            yield from batch
+            if len(batch) < BATCH_SIZE:
+                return
+            last_id = batch[-1].id
+
+    def search(self, attribute, text, normalise=None):
+        """
+        Returns the entities whose attribute <attribute> contains the string <text> (partial string matching); the
+        search runs in SQLite, only the matching entities are read
+        :param attribute: The name of the searched attribute; string
+        :param text: The string to search for
+        :param normalise: Function applied on the attribute values before searching them; None for identity
+        :return: List with the matching entities, in ascending order of their IDs
+        """
+        column = self.__columns[attribute]
+        if normalise is not None:
+            function_name = f"search_{self.__table}_{attribute}"
+            self.__connection.create_function(function_name, 1, normalise, deterministic=True)
+            column = f"{function_name}({column})"
+        return self.select_entities(f"WHERE instr({column}, ?) > 0 ORDER BY ID", (text,))
+
+    def add_unique_index(self, attribute, normalise=None):
+        """
+        Declares a unique secondary index over an attribute of the entities (see SqlUniqueIndex)
+        :raise RepositoryException: If two entities already in the repository have the same indexed value
+        """
+        self._set_index(attribute, SqlUniqueIndex(self.__connection, self.__table, self.__columns[attribute],
+                                                  attribute, normalise))
+        self._commit()
+
+    def add_inverted_index(self, attribute):
+        """
+        Declares an inverted index over a list attribute of the entities; only the subclasses which store such
+        an attribute support it
+        :raise RepositoryException: If the attribute cannot be indexed
+        """
+        raise RepositoryException(f"The repository cannot index the attribute {attribute}.")
+
+    def add_interval_index(self, start_attribute, end_attribute):
+        """
+        Declares an interval index over the [start, end] intervals of the entities; only the subclasses which
+        store such attributes support it
+        :raise RepositoryException: If the attributes cannot be indexed
+        """
+        raise RepositoryException(f"The repository cannot index the interval {start_attribute}-{end_attribute}.")
+
+    def find_by_id(self, entity_id):
+        """
+        Finds an entity by ID, in the cache or else in the database (the found entity becomes the most recently
+        used entity of the cache)
+        :param entity_id: The ID of the entity to be searched; integer
+        :return: The entity with ID <entity_id> and None (there is no position in memory to return) if it was
+        found in the repository; (None, None) otherwise
+        """
+        entity = self.__cache.get(entity_id)
+        if entity is None:
+            entities = self.select_entities("WHERE ID = ?", (entity_id,))
+            if not entities:
+                return None, None
+            entity = entities[0]
+        self.__remember(entity)
+        return entity, None
+
+    def add_to_repo(self, entity):
+        """
+        Adds a new entity to the repository
+        :raise AddException: if the entity is already in the repository
+        """
+        if self.contains_id(entity.id):
+            raise AddException("The entity is already in the repository.")
+        self._check_unique(entity, AddException)
+        self._insert_rows(entity)
+        self._index_add(entity)
+        self._commit()
+        self.__remember(entity)
+
+    def delete_by_id(self, entity_id):
+        """
+        Deletes an entity from the repository by ID
+        :raise DeleteException: If there is no entity with ID <entity_id> in the repository
+        """
+        entity, _ = self.find_by_id(entity_id)
+        if entity is None:
+            raise DeleteException("The entity is not in the repository.")
+        self._delete_rows(entity_id)
+        self._index_remove(entity)
+        self._commit()
+        del self.__cache[entity_id]
+
+    def update(self, entity):
+        """
+        Updates an entity of the repository
+        :raise RepositoryException: If the entity does not exist in the repository
+        """
+        old_entity, _ = self.find_by_id(entity.id)
+        if old_entity is None:
+            raise RepositoryException("The entity to be updated doesn't exist.")
+        self._check_unique(entity, RepositoryException)
+        self._update_rows(old_entity, entity)
+        self._index_replace(old_entity, entity)
+        self._commit()
+        self.__remember(entity)
+
+    def __remember(self, entity):
+        self.__cache[entity.id] = entity
+        self.__cache.move_to_end(entity.id)
+        if len(self.__cache) > self.__cache_size:
+            self.__cache.popitem(last=False)
+
+    @abstractmethod
+    def _entities_from_rows(self, rows):
+        """
+        Returns the list of entities of the rows of the table (with the columns in the order of <columns>)
+        """
+
+    @abstractmethod
+    def _insert_rows(self, entity):
+        """
+        Inserts the rows of a new entity (without committing)
+        """
+
+    @abstractmethod
+    def _update_rows(self, old_entity, entity):
+        """
+        Updates the rows of <old_entity> to the values of <entity> (without committing)
+        """
+
+    @abstractmethod
+    def _delete_rows(self, entity_id):
+        """
+        Deletes the rows of the entity with ID <entity_id> (without committing)
+        """
@@ -0,0 +1,118 @@
+"""
+Schema of the SQLite database used by the SQL repositories, and its migrations.
+
+The version of the schema of a database is kept in its 'user_version' header field; connect() brings the database
+up to the latest version by running the migrations it has not run yet (every migration runs in one transaction,
+together with the update of the version, so a failed migration leaves the database at the previous version).
+A database created by the first versions of the application (tables only, no version) is at version 0.
+"""
+import os
+import sqlite3
+from urllib.request import pathname2url
+
+from repository.repository_exceptions import RepositoryException
+
+# The datetimes are stored as 'DD/MM/YYYY HH:MM', which does not sort chronologically; this expression turns
+# such a column into 'YYYYMMDDHHMM', which does (the activities table is indexed on it)
+SORTABLE_DATETIME = "(substr({0}, 7, 4) || substr({0}, 4, 2) || substr({0}, 1, 2) || substr({0}, 12, 2) || " \
+                    "substr({0}, 15, 2))"
+SORTABLE_START = SORTABLE_DATETIME.format('StartDateTime')
+SORTABLE_END = SORTABLE_DATETIME.format('EndDateTime')
+
+MIGRATIONS = [
+    # 1: The tables (they already exist in the databases created before the schema was versioned)
+    """
+    CREATE TABLE IF NOT EXISTS persons (ID INTEGER PRIMARY KEY, Name TEXT NOT NULL, PhoneNumber TEXT UNIQUE);
+    CREATE TABLE IF NOT EXISTS activities (ID INTEGER PRIMARY KEY, StartDateTime TEXT NOT NULL,
+                                           EndDateTime TEXT NOT NULL, Description TEXT);
+    CREATE TABLE IF NOT EXISTS activity_person (ID_Activity INTEGER, ID_Person INTEGER);
+    """,
+    # 2: Foreign keys on activity_person; SQLite can only add them by rebuilding the table (the links to
+    # activities or persons which do not exist anymore are dropped)
+    """
+    CREATE TABLE activity_person_new (
+        ID_Activity INTEGER NOT NULL REFERENCES activities (ID) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        ID_Person INTEGER NOT NULL REFERENCES persons (ID) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED
+    );
+    INSERT INTO activity_person_new (ID_Activity, ID_Person)
+        SELECT ID_Activity, ID_Person FROM activity_person
+        WHERE ID_Activity IN (SELECT ID FROM activities) AND ID_Person IN (SELECT ID FROM persons)
+        ORDER BY rowid;
+    DROP TABLE activity_person;
+    ALTER TABLE activity_person_new RENAME TO activity_person;
+    """,
+    # 3: Covering indexes for the lookups of the persons of an activity and of the activities of a person, and
+    # an index on the (sortable) intervals of the activities
+    f"""
+    CREATE INDEX IF NOT EXISTS activity_person_activity ON activity_person (ID_Activity, ID_Person);
+    CREATE INDEX IF NOT EXISTS activity_person_person ON activity_person (ID_Person, ID_Activity);
+    CREATE INDEX IF NOT EXISTS activities_interval ON activities ({SORTABLE_START}, {SORTABLE_END});
+    """,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(connection):
+    return connection.execute("PRAGMA user_version;").fetchone()[0]
+
+
+def migrate(connection):
+    """
+    Runs the migrations the database behind <connection> has not run yet
+    :return: The version the database was at before the migration
+    :raise RepositoryException: If the database was created by a newer version of the application
+    """
+    version = schema_version(connection)
+    if version > SCHEMA_VERSION:
+        raise RepositoryException(f"The database schema (version {version}) is newer than the supported one "
+                                  f"(version {SCHEMA_VERSION}).")
+    for new_version in range(version + 1, SCHEMA_VERSION + 1):
+        try:
+            connection.executescript(f"BEGIN; {MIGRATIONS[new_version - 1]} PRAGMA user_version = {new_version}; "
+                                     f"COMMIT;")
+        except sqlite3.Error as error:
+            connection.rollback()
+            raise RepositoryException(f"Could not migrate the database to version {new_version}: {error}")
+    return version
+
+
+def connect(file_name, read_only=False):
+    """
+    Opens a connection to the database <file_name>, set up for the repositories: write-ahead logging (readers do
+    not block the writer and the writer does not block the readers), synchronous=NORMAL (safe with WAL, without an
+    fsync per commit), foreign keys enforced, and the schema migrated to the latest version.
+    With <read_only>, the database is opened read-only and left unchanged (neither migrated nor switched to WAL):
+    it has to exist and have the tables, but it may be at an older version (the older versions only miss the
+    foreign keys and the indexes, so they can still be read, only slower).
+    :raise RepositoryException: If the connection could not be created or the database could not be migrated
+    (or, with <read_only>, if the database is newer than the supported version or misses the tables)
+    """
+    if read_only:
+        return connect_read_only(file_name)
+    try:
+        connection = sqlite3.connect(file_name)
+        connection.execute("PRAGMA journal_mode = WAL;")
+        connection.execute("PRAGMA synchronous = NORMAL;")
+        connection.execute("PRAGMA foreign_keys = ON;")
+    except sqlite3.Error:
+        raise RepositoryException("Could not create the SQL connection.")
+    migrate(connection)
+    return connection
+
+
+def connect_read_only(file_name):
+    try:
+        connection = sqlite3.connect(f"file:{pathname2url(os.path.abspath(file_name))}?mode=ro", uri=True)
+        version = schema_version(connection)
+    except sqlite3.Error as error:
+        raise RepositoryException(f"Could not open the database {file_name}: {error}")
+    if version > SCHEMA_VERSION:
+        connection.close()
+        raise RepositoryException(f"The database schema of {file_name} (version {version}) is newer than the "
+                                  f"supported one (version {SCHEMA_VERSION}).")
+    tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table';")}
+    missing = [table for table in ('persons', 'activities', 'activity_person') if table not in tables]
+    if missing:
+        connection.close()
+        raise RepositoryException(f"The database {file_name} has no {', '.join(missing)} table(s).")
+    return connection
@@ -1,106 +1,143 @@
 import sqlite3
+from contextlib import contextmanager
 
 from domain.activity import Activity
 from domain.validators import DateTimeValidator
 # from repository.in_memory_repo import Repository
-from repository.custom_repo import Repository
+# from repository.custom_repo import Repository
+from repository.hashed_repo import Repository
 from repository.repository_exceptions import RepositoryException
+from sql_repository import schema
 
 
 class SqlActivityRepository(Repository):
+    # The SQLite connection can only be used by the thread which opened it, so the repository cannot be wrapped in
+    # a WriteBehindRepository (its writes are made by a background thread)
+    thread_bound = True
+
     def __init__(self, file_name):
         super().__init__()
         self.__file_name = file_name
         self.__connection = self.create_connection()
+        self.__transaction_depth = 0
         self.__read_database()
 
     def create_connection(self):
+        return schema.connect(self.__file_name)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Unit of work: all the changes made inside the 'with repo.transaction():' block are sent to the database
+        in one SQL transaction which is committed once, at the end of the outermost block (instead of one commit
+        per change). If the block raises an exception, the changes of the block are rolled back and the activities
+        are reloaded from the database, so the repository stays consistent with it.
+        """
+        self.__transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self.__transaction_depth -= 1
+            if self.__transaction_depth == 0:
+                self.__connection.rollback()
+                self.__reload_database()
+            raise
+        self.__transaction_depth -= 1
+        self.__commit()
+
+    def __commit(self):
+        # Inside a transaction the commit is left to the end of the transaction
+        if self.__transaction_depth != 0:
+            return
         try:
-            connection = sqlite3.connect(self.__file_name)
-            return connection
-        except sqlite3.Error:
-            raise RepositoryException("Could not create the SQL connection.")
+            self.__connection.commit()
+        except sqlite3.Error as error:
+            # E.g. a foreign key violation (they are checked when committing); nothing of the transaction is kept
+            self.__connection.rollback()
+            self.__reload_database()
+            raise RepositoryException(f"The changes could not be saved in the database: {error}")
 
     def __read_database(self):
         current = self.__connection.cursor()
-        current.execute("SELECT * FROM activities;")
-        independent_info = current.fetchall()
-
-        for row in independent_info:
-            activity_id = row[0]
-            activity_start_datetime = self.parse_sql_string_to_datetime(row[1])
-            activity_end_datetime = self.parse_sql_string_to_datetime(row[2])
-            activity_description = row[3]
-            current = self.__connection.cursor()
-            sql_command = "SELECT ID_Person FROM activity_person WHERE ID_Activity = ?;"
-            current.execute(sql_command, (activity_id,))
-            person_ids = [id_[0] for id_ in current.fetchall()]
+
+        # Two bulk queries instead of one query per activity: firstly, all the activity_id <-> person_id entries
+        # are grouped by activity (in the order in which they were inserted)
+        persons_of_activity = {}
+        current.execute("SELECT ID_Activity, ID_Person FROM activity_person ORDER BY rowid;")
+        for activity_id, person_id in current:
+            persons_of_activity.setdefault(activity_id, []).append(person_id)
+
+        # Now stream the activities and match every one of them with its persons
+        current.execute("SELECT ID, StartDateTime, EndDateTime, Description FROM activities;")
+        for activity_id, start, end, description in current:
+            activity_start_datetime = self.parse_sql_string_to_datetime(start)
+            activity_end_datetime = self.parse_sql_string_to_datetime(end)
+            person_ids = persons_of_activity.get(activity_id, [])
 
             activity = Activity(activity_id, activity_start_datetime, activity_end_datetime,
-                                activity_description, person_ids)
+                                description, person_ids)
             super().add_to_repo(activity)
 
+    def __reload_database(self):
+        for activity_id in list(self.ids):
+            super().delete_by_id(activity_id)
+        self.__read_database()
+
     def add_to_repo(self, entity):
         super().add_to_repo(entity)
+        current = self.__connection.cursor()
 
         # Firstly, add the new activity (aka the ID, start, end, and description) in the table
         new_entry = (entity.id, self.parse_datetime_to_sql_string(entity.start_date_time),
                      self.parse_datetime_to_sql_string(entity.end_date_time), entity.description)
         sql_command = "INSERT INTO activities (ID, StartDateTime, EndDateTime, Description) VALUES (?, ?, ?, ?);"
-        current = self.__connection.cursor()
         current.execute(sql_command, new_entry)
-        self.__connection.commit()
 
         # Now add the activity_id - person_ids relationship in the other table
-        for person_id in entity.persons_id:
-            sql_command = "INSERT INTO activity_person (ID_Activity, ID_Person) VALUES (?, ?);"
-            current = self.__connection.cursor()
-            current.execute(sql_command, (entity.id, person_id))
-            self.__connection.commit()
+        sql_command = "INSERT INTO activity_person (ID_Activity, ID_Person) VALUES (?, ?);"
+        current.executemany(sql_command, [(entity.id, person_id) for person_id in entity.persons_id])
+        self.__commit()
 
     def delete_by_id(self, entity_id):
         super().delete_by_id(entity_id)
+        current = self.__connection.cursor()
 
         # Firstly, delete the activity from the main table (table that keeps track of ID, start, end, and description)
         sql_command = "DELETE FROM activities WHERE ID = ?;"
-        current = self.__connection.cursor()
         current.execute(sql_command, (entity_id,))
-        self.__connection.commit()
 
         # Now, delete every activity_id <-> person_id entry from the table that keeps track of these relations
         sql_command = "DELETE FROM activity_person WHERE ID_Activity = ?;"
-        current = self.__connection.cursor()
         current.execute(sql_command, (entity_id,))
-        self.__connection.commit()
+        self.__commit()
 
     def update(self, entity):
+        old_entity, _ = self.find_by_id(entity.id)
         super().update(entity)
-
-        # Firstly, update the activity in the main table (which keeps ID, start, end, and description)
-        start = self.parse_datetime_to_sql_string(entity.start_date_time)
-        end = self.parse_datetime_to_sql_string(entity.end_date_time)
-        update_helper = (start, end, entity.description, entity.id)
-        sql_command = "UPDATE activities " \
-                      "SET StartDateTime = ?, EndDateTime = ?, Description = ?" \
-                      "WHERE ID = ?;"
         current = self.__connection.cursor()
-        current.execute(sql_command, update_helper)
-        self.__connection.commit()
 
-        # Now, update the table which keeps the activity_id <-> person_ids relationships
-
-        # Delete the current persons assigned to this activity
-        sql_command = "DELETE FROM activity_person WHERE ID_Activity = ?;"
-        current = self.__connection.cursor()
-        current.execute(sql_command, (entity.id,))
-        self.__connection.commit()
-
-        # Now add the new persons assigned to this activity
-        for person_id in entity.persons_id:
-            sql_command = "INSERT INTO activity_person (ID_Activity, ID_Person) VALUES (?, ?);"
-            current = self.__connection.cursor()
-            current.execute(sql_command, (entity.id, person_id))
-            self.__connection.commit()
+        # Firstly, update the activity in the main table (which keeps ID, start, end, and description)
+        if (old_entity.start_date_time, old_entity.end_date_time, old_entity.description) != \
+                (entity.start_date_time, entity.end_date_time, entity.description):
+            start = self.parse_datetime_to_sql_string(entity.start_date_time)
+            end = self.parse_datetime_to_sql_string(entity.end_date_time)
+            update_helper = (start, end, entity.description, entity.id)
+            sql_command = "UPDATE activities " \
+                          "SET StartDateTime = ?, EndDateTime = ?, Description = ?" \
+                          "WHERE ID = ?;"
+            current.execute(sql_command, update_helper)
+
+        # Now, update the table which keeps the activity_id <-> person_ids relationships; only the persons
+        # which were removed from or added to the activity are touched
+        old_person_ids = set(old_entity.persons_id)
+        new_person_ids = set(entity.persons_id)
+        sql_command = "DELETE FROM activity_person WHERE ID_Activity = ? AND ID_Person = ?;"
+        current.executemany(sql_command, [(entity.id, person_id) for person_id in old_entity.persons_id
+                                          if person_id not in new_person_ids])
+        sql_command = "INSERT INTO activity_person (ID_Activity, ID_Person) VALUES (?, ?);"
+        current.executemany(sql_command, [(entity.id, person_id) for person_id in entity.persons_id
+                                          if person_id not in old_person_ids])
+        self.__commit()
 
     @staticmethod
     def parse_sql_string_to_datetime(sql_string):
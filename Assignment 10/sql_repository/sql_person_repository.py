@@ -1,24 +1,60 @@
 import sqlite3
+from contextlib import contextmanager
 
 from domain.person import Person
 # from repository.in_memory_repo import Repository
-from repository.custom_repo import Repository
+# from repository.custom_repo import Repository
+from repository.hashed_repo import Repository
 from repository.repository_exceptions import RepositoryException
+from sql_repository import schema
 
 
 class SqlPersonRepository(Repository):
+    # The SQLite connection can only be used by the thread which opened it, so the repository cannot be wrapped in
+    # a WriteBehindRepository (its writes are made by a background thread)
+    thread_bound = True
+
     def __init__(self, file_name):
         super().__init__()
         self.__file_name = file_name
         self.__connection = self._create_connection()
+        self.__transaction_depth = 0
         self._read_database()
 
     def _create_connection(self):
+        return schema.connect(self.__file_name)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Unit of work: all the changes made inside the 'with repo.transaction():' block are sent to the database
+        in one SQL transaction which is committed once, at the end of the outermost block (instead of one commit
+        per change). If the block raises an exception, the changes of the block are rolled back and the persons
+        are reloaded from the database, so the repository stays consistent with it.
+        """
+        self.__transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self.__transaction_depth -= 1
+            if self.__transaction_depth == 0:
+                self.__connection.rollback()
+                self._reload_database()
+            raise
+        self.__transaction_depth -= 1
+        self._commit()
+
+    def _commit(self):
+        # Inside a transaction the commit is left to the end of the transaction
+        if self.__transaction_depth != 0:
+            return
         try:
-            connection = sqlite3.connect(self.__file_name)
-            return connection
-        except sqlite3.Error:
-            raise RepositoryException("Failed to create SQL connection.")
+            self.__connection.commit()
+        except sqlite3.Error as error:
+            # E.g. a foreign key violation (they are checked when committing); nothing of the transaction is kept
+            self.__connection.rollback()
+            self._reload_database()
+            raise RepositoryException(f"The changes could not be saved in the database: {error}")
 
     def _read_database(self):
         current = self.__connection.cursor()
@@ -27,20 +63,25 @@ class SqlPersonRepository(Repository):
         for row in rows:
             super().add_to_repo(Person(row[0], row[1], row[2]))
 
+    def _reload_database(self):
+        for person_id in list(self.ids):
+            super().delete_by_id(person_id)
+        self._read_database()
+
     def add_to_repo(self, entity):
         super().add_to_repo(entity)
         new_entry = (entity.id, entity.name, entity.phone_number)
         sql_command = "INSERT INTO persons (ID, Name, PhoneNumber) VALUES (?, ?, ?);"
         current = self.__connection.cursor()
         current.execute(sql_command, new_entry)
-        self.__connection.commit()
+        self._commit()
 
     def delete_by_id(self, entity_id):
         super().delete_by_id(entity_id)
         sql_command = "DELETE FROM persons WHERE ID=?;"
         current = self.__connection.cursor()
         current.execute(sql_command, (entity_id,))
-        self.__connection.commit()
+        self._commit()
 
     def update(self, entity):
         super().update(entity)
@@ -50,4 +91,4 @@ class SqlPersonRepository(Repository):
                       "WHERE ID = ?;"
         current = self.__connection.cursor()
         current.execute(sql_command, update_helper)
-        self.__connection.commit()
+        self._commit()
@@ -0,0 +1,235 @@
+"""
+Benchmark of the sorting algorithms (every member of the Algorithm enum).
+
+Every algorithm sorts generated persons (by name) and activities (by start) of increasing sizes, in several input
+shapes: random, already sorted, reversed, and with many duplicate keys. For every run the report records the
+number of key comparisons, the number of calls of the key function, the wall time and the peak memory allocated
+during the sort (the wall time comes from a separate run without the counting and memory tracing, which would
+slow it down). Once the runs of an algorithm grow slow, its larger sizes are skipped: the time of the next size is
+predicted from the growth between the last two sizes, and the size is skipped (and reported as skipped) if the
+prediction is over the time budget. The report is JSON, with the runs in a fixed order, so the reports of two
+releases can be diffed (or compared with --compare). Run it from the 'Assignment 10' directory:
+
+    python -m tests.benchmark_sort [--sizes 100,1000,...] [--algorithms TIM_SORT,...] [--datasets persons,...]
+                                   [--shapes random,...] [--time-budget SECONDS] [--output report.json]
+                                   [--compare old_report.json]
+"""
+import argparse
+import datetime
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from domain.activity import Activity
+from domain.person import Person
+from utils.algorithms.algorithm import Algorithm
+from utils.sorting import Sorting
+
+SIZES = (100, 1000, 10000, 100000, 1000000)
+SHAPES = ('random', 'sorted', 'reversed', 'duplicates')
+DATASETS = ('persons', 'activities')
+TIME_BUDGET = 30.0
+SEED = 2021
+
+
+class CountingKey:
+    """
+    Wraps a key and counts the comparisons made between the wrapped keys
+    """
+    __slots__ = ('value', 'counter')
+
+    def __init__(self, value, counter):
+        self.value = value
+        self.counter = counter
+
+    def __lt__(self, other):
+        self.counter['comparisons'] += 1
+        return self.value < other.value
+
+    def __le__(self, other):
+        self.counter['comparisons'] += 1
+        return self.value <= other.value
+
+    def __gt__(self, other):
+        self.counter['comparisons'] += 1
+        return self.value > other.value
+
+    def __ge__(self, other):
+        self.counter['comparisons'] += 1
+        return self.value >= other.value
+
+    def __eq__(self, other):
+        self.counter['comparisons'] += 1
+        return self.value == other.value
+
+    __hash__ = None
+
+
+def generate_persons(size, shape, generator):
+    distinct_names = 10 if shape == 'duplicates' else size
+    names = ["Person %07d" % generator.randrange(distinct_names) for _ in range(size)]
+    if shape == 'sorted':
+        names.sort()
+    elif shape == 'reversed':
+        names.sort(reverse=True)
+    return [Person(person_id, name, "07%08d" % person_id) for person_id, name in enumerate(names, 1)]
+
+
+def generate_activities(size, shape, generator):
+    first_day = datetime.datetime(2030, 1, 1)
+    distinct_starts = 10 if shape == 'duplicates' else 60 * 24 * 365
+    starts = [first_day + datetime.timedelta(minutes=generator.randrange(distinct_starts)) for _ in range(size)]
+    if shape == 'sorted':
+        starts.sort()
+    elif shape == 'reversed':
+        starts.sort(reverse=True)
+    return [Activity(activity_id, start, start + datetime.timedelta(hours=1), "Activity %d" % activity_id, [])
+            for activity_id, start in enumerate(starts, 1)]
+
+
+DATASET_GENERATORS = {
+    'persons': (generate_persons, lambda person: person.name),
+    'activities': (generate_activities, lambda activity: activity.start_date_time),
+}
+
+
+def time_sort(data, key, algorithm):
+    start = time.perf_counter()
+    Sorting.sort(data, key=key, algorithm=algorithm)
+    return time.perf_counter() - start
+
+
+def count_sort(data, key, algorithm):
+    """
+    Sorts with a counting key and the memory tracing on
+    :return: (comparisons, key calls, peak memory in bytes)
+    """
+    counter = {'comparisons': 0, 'key_calls': 0}
+
+    def counting_key(elem):
+        counter['key_calls'] += 1
+        return CountingKey(key(elem), counter)
+
+    tracemalloc.start()
+    try:
+        Sorting.sort(data, key=counting_key, algorithm=algorithm)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return counter['comparisons'], counter['key_calls'], peak_memory
+
+
+def predict_seconds(timings, size):
+    """
+    Predicts the time of a run of size <size> from the last two runs, (size, seconds) pairs
+    """
+    if len(timings) < 2:
+        return 0.0
+    (size1, seconds1), (size2, seconds2) = timings[-2:]
+    exponent = math.log(max(seconds2, 1e-6) / max(seconds1, 1e-6)) / math.log(size2 / size1)
+    return seconds2 * (size / size2) ** max(exponent, 1.0)
+
+
+def run_benchmark(algorithms, datasets, shapes, sizes, time_budget, report=None):
+    """
+    :param report: Called with every result as soon as it is known; None for no reporting
+    :return: The list of the results (dictionaries), in the order of the algorithms, datasets, shapes and sizes
+    """
+    results = []
+    for algorithm in algorithms:
+        for dataset in datasets:
+            generate, key = DATASET_GENERATORS[dataset]
+            for shape in shapes:
+                timings = []
+                for size in sizes:
+                    result = {'algorithm': algorithm.name, 'dataset': dataset, 'shape': shape, 'size': size}
+                    predicted_seconds = predict_seconds(timings, size)
+                    if predicted_seconds > time_budget:
+                        result['skipped'] = "predicted %.0fs, over the time budget" % predicted_seconds
+                    else:
+                        data = generate(size, shape, random.Random(SEED))
+                        expected = sorted(data, key=key)
+                        sorted_data = list(data)
+                        seconds = time_sort(sorted_data, key, algorithm)
+                        if [key(elem) for elem in sorted_data] != [key(elem) for elem in expected]:
+                            raise AssertionError(f"{algorithm.name} did not sort the {dataset} ({shape}, {size}).")
+                        timings.append((size, seconds))
+                        comparisons, key_calls, peak_memory = count_sort(list(data), key, algorithm)
+                        result.update({'comparisons': comparisons, 'key_calls': key_calls, 'seconds': seconds,
+                                       'peak_memory': peak_memory})
+                    results.append(result)
+                    if report is not None:
+                        report(result)
+    return results
+
+
+def run_name(result):
+    return "%-22s %-10s %-10s %8d" % (result['algorithm'], result['dataset'], result['shape'], result['size'])
+
+
+def format_result(result):
+    name = run_name(result)
+    if 'skipped' in result:
+        return name + "  skipped (" + result['skipped'] + ")"
+    return name + "  %10.4fs %12d comparisons %9d key calls %12d bytes" % \
+        (result['seconds'], result['comparisons'], result['key_calls'], result['peak_memory'])
+
+
+def compare_reports(old_results, new_results):
+    """
+    Returns the lines describing the changes between the results of two reports (the runs in both)
+    """
+    old_runs = {(result['algorithm'], result['dataset'], result['shape'], result['size']): result
+                for result in old_results if 'skipped' not in result}
+    lines = []
+    for result in new_results:
+        old_result = old_runs.get((result['algorithm'], result['dataset'], result['shape'], result['size']))
+        if old_result is None or 'skipped' in result:
+            continue
+        changes = ["%s x%.2f" % (measure, result[measure] / old_result[measure])
+                   for measure in ('seconds', 'comparisons', 'key_calls', 'peak_memory') if old_result[measure]]
+        lines.append(run_name(result) + "  " + ", ".join(changes))
+    return lines
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmarks the sorting algorithms.")
+    parser.add_argument('--sizes', default=','.join(map(str, SIZES)))
+    parser.add_argument('--algorithms', default=','.join(algorithm.name for algorithm in Algorithm))
+    parser.add_argument('--datasets', default=','.join(DATASETS))
+    parser.add_argument('--shapes', default=','.join(SHAPES))
+    parser.add_argument('--time-budget', type=float, default=TIME_BUDGET,
+                        help="the maximum predicted time of a run, in seconds (default: %g)" % TIME_BUDGET)
+    parser.add_argument('--output', help="the file the JSON report is written to (default: stdout)")
+    parser.add_argument('--compare', help="a previous JSON report to compare the results with")
+    arguments = parser.parse_args(arguments)
+
+    results = run_benchmark([Algorithm[name] for name in arguments.algorithms.split(',')],
+                            arguments.datasets.split(','), arguments.shapes.split(','),
+                            [int(size) for size in arguments.sizes.split(',')], arguments.time_budget,
+                            lambda result: print(format_result(result), file=sys.stderr, flush=True))
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': SEED,
+        'results': results,
+    }
+    if arguments.output is None:
+        print(json.dumps(report, indent=2))
+    else:
+        with open(arguments.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if arguments.compare is not None:
+        with open(arguments.compare, 'r') as f:
+            old_report = json.load(f)
+        print("\nChanges since " + arguments.compare + ":", file=sys.stderr)
+        for line in compare_reports(old_report['results'], results):
+            print(line, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
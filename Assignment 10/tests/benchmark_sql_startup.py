@@ -0,0 +1,75 @@
+"""
+Startup timing benchmark for the SQL repositories.
+
+Builds a throwaway sql_data.db (at the latest schema version) with the given number of activities (3 persons per
+activity) and measures how long it takes to load it into an SqlActivityRepository, next to the old
+one-query-per-activity way of reading the activity_person table. Run it from the 'Assignment 10' directory:
+
+    python -m tests.benchmark_sql_startup [number_of_activities]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from sql_repository import schema
+from sql_repository.sql_activity_repository import SqlActivityRepository
+
+NUMBER_OF_PERSONS = 1000
+PERSONS_PER_ACTIVITY = 3
+
+
+def build_database(file_name, number_of_activities):
+    connection = schema.connect(file_name)
+    persons = ((person_id, "Person %d" % person_id, "07%08d" % person_id)
+               for person_id in range(1, NUMBER_OF_PERSONS + 1))
+    connection.executemany("INSERT INTO persons VALUES (?, ?, ?);", persons)
+    activities = ((activity_id, "%02d/%02d/2030 10:00" % (activity_id % 28 + 1, activity_id % 12 + 1),
+                   "%02d/%02d/2030 12:00" % (activity_id % 28 + 1, activity_id % 12 + 1),
+                   "Activity %d" % activity_id) for activity_id in range(1, number_of_activities + 1))
+    connection.executemany("INSERT INTO activities VALUES (?, ?, ?, ?);", activities)
+    participants = ((activity_id, (activity_id * PERSONS_PER_ACTIVITY + offset) % NUMBER_OF_PERSONS + 1)
+                    for activity_id in range(1, number_of_activities + 1) for offset in range(PERSONS_PER_ACTIVITY))
+    connection.executemany("INSERT INTO activity_person VALUES (?, ?);", participants)
+    connection.commit()
+    connection.close()
+
+
+def time_per_activity_queries(file_name):
+    """
+    The loading strategy used before: one SELECT on activity_person for every activity
+    """
+    start = time.perf_counter()
+    connection = schema.connect(file_name)
+    for (activity_id,) in connection.execute("SELECT ID FROM activities;").fetchall():
+        connection.execute("SELECT ID_Person FROM activity_person WHERE ID_Activity = ?;", (activity_id,)).fetchall()
+    connection.close()
+    return time.perf_counter() - start
+
+
+def time_repository_startup(file_name, number_of_activities):
+    start = time.perf_counter()
+    repository = SqlActivityRepository(file_name)
+    elapsed = time.perf_counter() - start
+    assert len(repository.ids) == number_of_activities
+    return elapsed
+
+
+def main(number_of_activities=200000):
+    file_descriptor, file_name = tempfile.mkstemp(suffix='.db')
+    os.close(file_descriptor)
+    try:
+        build_database(file_name, number_of_activities)
+        elapsed = time_repository_startup(file_name, number_of_activities)
+        print("SqlActivityRepository startup, %d activities: %.2fs (%.0f activities/s)" %
+              (number_of_activities, elapsed, number_of_activities / elapsed))
+        elapsed = time_per_activity_queries(file_name)
+        print("One query per activity (queries only), %d activities: %.2fs" % (number_of_activities, elapsed))
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(file_name + suffix):
+                os.remove(file_name + suffix)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,56 @@
+"""
+Load throughput benchmark for the text file repositories.
+
+Writes a throwaway activities file with the given number of activities (3 persons per activity) and reports the
+records/s of TextFileActivityRepository (memory-mapped bulk loader with the fast parsing path), next to the line
+by line loading with the DateTimeValidator and json used before. Run it from the 'Assignment 10' directory:
+
+    python -m tests.benchmark_text_load [number_of_activities]
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+from domain.activity import Activity
+from text_file_repository.text_file_activity_repo import TextFileActivityRepository
+
+PERSONS_PER_ACTIVITY = 3
+
+
+def build_file(file_name, number_of_activities):
+    with open(file_name, 'w') as f:
+        for activity_id in range(1, number_of_activities + 1):
+            start = datetime.datetime(2030, activity_id % 12 + 1, activity_id % 28 + 1, 10, 0)
+            activity = Activity(activity_id, start, start + datetime.timedelta(hours=2), "Activity %d" % activity_id,
+                                [(activity_id + offset) % 1000 + 1 for offset in range(PERSONS_PER_ACTIVITY)])
+            f.write(TextFileActivityRepository.activity_to_line(activity) + '\n')
+
+
+def time_line_by_line(file_name):
+    """
+    The loading strategy used before: every line through the DateTimeValidator and json.loads
+    """
+    start = time.perf_counter()
+    with open(file_name, 'r') as f:
+        records = sum(1 for line in f if TextFileActivityRepository.activity_from_line(line.rstrip('\n')))
+    return records, time.perf_counter() - start
+
+
+def main(number_of_activities=200000):
+    file_descriptor, file_name = tempfile.mkstemp(suffix='.txt')
+    os.close(file_descriptor)
+    try:
+        build_file(file_name, number_of_activities)
+        repository = TextFileActivityRepository(file_name)
+        print("Bulk loader: " + str(repository.load_statistics))
+        records, elapsed = time_line_by_line(file_name)
+        print("Line by line (parsing only): %d records in %.3fs (%.0f records/s)" %
+              (records, elapsed, records / elapsed))
+    finally:
+        os.remove(file_name)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
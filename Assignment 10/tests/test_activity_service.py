@@ -119,6 +119,28 @@ class TestActivityService(unittest.TestCase):
         self.assertEqual(len(self.activity_service.get_all_activities_of_person_id(1)), 2)
         self.assertEqual(len(self.activity_service.get_all_activities_of_person_id(2)), 1)
 
+        # The person -> activities index follows the updates and the deletions of activities
+        self.activity_service.remove_persons_by_id_from_activity('2', '1')
+        self.assertEqual([act.id for act in self.activity_service.get_all_activities_of_person_id(1)], [1])
+        self.activity_service.delete_activity_by_id(1)
+        self.assertEqual(self.activity_service.get_all_activities_of_person_id(1), [])
+        self.assertEqual(self.activity_service.get_all_activities_of_person_id(2), [])
+
+    def test_get_overlapping_activities(self):
+        self.activity_service.add_activity(1, '17/5/2021 17:30', '17/5/2021 21:00', 'Fun', '1')
+        self.activity_service.add_activity(2, '17/5/2021 21:00', '17/5/2021 22:00', 'Dinner', '2')
+        self.activity_service.add_activity(3, '17/5/2021 10:00', '18/5/2021 10:00', 'Hiking')
+        activity1, _ = self.activity_service.find_activity_by_id(1)
+        self.assertEqual([act.id for act in self.activity_service.get_overlapping_activities(activity1)], [3])
+
+        # Person 1 is busy during activity 1, which overlaps activity 3
+        added, not_added = self.activity_service.add_persons_by_id_to_activity(3, '1, 2')
+        self.assertEqual(added, [])
+        self.assertEqual(len(not_added), 2)
+        self.activity_service.update_activity_end_date_time(3, '17/5/2021 17:30')
+        added, not_added = self.activity_service.add_persons_by_id_to_activity(3, '1, 2')
+        self.assertEqual(sorted(added), [1, 2])
+
     def test_find_activity_by_id(self):
         self.activity_service.add_activity('1', '17/5/2021 17:30', '17/5/2021 21:00', 'Fun')
         self.activity_service.add_activity('2', '18/5/2021 19:30', '19/5/2021 10:00', 'Study')
@@ -383,6 +405,9 @@ class TestActivityService(unittest.TestCase):
             self.assertLessEqual(activities_with_given_person[index - 1].start_date_time,
                                  activities_with_given_person[index].start_date_time)
 
+        self.assertEqual(self.activity_service.activities_with_given_person('1', 2), activities_with_given_person[:2])
+        self.assertEqual(self.activity_service.activities_with_given_person('1', 0), [])
+
         activities_with_given_person = self.activity_service.activities_with_given_person('2')
         self.assertEqual(len(activities_with_given_person), 2)
         for index in range(1, len(activities_with_given_person)):
@@ -462,6 +487,11 @@ class TestActivityService(unittest.TestCase):
         self.assertEqual(len(free_time_end[1]), 2)
         self.assertEqual(len(free_time_end[2]), 4)
 
+        # Only the first days
+        first_dates, first_free_time_start, _ = self.activity_service.busiest_days_person('Vlad Bogdan', 2)
+        self.assertEqual(first_dates, sorted_dates[:2])
+        self.assertEqual(first_free_time_start, free_time_start[:2])
+
     def test_get_inverse_operation_and_args(self):
         self.assertRaises(UndoRedoException, self.activity_service.get_inverse_operation_and_args,
                           self.activity_service.check_overlap, 1, 2, 3)
@@ -544,3 +574,11 @@ class TestActivityService(unittest.TestCase):
         self.assertIn(str(activity1), my_activities)
         self.assertIn(str(activity3), my_activities)
         self.assertNotIn(str(activity2), my_activities)
+        self.assertNotIn("only the first", my_activities)
+
+        # Only the first page, with a note that there are more
+        first_activities = self.activity_service.get_activities_with_given_person_string('Vlad Bogdan', 1)
+        self.assertIn(str(activity3), first_activities)
+        self.assertNotIn(str(activity1), first_activities)
+        self.assertIn("only the first 1 are shown", first_activities)
+        self.assertNotIn("only the first", self.activity_service.get_activities_with_given_person_string('1', 2))
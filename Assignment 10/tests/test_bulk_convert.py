@@ -0,0 +1,107 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import bulk_convert
+from sql_repository import schema
+from text_file_repository.text_file_activity_repo import TextFileActivityRepository
+from text_file_repository.text_file_person_repo import TextFilePersonRepository
+
+
+class TestBulkConvert(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.source_directory = os.path.join(self.directory, 'textfiles')
+        os.makedirs(self.source_directory)
+        for file_name in ('persons.txt', 'activities.txt'):
+            shutil.copyfile(os.path.join('data', file_name), os.path.join(self.source_directory, file_name))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read_text_files(self, directory):
+        persons = TextFilePersonRepository(os.path.join(directory, 'persons.txt')).elements
+        activities = TextFileActivityRepository(os.path.join(directory, 'activities.txt')).elements
+        return sorted((person.id, person.name, person.phone_number) for person in persons), \
+            sorted((activity.id, activity.start_date_time, activity.end_date_time, activity.description,
+                    activity.persons_id) for activity in activities)
+
+    def test_round_trip(self):
+        # Through every repository type and back to text files
+        expected = self.read_text_files(self.source_directory)
+        source_type, source_directory = 'textfiles', self.source_directory
+        for target_type in ('database', 'jsonfiles', 'compactbinary', 'binaryfiles', 'textjournal', 'jsonjournal',
+                            'binaryjournal', 'database_lazy', 'textfiles'):
+            target_directory = os.path.join(self.directory, target_type + '_target')
+            converted = bulk_convert.convert(source_type, target_type, source_directory, target_directory,
+                                             workers=0, chunk_size=3)
+            self.assertEqual(converted, {'persons': len(expected[0]), 'activities': len(expected[1])})
+            source_type, source_directory = target_type, target_directory
+        self.assertEqual(self.read_text_files(source_directory), expected)
+
+    def test_worker_processes(self):
+        expected = self.read_text_files(self.source_directory)
+        reports = []
+        target_directory = os.path.join(self.directory, 'json')
+        bulk_convert.convert('textfiles', 'jsonfiles', self.source_directory, target_directory, workers=2,
+                             chunk_size=2, report=lambda kind, records, seconds: reports.append((kind, records)))
+        self.assertEqual(reports[-1], ('activities', len(expected[1])))
+        self.assertEqual([records for kind, records in reports if kind == 'persons'],
+                         list(range(2, len(expected[0]) + 1, 2)) + ([len(expected[0])] if len(expected[0]) % 2 else []))
+        bulk_convert.convert('jsonfiles', 'textfiles', target_directory, os.path.join(self.directory, 'text'),
+                             workers=2, chunk_size=2)
+        self.assertEqual(self.read_text_files(os.path.join(self.directory, 'text')), expected)
+
+    def test_sorted_export(self):
+        persons, activities = self.read_text_files(self.source_directory)
+        target_directory = os.path.join(self.directory, 'sorted')
+        bulk_convert.convert('textfiles', 'database', self.source_directory, os.path.join(self.directory, 'sql'),
+                             workers=0)
+        bulk_convert.convert('database', 'textfiles', os.path.join(self.directory, 'sql'), target_directory,
+                             workers=0, chunk_size=3, sort_by={'activities': 'start'}, reverse=True, run_size=2)
+        with open(os.path.join(target_directory, 'activities.txt'), 'r') as f:
+            starts = [line.split(';')[1] for line in f if line.strip()]
+        self.assertEqual(starts, sorted((str(activity[1]) for activity in activities), reverse=True))
+        self.assertEqual(self.read_text_files(target_directory), (persons, activities))
+        self.assertRaises(ValueError, bulk_convert.convert, 'textfiles', 'jsonfiles', self.source_directory,
+                          target_directory, sort_by={'persons': 'start'})
+
+    def test_legacy_database(self):
+        # A database of the first (version 0) schema is read as it is, without being migrated
+        source_directory = os.path.join(self.directory, 'legacy')
+        os.makedirs(source_directory)
+        file_name = os.path.join(source_directory, 'sql_data.db')
+        connection = sqlite3.connect(file_name)
+        connection.executescript("""
+            CREATE TABLE persons (ID INTEGER PRIMARY KEY, Name TEXT NOT NULL, PhoneNumber TEXT UNIQUE);
+            CREATE TABLE activities (ID INTEGER PRIMARY KEY, StartDateTime TEXT NOT NULL, EndDateTime TEXT NOT NULL,
+                                     Description TEXT);
+            CREATE TABLE activity_person (ID_Activity INTEGER, ID_Person INTEGER);
+        """)
+        connection.execute("INSERT INTO persons VALUES (1, 'Vlad Bogdan', '0745 000 111');")
+        connection.execute("INSERT INTO activities VALUES (1, '17/05/2021 10:30', '17/05/2021 12:30', 'Hiking');")
+        connection.execute("INSERT INTO activity_person VALUES (1, 1);")
+        connection.commit()
+        connection.close()
+
+        target_directory = os.path.join(self.directory, 'text')
+        bulk_convert.main(['database', 'textfiles', '--source-dir', source_directory, '--target-dir',
+                           target_directory, '--workers', '0'])
+        persons, activities = self.read_text_files(target_directory)
+        self.assertEqual(persons, [(1, 'Vlad Bogdan', '0745 000 111')])
+        self.assertEqual([(activity[0], activity[3], activity[4]) for activity in activities], [(1, 'Hiking', [1])])
+        connection = sqlite3.connect(file_name)
+        self.assertEqual((connection.execute("PRAGMA user_version;").fetchone()[0],
+                          connection.execute("PRAGMA journal_mode;").fetchone()[0]), (0, 'delete'))
+        connection.execute(f"PRAGMA user_version = {schema.SCHEMA_VERSION + 1};")
+        connection.close()
+        # A newer one is reported as a usage error
+        with self.assertRaises(SystemExit):
+            bulk_convert.main(['database', 'textfiles', '--source-dir', source_directory, '--target-dir',
+                               target_directory, '--workers', '0'])
+
+    def test_unknown_repository_type(self):
+        self.assertRaises(ValueError, bulk_convert.convert, 'textfiles', 'xml', self.source_directory,
+                          self.directory)
@@ -0,0 +1,159 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from compact_binary_repository.compact_binary_format import ActivityRecords, CompactBinaryFile, PersonRecords, \
+    write_compact_file
+from compact_binary_repository import compact_binary_repository
+from compact_binary_repository.compact_binary_repository import CompactBinaryActivityRepository, \
+    CompactBinaryPersonRepository
+from domain.activity import Activity
+from domain.person import Person
+from repository.repository_exceptions import RepositoryException
+
+
+class TestCompactBinary(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.directory, 'data.cbr')
+        self.activities = [Activity(activity_id, datetime.datetime(2021, 5, activity_id, 10, 30),
+                                    datetime.datetime(2021, 5, activity_id, 12, 45), f"Hiking ăîș {activity_id}",
+                                    list(range(activity_id % 4)))
+                           for activity_id in (9, 3, 27, 1, 12)]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        write_compact_file(self.file_name, self.activities, ActivityRecords)
+        with CompactBinaryFile(self.file_name, ActivityRecords) as f:
+            self.assertEqual(len(f), 5)
+            activities = list(f)
+        self.assertEqual([activity.id for activity in activities], [1, 3, 9, 12, 27])
+        for activity in activities:
+            expected = next(expected for expected in self.activities if expected.id == activity.id)
+            self.assertEqual((activity.start_date_time, activity.end_date_time, activity.description,
+                              activity.persons_id),
+                             (expected.start_date_time, expected.end_date_time, expected.description,
+                              expected.persons_id))
+
+    def test_find_by_id_and_scan(self):
+        write_compact_file(self.file_name, self.activities, ActivityRecords)
+        with CompactBinaryFile(self.file_name, ActivityRecords) as f:
+            self.assertEqual(f.find_by_id(12).description, "Hiking ăîș 12")
+            self.assertEqual(f.find_by_id(1).persons_id, [0])
+            self.assertIsNone(f.find_by_id(2))
+            self.assertIsNone(f.find_by_id(28))
+            self.assertEqual((3 in f, 2 in f), (True, False))
+            self.assertEqual([activity.id for activity in f.scan(2, 12)], [3, 9, 12])
+            self.assertEqual([activity.id for activity in f.scan(10)], [12, 27])
+            self.assertEqual([activity.id for activity in f.scan(last_id=3)], [1, 3])
+            self.assertEqual(list(f.scan(13, 26)), [])
+            self.assertEqual(list(f.ids(4)), [9, 12, 27])
+            self.assertRaises(IndexError, lambda: f[5])
+
+    def test_persons(self):
+        persons = [Person(2, 'Vlad Bogdan', '0745 000 111'), Person(1, '', '')]
+        write_compact_file(self.file_name, persons, PersonRecords)
+        with CompactBinaryFile(self.file_name, PersonRecords) as f:
+            self.assertEqual([(person.id, person.name, person.phone_number) for person in f],
+                             [(1, '', ''), (2, 'Vlad Bogdan', '0745 000 111')])
+
+    def test_invalid_file(self):
+        open(self.file_name, 'wb').close()
+        with CompactBinaryFile(self.file_name, ActivityRecords) as f:
+            self.assertEqual((len(f), list(f)), (0, []))
+        write_compact_file(self.file_name, self.activities, ActivityRecords)
+        self.assertRaises(RepositoryException, CompactBinaryFile, self.file_name, PersonRecords)
+        with open(self.file_name, 'wb') as f:
+            f.write(b'not a compact binary file')
+        self.assertRaises(RepositoryException, CompactBinaryFile, self.file_name, ActivityRecords)
+
+    def test_repository(self):
+        open(self.file_name, 'wb').close()
+        repo = CompactBinaryActivityRepository(self.file_name)
+        for activity in self.activities:
+            repo.add_to_repo(activity)
+        repo.delete_by_id(9)
+        repo.update(Activity(3, datetime.datetime(2021, 6, 1, 8, 0), datetime.datetime(2021, 6, 1, 9, 0),
+                             "Reading", [5]))
+        with repo.transaction():
+            repo.delete_by_id(27)
+            repo.delete_by_id(12)
+        # The changes are only appended to the journal
+        self.assertEqual((os.path.getsize(self.file_name), repo.journal_records), (0, 9))
+        self.assertEqual((len(repo), repo.get_all_ids(), 9 in repo.ids, 3 in repo.ids), (2, [1, 3], False, True))
+        self.assertEqual([activity.id for activity in repo.scan(2)], [3])
+        repo.close()
+
+        repo = CompactBinaryActivityRepository(self.file_name)
+        self.assertEqual(repo.get_all_ids(), [1, 3])
+        self.assertEqual(repo.find_by_id(3)[0].persons_id, [5])
+        self.assertEqual(repo.find_by_id(9), (None, None))
+        repo.compact()
+        self.assertEqual((os.path.getsize(self.file_name + '.journal'), repo.journal_records), (0, 0))
+        with CompactBinaryFile(self.file_name, ActivityRecords) as f:
+            self.assertEqual([activity.id for activity in f], [1, 3])
+        repo.close()
+
+        person_file_name = os.path.join(self.directory, 'persons.cbr')
+        open(person_file_name, 'wb').close()
+        CompactBinaryPersonRepository(person_file_name).add_to_repo(Person(1, 'Vlad Bogdan', '0745 000 111'))
+        self.assertEqual(CompactBinaryPersonRepository(person_file_name).find_by_id(1)[0].name, 'Vlad Bogdan')
+        self.assertRaises(RepositoryException, CompactBinaryPersonRepository, os.path.join(self.directory, 'none'))
+
+    def test_journal(self):
+        write_compact_file(self.file_name, self.activities, ActivityRecords)
+        repo = CompactBinaryActivityRepository(self.file_name, compaction_min_records=4)
+        repo.delete_by_id(9)
+        repo.add_to_repo(Activity(9, datetime.datetime(2021, 7, 1, 8, 0), datetime.datetime(2021, 7, 1, 9, 0),
+                                  "Reading", [2]))
+        repo.delete_by_id(12)
+        self.assertEqual([(activity.id, activity.description) for activity in repo.elements],
+                         [(1, "Hiking ăîș 1"), (3, "Hiking ăîș 3"), (9, "Reading"), (27, "Hiking ăîș 27")])
+        self.assertRaises(RepositoryException, repo.update, Activity(12, datetime.datetime(2021, 7, 1, 8, 0),
+                                                                     datetime.datetime(2021, 7, 1, 9, 0), "", []))
+        repo.close()
+
+        # A record cut off at the end of the journal is dropped
+        with open(self.file_name + '.journal', 'ab') as journal:
+            journal.write(b'S\x00\x00')
+        repo = CompactBinaryActivityRepository(self.file_name, compaction_min_records=4)
+        self.assertEqual((repo.get_all_ids(), repo.journal_records), ([1, 3, 9, 27], 3))
+        self.assertEqual(repo.find_by_id(9)[0].persons_id, [2])
+
+        # The journal is compacted once it has more records than the minimum and than there are entities, also
+        # while iterating over the repository (the next batches are read from the new file)
+        batch_size = compact_binary_repository.BATCH_SIZE
+        compact_binary_repository.BATCH_SIZE = 1
+        try:
+            iterator = iter(repo.elements)
+            self.assertEqual(next(iterator).id, 1)
+            repo.delete_by_id(27)
+            repo.delete_by_id(3)
+            self.assertEqual(repo.journal_records, 0)
+            self.assertEqual([activity.id for activity in iterator], [9])
+        finally:
+            compact_binary_repository.BATCH_SIZE = batch_size
+        with CompactBinaryFile(self.file_name, ActivityRecords) as f:
+            self.assertEqual([activity.id for activity in f], [1, 9])
+        repo.close()
+
+    def test_batches(self):
+        persons = [Person(person_id, f"Person {person_id}", f"07{person_id:08d}") for person_id in range(0, 20, 2)]
+        write_compact_file(self.file_name, persons, PersonRecords)
+        repo = CompactBinaryPersonRepository(self.file_name)
+        repo.add_to_repo(Person(5, 'Vlad Bogdan', '0745 000 111'))
+        repo.delete_by_id(6)
+        batch_size = compact_binary_repository.BATCH_SIZE
+        compact_binary_repository.BATCH_SIZE = 3
+        try:
+            self.assertEqual([person.id for person in repo.elements], [0, 2, 4, 5, 8, 10, 12, 14, 16, 18])
+            self.assertEqual([person.id for person in repo.scan(3, 12)], [4, 5, 8, 10, 12])
+        finally:
+            compact_binary_repository.BATCH_SIZE = batch_size
+        self.assertEqual((repo.elements[3].name, repo.elements[-1].id, len(repo.elements)), ('Vlad Bogdan', 18, 10))
+        self.assertEqual([person.id for person in repo.search('name', 'bogdan', str.lower)], [5])
+        repo.close()
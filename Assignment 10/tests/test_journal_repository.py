@@ -0,0 +1,142 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from domain.activity import Activity
+from domain.person import Person
+from json_repository.json_journal_repository import JsonJournalActivityRepository, JsonJournalPersonRepository
+from pickle_repository.pickle_journal_repository import PickleJournalRepository
+from repository.journal_repo import JournalRepository
+from text_file_repository.text_file_activity_repo import TextFileActivityRepository
+from text_file_repository.text_file_journal_repo import TextFileJournalActivityRepository, \
+    TextFileJournalPersonRepository, TextFileJournalRepository
+
+
+class TestJournalRepository(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.activity1 = Activity(1, datetime.datetime(2021, 5, 17, 10, 30), datetime.datetime(2021, 5, 17, 12, 30),
+                                  "Hiking", [1, 2])
+        self.activity2 = Activity(2, datetime.datetime(2021, 6, 20, 9, 0), datetime.datetime(2021, 6, 20, 20, 30),
+                                  "Vacation", [2])
+        self.activity_repositories = (TextFileJournalActivityRepository, JsonJournalActivityRepository,
+                                      PickleJournalRepository)
+        self.person_repositories = (TextFileJournalPersonRepository, JsonJournalPersonRepository,
+                                    PickleJournalRepository)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_changes(self, repo):
+        repo.add_to_repo(self.activity1)
+        repo.add_to_repo(self.activity2)
+        repo.update(Activity(1, self.activity1.start_date_time, self.activity1.end_date_time, "Hiking", [1]))
+        repo.delete_by_id(2)
+        repo.add_to_repo(Activity(3, self.activity2.start_date_time, self.activity2.end_date_time, "Reading", []))
+
+    def assert_content(self, repo):
+        self.assertEqual([(activity.id, activity.description, activity.persons_id) for activity in repo.elements],
+                         [(1, "Hiking", [1]), (3, "Reading", [])])
+
+    def test_replay(self):
+        for repository_class in self.activity_repositories:
+            file_name = os.path.join(self.directory, repository_class.__name__)
+            repo = repository_class(file_name)
+            self.make_changes(repo)
+            self.assertEqual(repo.journal_records, 5)
+            repo.close()
+            # Nothing but the journal was written
+            self.assertFalse(os.path.exists(file_name))
+
+            repo = repository_class(file_name)
+            self.assert_content(repo)
+            self.assertEqual(repo.journal_records, 5)
+            repo.close()
+
+    def test_persons(self):
+        for repository_class in self.person_repositories:
+            file_name = os.path.join(self.directory, repository_class.__name__)
+            repo = repository_class(file_name)
+            repo.add_to_repo(Person(1, 'Vlad Bogdan', '0745 000 111'))
+            repo.add_to_repo(Person(2, 'Test Person', '0241 234 567'))
+            repo.update(Person(1, 'Vlad Bogdan', '0745 999 111'))
+            repo.delete_by_id(2)
+            repo.close()
+
+            repo = repository_class(file_name)
+            self.assertEqual([(person.id, person.phone_number) for person in repo.elements], [(1, '0745 999 111')])
+            repo.close()
+
+    def test_compaction(self):
+        for repository_class in self.activity_repositories:
+            file_name = os.path.join(self.directory, repository_class.__name__)
+            repo = repository_class(file_name, compaction_min_records=3)
+            with repo.transaction():
+                self.make_changes(repo)
+                self.assertEqual(repo.journal_records, 5)
+            # The journal was compacted at the end of the transaction
+            self.assertEqual(repo.journal_records, 0)
+            self.assertEqual(os.path.getsize(file_name + '.journal'), 0)
+            repo.delete_by_id(3)
+            repo.close()
+
+            repo = repository_class(file_name, compaction_min_records=3)
+            self.assertEqual(repo.get_all_ids(), [1])
+            repo.close()
+
+        # The snapshot of the text format can still be read by the text file repository (the deletion of activity 3
+        # is only in the journal)
+        file_name = os.path.join(self.directory, TextFileJournalActivityRepository.__name__)
+        self.assertEqual(TextFileActivityRepository(file_name).get_all_ids(), [1, 3])
+
+    def test_replay_over_newer_snapshot(self):
+        # A crash after a compaction replaced the snapshot, but before the journal was emptied
+        for repository_class in self.activity_repositories:
+            file_name = os.path.join(self.directory, repository_class.__name__)
+            repo = repository_class(file_name)
+            self.make_changes(repo)
+            repo.close()
+            shutil.copyfile(file_name + '.journal', file_name + '.old')
+            repo = repository_class(file_name)
+            repo.compact()
+            repo.close()
+            os.replace(file_name + '.old', file_name + '.journal')
+
+            repo = repository_class(file_name)
+            self.assert_content(repo)
+            repo.close()
+
+    def test_incomplete_record(self):
+        for repository_class in self.activity_repositories:
+            file_name = os.path.join(self.directory, repository_class.__name__)
+            repo = repository_class(file_name)
+            self.make_changes(repo)
+            repo.close()
+            with open(file_name + '.journal', 'rb+') as journal:
+                journal.truncate(os.path.getsize(file_name + '.journal') - 3)
+
+            repo = repository_class(file_name)
+            self.assertEqual(repo.get_all_ids(), [1])
+            self.assertEqual(repo.journal_records, 4)
+            # The incomplete record was dropped, so the next changes are appended after a complete record
+            repo.add_to_repo(self.activity2)
+            repo.close()
+            repo = repository_class(file_name)
+            self.assertEqual(repo.get_all_ids(), [1, 2])
+            repo.close()
+
+    def test_missing_hooks(self):
+        # The base classes, and a subclass which does not implement all the hooks, cannot be created
+        class SnapshotOnlyRepository(JournalRepository):
+            def _read_snapshot(self, file_name):
+                return []
+
+            def _write_snapshot(self, file_name, entities):
+                pass
+
+        file_name = os.path.join(self.directory, 'activities')
+        for repository_class in (JournalRepository, SnapshotOnlyRepository, TextFileJournalRepository):
+            self.assertRaises(TypeError, repository_class, file_name)
+        self.assertFalse(os.path.exists(file_name + '.journal'))
@@ -0,0 +1,33 @@
+import io
+import json
+import unittest
+from json.decoder import JSONDecodeError
+
+from json_repository.json_stream import iter_json_array, write_json_array
+
+
+class TestJsonStream(unittest.TestCase):
+    def setUp(self):
+        self.elements = [{'Activity': {'id': 1, 'description': 'Hiking [with] "friends", {maybe}', 'persons': [1, 2]}},
+                         {'Person': {'id': 12345, 'name': 'Vlad Bogdan', 'phone': '0745 000 111'}},
+                         [], 3.25, "text", None, True]
+
+    def test_write_json_array(self):
+        for elements in (self.elements, [], [{}]):
+            file = io.StringIO()
+            write_json_array(file, iter(elements))
+            self.assertEqual(file.getvalue(), json.dumps(elements, indent=2))
+
+    def test_iter_json_array(self):
+        text = json.dumps(self.elements, indent=2)
+        for chunk_size in (1, 2, 7, 1 << 16):
+            self.assertEqual(list(iter_json_array(io.StringIO(text), chunk_size)), self.elements)
+        self.assertEqual(list(iter_json_array(io.StringIO(json.dumps(self.elements)), 3)), self.elements)
+        self.assertEqual(list(iter_json_array(io.StringIO('[12,345]'), 2)), [12, 345])
+        self.assertEqual(list(iter_json_array(io.StringIO(''))), [])
+        self.assertEqual(list(iter_json_array(io.StringIO(' [ ] \n'), 1)), [])
+
+    def test_invalid_json(self):
+        for text in ('{}', '[1, 2', '[1 2]', '[1, }', '[1] 2', '[1,]'):
+            with self.assertRaises(JSONDecodeError):
+                list(iter_json_array(io.StringIO(text), 2))
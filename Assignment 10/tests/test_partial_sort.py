@@ -0,0 +1,35 @@
+import random
+import unittest
+
+from domain.person import Person
+from utils.partial_sort import PartialSort
+
+
+class TestPartialSort(unittest.TestCase):
+    def setUp(self):
+        random.seed(5)
+        # Many equal keys, so the stability is checked as well
+        self.persons = [Person(person_id, 'Person %d' % random.randint(0, 20), '0745 000 %03d' % person_id)
+                        for person_id in range(1, 301)]
+
+    def test_top_k(self):
+        for reverse in (False, True):
+            expected = sorted(self.persons, key=lambda person: person.name, reverse=reverse)
+            for k in (0, 1, 10, 300, 500):
+                self.assertEqual(PartialSort.top_k(self.persons, k, lambda person: person.name, reverse),
+                                 expected[:k])
+        self.assertEqual(PartialSort.top_k([4, 1, 11, 7], 2), [1, 4])
+        self.assertEqual(PartialSort.top_k([], 3), [])
+
+    def test_iter_sorted(self):
+        for reverse in (False, True):
+            expected = sorted(self.persons, key=lambda person: person.name, reverse=reverse)
+            self.assertEqual(list(PartialSort.iter_sorted(self.persons, lambda person: person.name, reverse)),
+                             expected)
+        # The elements are produced on demand and the key of every element is computed once
+        key_calls = []
+        iterator = PartialSort.iter_sorted(self.persons, lambda person: key_calls.append(person) or person.id)
+        self.assertEqual(next(iterator).id, 1)
+        self.assertEqual(next(iterator).id, 2)
+        self.assertEqual(len(key_calls), 300)
+        self.assertEqual(list(PartialSort.iter_sorted([])), [])
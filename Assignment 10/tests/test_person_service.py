@@ -205,6 +205,19 @@ class TestPersonService(unittest.TestCase):
         self.assertRaises(PersonPhoneNumberException, self.pers_service.search_by_phone_number, 'abc')
         self.assertRaises(PersonPhoneNumberException, self.pers_service.search_by_phone_number, '++074')
 
+    def test_unique_indexes(self):
+        self.pers_service.add_person('5', 'Vlad Bogdan', '+40745999111')
+        self.assertRaises(PersonNameException, self.pers_service.add_person, 3, 'vlad   BOGDAN', '0756123456')
+        self.assertRaises(PersonPhoneNumberException, self.pers_service.add_person, 3, 'Kurt Cobain', '0745-999-111')
+
+        # The indexes follow the updates and the deletions
+        self.pers_service.update_person_phone_number(5, '0756123456')
+        self.assertEqual(self.pers_service.search_by_phone_number('0745999111'), [])
+        self.pers_service.add_person(3, 'Kurt Cobain', '0745999111')
+        self.pers_service.delete_person_by_id(5)
+        person = self.pers_service.add_person(4, 'Vlad Bogdan', '0756123456')
+        self.assertEqual(self.pers_service.search_by_phone_number('+40756123456'), [person])
+
     def test_get_inverse_operation_and_args(self):
         self.assertRaises(UndoRedoException, self.pers_service.get_inverse_operation_and_args,
                           self.pers_service.find_person_by_id, 1, 2, 3)
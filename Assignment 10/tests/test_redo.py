@@ -22,13 +22,8 @@ class TestUndo(unittest.TestCase):
                                                   self.__redo_repo)
         self.__person_service = PersonService(self.__person_repo, PersonIDValidator, PhoneNumberValidator,
                                               self.__undo_repo, self.__redo_repo)
-        double_pop_fns = (self.__activity_service.delete_person_from_activities, self.__person_service.add_person)
-        double_pop_fns_counter_part = (self.__person_service.delete_person_by_id,
-                                       self.__activity_service.add_person_to_activities)
-        self.__undo_service = UndoService(self.__undo_repo, double_pop_fns, double_pop_fns_counter_part)
-        self.__redo_service = RedoService(self.__redo_repo, double_pop_fns, double_pop_fns_counter_part)
-        self.__double_undo_fns = (self.__person_service.add_person,
-                                  self.__activity_service.delete_person_from_activities)
+        self.__undo_service = UndoService(self.__undo_repo)
+        self.__redo_service = RedoService(self.__redo_repo)
 
         self.__person_service.add_person(1, "Vlad Bogdan", '0745000222')
         self.__person_service.add_person(2, "Test Person", '0745999111')
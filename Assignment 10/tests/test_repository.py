@@ -1,9 +1,16 @@
+import datetime
+import random
 import unittest
 
+from domain.activity import Activity
 from domain.person import Person
 from repository.custom_repo import Repository
+from repository.hashed_repo import Repository as HashedRepo
 from repository.in_memory_repo import Repository as InMemoryRepo
+from repository.interval_index import IntervalIndex
+from repository.inverted_index import InvertedIndex
 from repository.repository_exceptions import DeleteException, AddException, RepositoryException
+from repository.unique_index import UniqueIndex
 
 
 class TestRepository(unittest.TestCase):
@@ -45,6 +52,18 @@ class TestRepository(unittest.TestCase):
         self.custom_repo.add_to_repo(self.pers_2)
         self.assertEqual(self.custom_repo.get_all_ids(), [1, 2])
 
+    def test_ids(self):
+        for repo in (self.custom_repo, self.in_memory_repo):
+            ids = repo.ids
+            self.assertEqual(len(ids), 0)
+            repo.add_to_repo(self.pers_1)
+            repo.add_to_repo(self.pers_2)
+            self.assertEqual(len(ids), 2)
+            self.assertIn(1, ids)
+            repo.delete_by_id(1)
+            self.assertNotIn(1, repo.ids)
+            self.assertEqual(len(ids), 1)
+
     def test_find_by_id(self):
         self.custom_repo.add_to_repo(self.pers_1)
         self.custom_repo.add_to_repo(self.pers_2)
@@ -77,3 +96,215 @@ class TestRepository(unittest.TestCase):
         self.assertEqual(pers1.name, 'New Name')
         self.assertEqual(pers1.phone_number, '0745 094 735')
         self.assertRaises(RepositoryException, self.in_memory_repo.update, self.pers_1)
+
+
+class TestHashedRepository(unittest.TestCase):
+    def setUp(self):
+        self.pers_1 = Person(1, 'Vlad Bogdan', '0745000111')
+        self.pers_2 = Person(2, 'Test Person', '0241234567')
+        self.pers_3 = Person(3, 'Third Person', '0251234567')
+        self.repo = HashedRepo()
+
+    def test_add_to_repo(self):
+        self.assertEqual(self.repo.elements, [])
+        self.repo.add_to_repo(self.pers_1)
+        self.repo.add_to_repo(self.pers_2)
+        self.assertEqual(self.repo.elements, [self.pers_1, self.pers_2])
+        self.assertRaises(AddException, self.repo.add_to_repo, self.pers_1)
+
+    def test_find_by_id(self):
+        self.repo.add_to_repo(self.pers_1)
+        self.repo.add_to_repo(self.pers_2)
+        self.assertEqual(self.repo.find_by_id(2)[0], self.pers_2)
+        self.assertEqual(self.repo.find_by_id(15), (None, None))
+
+    def test_delete_by_id(self):
+        self.repo.add_to_repo(self.pers_1)
+        self.repo.add_to_repo(self.pers_2)
+        self.repo.add_to_repo(self.pers_3)
+        self.repo.delete_by_id(2)
+        self.assertEqual(self.repo.find_by_id(2), (None, None))
+        self.assertEqual(self.repo.find_by_id(3)[0], self.pers_3)
+        self.assertEqual(self.repo.elements, [self.pers_1, self.pers_3])
+        self.assertEqual(self.repo.get_all_ids(), [1, 3])
+        self.assertRaises(DeleteException, self.repo.delete_by_id, 2)
+
+        # Deleting and re-adding keeps the insertion order
+        self.repo.delete_by_id(1)
+        self.repo.add_to_repo(self.pers_1)
+        self.assertEqual(self.repo.elements, [self.pers_3, self.pers_1])
+        self.assertEqual(self.repo.find_by_id(1)[0], self.pers_1)
+
+    def test_ids(self):
+        ids = self.repo.ids
+        self.assertEqual(len(ids), 0)
+        self.repo.add_to_repo(self.pers_1)
+        self.repo.add_to_repo(self.pers_2)
+        self.assertIn(2, ids)
+        self.assertEqual(len(ids), 2)
+        self.repo.delete_by_id(2)
+        self.assertNotIn(2, ids)
+        self.assertEqual(len(ids), 1)
+
+        # The view stays live across a compaction of the store
+        for person_id in range(3, 6):
+            self.repo.add_to_repo(Person(person_id, f'Person {person_id}', f'07450001{person_id:02d}'))
+        for person_id in (2, 3, 4):
+            if person_id in ids:
+                self.repo.delete_by_id(person_id)
+        _ = self.repo.elements
+        self.repo.add_to_repo(Person(9, 'Ninth Person', '0745000199'))
+        self.assertIn(9, ids)
+        self.assertEqual(list(ids), [1, 5, 9])
+
+    def test_update(self):
+        self.repo.add_to_repo(self.pers_1)
+        self.repo.add_to_repo(self.pers_2)
+        self.assertRaises(RepositoryException, self.repo.update, Person(15, 'New Name', '0745 094 735'))
+        self.repo.update(Person(1, 'New Name', '0745 094 735'))
+        pers1, _ = self.repo.find_by_id(1)
+        self.assertEqual(pers1.name, 'New Name')
+        # The updated entity keeps its position
+        self.assertEqual(self.repo.elements[0].name, 'New Name')
+        self.assertEqual(self.repo.get_all_ids(), [1, 2])
+
+    def test_unique_index(self):
+        self.repo.add_to_repo(self.pers_1)
+        self.repo.add_unique_index('name', lambda name: name.lower())
+        self.assertIn('VLAD BOGDAN', self.repo.get_index('name'))
+        self.assertRaises(AddException, self.repo.add_to_repo, Person(3, 'vlad bogdan', '0251234567'))
+        self.assertNotIn(3, self.repo.ids)
+
+        self.repo.add_to_repo(self.pers_2)
+        self.assertRaises(RepositoryException, self.repo.update, Person(2, 'Vlad Bogdan', '0241234567'))
+        self.repo.update(Person(2, 'New Name', '0241234567'))
+        self.assertEqual(self.repo.get_index('name').get('new name'), 2)
+        self.assertNotIn('test person', self.repo.get_index('name'))
+
+        self.repo.delete_by_id(1)
+        self.assertNotIn('vlad bogdan', self.repo.get_index('name'))
+        self.repo.add_to_repo(Person(3, 'Vlad Bogdan', '0251234567'))
+        self.assertEqual(self.repo.get_index('name').get('Vlad Bogdan'), 3)
+
+
+class TestUniqueIndex(unittest.TestCase):
+    def setUp(self):
+        self.pers_1 = Person(1, 'Vlad Bogdan', '0745000111')
+        self.pers_2 = Person(2, 'Test Person', '0745 000 111')
+        self.index = UniqueIndex('phone_number', lambda phone: phone.replace(' ', ''))
+
+    def test_add_remove(self):
+        self.assertEqual(len(self.index), 0)
+        self.index.add(self.pers_1)
+        self.assertEqual(len(self.index), 1)
+        self.assertEqual(self.index.get('0745 000 111'), 1)
+        self.assertIsNone(self.index.get('0745000112'))
+        self.index.remove(self.pers_2)  # Value owned by another entity
+        self.assertIn('0745000111', self.index)
+        self.index.remove(self.pers_1)
+        self.assertNotIn('0745000111', self.index)
+
+    def test_conflicts_with(self):
+        self.index.add(self.pers_1)
+        self.assertTrue(self.index.conflicts_with(self.pers_2))
+        self.assertFalse(self.index.conflicts_with(self.pers_1))
+        self.index.replace(self.pers_1, Person(1, 'Vlad Bogdan', '0745000999'))
+        self.assertFalse(self.index.conflicts_with(self.pers_2))
+        self.assertEqual(self.index.attribute, 'phone_number')
+
+
+class TestInvertedIndex(unittest.TestCase):
+    def setUp(self):
+        self.activity_1 = Activity(1, datetime.datetime(2021, 5, 17, 10, 30), datetime.datetime(2021, 5, 17, 12, 30),
+                                   "ABC", [1, 2])
+        self.activity_2 = Activity(2, datetime.datetime(2021, 5, 18, 10, 30), datetime.datetime(2021, 5, 18, 12, 30),
+                                   "BCD", [2])
+        self.index = InvertedIndex('persons_id')
+
+    def test_add_remove(self):
+        self.index.add(self.activity_1)
+        self.index.add(self.activity_2)
+        self.assertEqual(self.index.get(1), [1])
+        self.assertEqual(self.index.get(2), [1, 2])
+        self.assertEqual(self.index.get(3), [])
+        self.assertFalse(self.index.conflicts_with(self.activity_1))
+        self.index.remove(self.activity_1)
+        self.assertNotIn(1, self.index)
+        self.assertEqual(self.index.get(2), [2])
+        self.assertEqual(len(self.index), 1)
+
+    def test_replace(self):
+        self.index.add(self.activity_1)
+        updated_activity = Activity(1, self.activity_1.start_date_time, self.activity_1.end_date_time, "ABC", [2, 3])
+        self.index.replace(self.activity_1, updated_activity)
+        self.assertEqual(self.index.get(1), [])
+        self.assertEqual(self.index.get(2), [1])
+        self.assertEqual(self.index.get(3), [1])
+        self.assertEqual(self.index.attribute, 'persons_id')
+
+    def test_repository_index(self):
+        repo = HashedRepo()
+        repo.add_to_repo(self.activity_1)
+        repo.add_inverted_index('persons_id')
+        repo.add_to_repo(self.activity_2)
+        self.assertEqual(repo.get_index('persons_id').get(2), [1, 2])
+        repo.update(Activity(2, self.activity_2.start_date_time, self.activity_2.end_date_time, "BCD", [1]))
+        self.assertEqual(repo.get_index('persons_id').get(1), [1, 2])
+        repo.delete_by_id(1)
+        self.assertEqual(repo.get_index('persons_id').get(1), [2])
+        self.assertNotIn(2, repo.get_index('persons_id'))
+
+
+class TestIntervalIndex(unittest.TestCase):
+    def setUp(self):
+        self.activity_1 = Activity(1, datetime.datetime(2021, 5, 17, 10, 30), datetime.datetime(2021, 5, 17, 12, 30))
+        self.activity_2 = Activity(2, datetime.datetime(2021, 5, 16, 20, 0), datetime.datetime(2021, 5, 18, 8, 0))
+        self.activity_3 = Activity(3, datetime.datetime(2021, 5, 17, 12, 30), datetime.datetime(2021, 5, 17, 14, 0))
+        self.index = IntervalIndex('start_date_time', 'end_date_time')
+        for activity in (self.activity_1, self.activity_2, self.activity_3):
+            self.index.add(activity)
+
+    def test_queries(self):
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index.attribute, 'start_date_time')
+        # Touching intervals do not overlap
+        self.assertEqual(self.index.overlapping(self.activity_1.start_date_time, self.activity_1.end_date_time),
+                         [2, 1])
+        self.assertEqual(self.index.containing(datetime.datetime(2021, 5, 17, 12, 30)), [2, 1, 3])
+        self.assertEqual(self.index.containing(datetime.datetime(2021, 5, 18, 9, 0)), [])
+        self.assertEqual(self.index.touching(datetime.datetime(2021, 5, 18), datetime.datetime(2021, 5, 18, 23, 59)),
+                         [2])
+
+    def test_remove_replace(self):
+        self.index.remove(self.activity_2)
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(self.index.containing(datetime.datetime(2021, 5, 17, 11, 0)), [1])
+        self.index.remove(self.activity_2)
+        self.assertEqual(len(self.index), 2)
+
+        moved_activity = Activity(1, datetime.datetime(2021, 5, 19, 10, 0), datetime.datetime(2021, 5, 19, 11, 0))
+        self.index.replace(self.activity_1, moved_activity)
+        self.assertEqual(self.index.containing(datetime.datetime(2021, 5, 17, 11, 0)), [])
+        self.assertEqual(self.index.containing(datetime.datetime(2021, 5, 19, 10, 0)), [1])
+        self.assertFalse(self.index.conflicts_with(moved_activity))
+
+    def test_random_intervals(self):
+        # Compare the index with a plain scan on random data
+        generator = random.Random(10)
+        index = IntervalIndex('start_date_time', 'end_date_time')
+        activities = {}
+        for activity_id in range(1, 301):
+            start = datetime.datetime(2021, 5, 1) + datetime.timedelta(minutes=generator.randrange(0, 20000, 30))
+            end = start + datetime.timedelta(minutes=generator.randrange(0, 3000, 30))
+            activities[activity_id] = Activity(activity_id, start, end)
+            index.add(activities[activity_id])
+        for activity_id in range(1, 301, 3):
+            index.remove(activities.pop(activity_id))
+
+        for _ in range(50):
+            start = datetime.datetime(2021, 5, 1) + datetime.timedelta(minutes=generator.randrange(0, 20000, 30))
+            end = start + datetime.timedelta(minutes=generator.randrange(0, 3000, 30))
+            expected = {act.id for act in activities.values() if act.start_date_time < end and act.end_date_time > start}
+            self.assertEqual(set(index.overlapping(start, end)), expected)
+            expected = {act.id for act in activities.values() if act.start_date_time <= start <= act.end_date_time}
+            self.assertEqual(set(index.containing(start)), expected)
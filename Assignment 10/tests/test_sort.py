@@ -1,10 +1,16 @@
 import datetime
+import os
+import random
+import tempfile
 import unittest
 from copy import deepcopy
+from unittest.mock import patch
 
 from domain.activity import Activity
 from domain.person import Person
 from utils.algorithms.algorithm import Algorithm
+from utils.algorithms.external_merge_sort import ExternalMergeSort, external_sort
+from utils.algorithms.parallel_merge_sort import ParallelMergeSort
 from utils.iterable_object import MyIterableObject
 from utils.sorting import Sorting
 
@@ -85,7 +91,8 @@ class TestSort(unittest.TestCase):
 
     def test_quick_sort(self):
         sorting_algorithms = [Algorithm.GNOME_SORT, Algorithm.SELECTION_SORT, Algorithm.INSERTION_SORT,
-                              Algorithm.MERGE_SORT, Algorithm.BUBBLE_SORT]
+                              Algorithm.MERGE_SORT, Algorithm.BUBBLE_SORT, Algorithm.TIM_SORT,
+                              Algorithm.PARALLEL_MERGE_SORT, Algorithm.EXTERNAL_MERGE_SORT]
 
         for algo in sorting_algorithms:
             # Simple integers
@@ -140,6 +147,85 @@ class TestSort(unittest.TestCase):
             Sorting.sort(obj3_copy, key=lambda x: (x.description, x.start_date_time), algorithm=algo)
             self.assertEqual(obj3_copy.elements, [self.activity1, self.activity2, self.activity4, self.activity3])
 
+    def test_tim_sort(self):
+        random.seed(17)
+        lists = [[random.randint(0, 10) for _ in range(1000)], [random.random() for _ in range(3000)],
+                 list(range(500)), list(range(500, 0, -1)), [i % 37 for i in range(2000)],
+                 sorted(random.randint(0, 100) for _ in range(700)) +
+                 sorted(random.randint(0, 100) for _ in range(900))]
+        for numbers in lists:
+            for reverse in (False, True):
+                # The positions make equal numbers distinguishable, so the stability is checked as well
+                data = [(number, position) for position, number in enumerate(numbers)]
+                Sorting.sort(data, key=lambda x: x[0], reverse=reverse, algorithm=Algorithm.TIM_SORT)
+                self.assertEqual(data, sorted(data, key=lambda x: x[0], reverse=reverse))
+
+        # The key of every element is computed only once
+        key_calls = []
+        data = [random.randint(0, 100) for _ in range(1000)]
+        Sorting.sort(data, key=lambda x: key_calls.append(x) or x, algorithm=Algorithm.TIM_SORT)
+        self.assertEqual(len(key_calls), 1000)
+        self.assertEqual(data, sorted(key_calls))
+
+    def test_parallel_merge_sort(self):
+        random.seed(19)
+        activities = [Activity(activity_id, datetime.datetime(2021, 5, random.randint(1, 3), 10, 30),
+                               datetime.datetime(2021, 5, 4, 12, 30), random.choice("ABC"), [])
+                      for activity_id in range(1, 2001)]
+        with patch.object(ParallelMergeSort, 'threshold', 0), patch.object(ParallelMergeSort, 'workers', 3):
+            for reverse in (False, True):
+                data = MyIterableObject(activities)
+                Sorting.sort(data, key=lambda x: (x.start_date_time, x.description), reverse=reverse,
+                             algorithm=Algorithm.PARALLEL_MERGE_SORT)
+                # Stable: the built-in sort is stable as well
+                self.assertEqual(data.elements, sorted(activities, key=lambda x: (x.start_date_time, x.description),
+                                                       reverse=reverse))
+
+            # Keys which cannot be sent to the worker processes: sorted in this process
+            class Key:
+                def __init__(self, value):
+                    self.value = value
+
+                def __lt__(self, other):
+                    return self.value < other.value
+
+            data = list(range(100, 0, -1))
+            Sorting.sort(data, key=lambda x: Key(x), algorithm=Algorithm.PARALLEL_MERGE_SORT)
+            self.assertEqual(data, list(range(1, 101)))
+
+    def test_external_merge_sort(self):
+        random.seed(20)
+        pairs = [(random.randint(1, 20), position) for position in range(1000)]
+        for reverse in (False, True):
+            expected = sorted(pairs, key=lambda x: x[0], reverse=reverse)
+            # A single run, several runs, and more runs than can be merged at once (several merge passes)
+            for run_size, max_fan_in in ((1000, 2), (100, 64), (7, 3)):
+                self.assertEqual(list(external_sort(iter(pairs), lambda x: x[0], reverse, run_size, max_fan_in)),
+                                 expected)
+        self.assertEqual(list(external_sort([], run_size=2)), [])
+
+        # The temporary files are removed, also when the merge is not read to the end
+        directory = tempfile.mkdtemp()
+        try:
+            merged = external_sort(pairs, lambda x: x[0], run_size=10, directory=directory)
+            self.assertEqual(next(merged), min(pairs))
+            self.assertNotEqual(os.listdir(directory), [])
+            merged.close()
+            self.assertEqual(os.listdir(directory), [])
+        finally:
+            os.rmdir(directory)
+
+        activities = [Activity(activity_id, datetime.datetime(2021, 5, random.randint(1, 3), 10, 30),
+                               datetime.datetime(2021, 5, 4, 12, 30), random.choice("ABC"), [])
+                      for activity_id in range(1, 501)]
+        with patch.object(ExternalMergeSort, 'run_size', 50), patch.object(ExternalMergeSort, 'max_fan_in', 4):
+            for reverse in (False, True):
+                data = MyIterableObject(activities)
+                Sorting.sort(data, key=lambda x: (x.start_date_time, x.description), reverse=reverse,
+                             algorithm=Algorithm.EXTERNAL_MERGE_SORT)
+                self.assertEqual(data.elements, sorted(activities, key=lambda x: (x.start_date_time, x.description),
+                                                       reverse=reverse))
+
     # def test_2(self):
     #
     #     # Simple integers
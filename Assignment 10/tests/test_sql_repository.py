@@ -0,0 +1,308 @@
+import datetime
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from domain.activity import Activity
+from domain.person import Person
+from repository.repository_exceptions import AddException, DeleteException, RepositoryException
+from sql_repository.lazy_sql_activity_repository import LazySqlActivityRepository
+from sql_repository.lazy_sql_person_repository import LazySqlPersonRepository
+from sql_repository.lazy_sql_repository import BATCH_SIZE, LazySqlRepository
+from sql_repository import schema
+from sql_repository.sql_activity_repository import SqlActivityRepository
+from sql_repository.sql_person_repository import SqlPersonRepository
+
+# The tables used before the schema was versioned
+LEGACY_SCHEMA = """
+CREATE TABLE persons (ID INTEGER PRIMARY KEY, Name TEXT NOT NULL, PhoneNumber TEXT UNIQUE);
+CREATE TABLE activities (ID INTEGER PRIMARY KEY, StartDateTime TEXT NOT NULL, EndDateTime TEXT NOT NULL,
+                         Description TEXT);
+CREATE TABLE activity_person (ID_Activity INTEGER, ID_Person INTEGER);
+"""
+
+
+def create_database(person_ids=()):
+    """
+    Creates an empty database file (the repositories create the schema) with a few persons in it
+    """
+    file_descriptor, file_name = tempfile.mkstemp(suffix='.db')
+    os.close(file_descriptor)
+    connection = schema.connect(file_name)
+    connection.executemany("INSERT INTO persons (ID, Name, PhoneNumber) VALUES (?, ?, ?);",
+                           [(person_id, f"Person {person_id}", f"07{person_id:08d}") for person_id in person_ids])
+    connection.commit()
+    connection.close()
+    return file_name
+
+
+def remove_database(file_name):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(file_name + suffix):
+            os.remove(file_name + suffix)
+
+
+class TestSqlRepository(unittest.TestCase):
+    def setUp(self):
+        self.file_name = create_database(person_ids=range(1, 5))
+        self.activity_repo = SqlActivityRepository(self.file_name)
+        self.person_repo = SqlPersonRepository(self.file_name)
+        self.activity1 = Activity(1, datetime.datetime(2021, 5, 17, 10, 30), datetime.datetime(2021, 5, 17, 12, 30),
+                                  "Hiking", [1, 2, 3])
+
+    def tearDown(self):
+        del self.activity_repo, self.person_repo
+        remove_database(self.file_name)
+
+    def read_participants(self, activity_id):
+        connection = sqlite3.connect(self.file_name)
+        rows = connection.execute("SELECT ID_Person FROM activity_person WHERE ID_Activity = ?;", (activity_id,))
+        person_ids = sorted(row[0] for row in rows)
+        connection.close()
+        return person_ids
+
+    def test_add_update_delete(self):
+        self.activity_repo.add_to_repo(self.activity1)
+        self.assertEqual(self.read_participants(1), [1, 2, 3])
+
+        self.activity_repo.update(Activity(1, self.activity1.start_date_time, self.activity1.end_date_time,
+                                           "Hiking and swimming", [2, 3, 4]))
+        self.assertEqual(self.read_participants(1), [2, 3, 4])
+        self.assertEqual(SqlActivityRepository(self.file_name).find_by_id(1)[0].description, "Hiking and swimming")
+
+        self.activity_repo.delete_by_id(1)
+        self.assertEqual(self.read_participants(1), [])
+        self.assertEqual(SqlActivityRepository(self.file_name).elements, [])
+
+    def test_transaction_commit(self):
+        with self.activity_repo.transaction():
+            self.activity_repo.add_to_repo(self.activity1)
+            with self.activity_repo.transaction():
+                self.activity_repo.add_to_repo(Activity(2, self.activity1.start_date_time,
+                                                        self.activity1.end_date_time, "Reading", [1]))
+            # Nothing is committed before the end of the outermost block
+            self.assertEqual(self.read_participants(2), [])
+        self.assertEqual(self.read_participants(1), [1, 2, 3])
+        self.assertEqual(self.read_participants(2), [1])
+
+    def test_transaction_rollback(self):
+        self.person_repo.add_to_repo(Person(5, 'Vlad Bogdan', '0745 000 111'))
+        with self.assertRaises(ValueError):
+            with self.person_repo.transaction():
+                self.person_repo.add_to_repo(Person(6, 'Test Person', '0241 234 567'))
+                self.person_repo.delete_by_id(5)
+                raise ValueError("Abort the transaction")
+        self.assertEqual(self.person_repo.get_all_ids(), [1, 2, 3, 4, 5])
+        self.assertEqual(SqlPersonRepository(self.file_name).get_all_ids(), [1, 2, 3, 4, 5])
+
+    def test_foreign_keys(self):
+        self.activity_repo.add_to_repo(self.activity1)
+        self.person_repo.delete_by_id(2)
+        self.assertEqual(self.read_participants(1), [1, 3])
+        with self.assertRaises(RepositoryException):
+            self.activity_repo.add_to_repo(Activity(2, self.activity1.start_date_time, self.activity1.end_date_time,
+                                                    "Reading", [7]))
+        self.assertNotIn(2, self.activity_repo.ids)
+        self.assertEqual(self.read_participants(2), [])
+
+
+class TestSchema(unittest.TestCase):
+    def setUp(self):
+        file_descriptor, self.file_name = tempfile.mkstemp(suffix='.db')
+        os.close(file_descriptor)
+
+    def tearDown(self):
+        remove_database(self.file_name)
+
+    def test_migrate_legacy_database(self):
+        connection = sqlite3.connect(self.file_name)
+        connection.executescript(LEGACY_SCHEMA)
+        connection.execute("INSERT INTO persons VALUES (1, 'Vlad Bogdan', '0745 000 111');")
+        connection.execute("INSERT INTO activities VALUES (1, '17/05/2021 10:30', '17/05/2021 12:30', 'Hiking');")
+        # The link to person 2 (which does not exist) is dropped by the migration
+        connection.executemany("INSERT INTO activity_person VALUES (?, ?);", [(1, 2), (1, 1)])
+        connection.commit()
+        connection.close()
+
+        connection = schema.connect(self.file_name)
+        self.assertEqual(schema.schema_version(connection), schema.SCHEMA_VERSION)
+        self.assertEqual(connection.execute("PRAGMA journal_mode;").fetchone()[0], 'wal')
+        self.assertEqual(connection.execute("SELECT * FROM activity_person;").fetchall(), [(1, 1)])
+        index_names = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index';")}
+        self.assertLessEqual({'activity_person_activity', 'activity_person_person', 'activities_interval'},
+                             index_names)
+        plan = connection.execute("EXPLAIN QUERY PLAN SELECT ID_Activity FROM activity_person WHERE ID_Person = ?;",
+                                  (1,)).fetchall()
+        self.assertIn('COVERING INDEX activity_person_person', plan[0][-1])
+        self.assertEqual(schema.migrate(connection), schema.SCHEMA_VERSION)
+        connection.close()
+
+        self.assertEqual(SqlActivityRepository(self.file_name).find_by_id(1)[0].persons_id, [1])
+
+    def test_newer_schema(self):
+        connection = sqlite3.connect(self.file_name)
+        connection.execute(f"PRAGMA user_version = {schema.SCHEMA_VERSION + 1};")
+        connection.close()
+        with self.assertRaises(RepositoryException):
+            schema.connect(self.file_name)
+
+    def test_read_only(self):
+        connection = sqlite3.connect(self.file_name)
+        connection.executescript(LEGACY_SCHEMA)
+        connection.execute("INSERT INTO persons VALUES (3, 'Ana Pop', '0745 000 222');")
+        connection.commit()
+        connection.close()
+        # An older database is read as it is, and left unchanged
+        repo = LazySqlPersonRepository(self.file_name, read_only=True)
+        self.assertEqual([person.name for person in repo.elements], ['Ana Pop'])
+        repo.connection.close()
+        connection = sqlite3.connect(self.file_name)
+        self.assertEqual((schema.schema_version(connection), connection.execute("PRAGMA journal_mode;").fetchone()[0]),
+                         (0, 'delete'))
+        connection.execute("DELETE FROM persons;")
+        connection.execute(f"PRAGMA user_version = {schema.SCHEMA_VERSION + 1};")
+        connection.commit()
+        connection.close()
+        # A newer one is refused
+        self.assertRaises(RepositoryException, schema.connect, self.file_name, read_only=True)
+        connection = sqlite3.connect(self.file_name)
+        connection.execute("PRAGMA user_version = 0;")
+        connection.close()
+
+        connection = schema.connect(self.file_name)
+        connection.execute("INSERT INTO persons VALUES (1, 'Vlad Bogdan', '0745 000 111');")
+        connection.commit()
+        connection.close()
+        repo = LazySqlPersonRepository(self.file_name, read_only=True)
+        self.assertEqual([person.name for person in repo.elements], ['Vlad Bogdan'])
+        with self.assertRaises(sqlite3.OperationalError):
+            repo.add_to_repo(Person(2, 'Test Person', '0241 234 567'))
+        repo.connection.close()
+        self.assertRaises(RepositoryException, schema.connect, self.file_name + '.missing', read_only=True)
+
+
+class TestLazySqlRepository(unittest.TestCase):
+    def setUp(self):
+        self.file_name = create_database()
+        self.activity_repo = LazySqlActivityRepository(self.file_name, cache_size=2)
+        self.person_repo = LazySqlPersonRepository(self.file_name, cache_size=2)
+
+    def tearDown(self):
+        del self.activity_repo, self.person_repo
+        remove_database(self.file_name)
+
+    def add_persons(self, person_ids):
+        with self.person_repo.transaction():
+            for person_id in person_ids:
+                self.person_repo.add_to_repo(Person(person_id, f"Person {person_id}", f"07{person_id:08d}"))
+
+    def add_activity(self, activity_id, start, end, persons_id):
+        self.activity_repo.add_to_repo(Activity(activity_id, datetime.datetime(2021, 5, 17, *start),
+                                                datetime.datetime(2021, 5, 17, *end), f"Activity {activity_id}",
+                                                persons_id))
+
+    def test_find_add_update_delete(self):
+        self.person_repo.add_to_repo(Person(2, 'Test Person', '0241 234 567'))
+        self.person_repo.add_to_repo(Person(1, 'Vlad Bogdan', '0745 000 111'))
+        self.person_repo.add_to_repo(Person(3, 'Marius Vlad', '0726 712 567'))
+        # Person 2 was evicted from the cache, so it is read back from the database
+        person, _ = self.person_repo.find_by_id(2)
+        self.assertEqual(person.name, 'Test Person')
+        self.assertEqual(self.person_repo.find_by_id(4), (None, None))
+        self.assertIn(3, self.person_repo.ids)
+        self.assertNotIn(4, self.person_repo.ids)
+        self.assertEqual(len(self.person_repo.ids), 3)
+        self.assertEqual(self.person_repo.get_all_ids(), [1, 2, 3])
+        with self.assertRaises(AddException):
+            self.person_repo.add_to_repo(Person(1, 'Other Person', '0745 000 222'))
+
+        self.person_repo.update(Person(1, 'Vlad Bogdan', '0745 999 111'))
+        self.assertEqual(LazySqlPersonRepository(self.file_name).find_by_id(1)[0].phone_number, '0745 999 111')
+        with self.assertRaises(RepositoryException):
+            self.person_repo.update(Person(4, 'Other Person', '0745 000 222'))
+
+        self.person_repo.delete_by_id(1)
+        self.assertEqual(self.person_repo.find_by_id(1), (None, None))
+        with self.assertRaises(DeleteException):
+            self.person_repo.delete_by_id(1)
+
+    def test_elements(self):
+        self.add_persons(range(1, BATCH_SIZE + 12))
+        with self.activity_repo.transaction():
+            for activity_id in range(BATCH_SIZE + 10, 0, -1):
+                self.add_activity(activity_id, (10, 0), (11, 0), [activity_id, activity_id + 1])
+        elements = self.activity_repo.elements
+        self.assertEqual(len(elements), BATCH_SIZE + 10)
+        self.assertEqual([activity.id for activity in elements], list(range(1, BATCH_SIZE + 11)))
+        self.assertEqual(elements[0].persons_id, [1, 2])
+        self.assertEqual(elements[-1].id, BATCH_SIZE + 10)
+        self.assertEqual([activity.id for activity in elements[2:4]], [3, 4])
+        with self.assertRaises(IndexError):
+            _ = elements[BATCH_SIZE + 10]
+
+    def test_missing_hooks(self):
+        class ReadOnlyPersonRepository(LazySqlRepository):
+            def _entities_from_rows(self, rows):
+                return [Person(row[0], row[1], row[2]) for row in rows]
+
+        # A subclass which does not implement all the hooks cannot be created
+        with self.assertRaises(TypeError):
+            ReadOnlyPersonRepository(self.file_name, 'persons', {'id': 'ID', 'name': 'Name',
+                                                                 'phone_number': 'PhoneNumber'})
+
+    def test_search(self):
+        self.person_repo.add_to_repo(Person(1, 'Vlad Bogdan', '0745 000 111'))
+        self.person_repo.add_to_repo(Person(2, 'Test Person', '0241 234 567'))
+        self.assertEqual([person.id for person in self.person_repo.search('name', 'bogdan', str.lower)], [1])
+        self.assertEqual(self.person_repo.search('name', 'bogdan'), [])
+        found = self.person_repo.search('phone_number', '0241234', lambda value: value.replace(' ', ''))
+        self.assertEqual([person.id for person in found], [2])
+
+    def test_unique_index(self):
+        self.person_repo.add_to_repo(Person(1, 'Vlad Bogdan', '0745 000 111'))
+        self.person_repo.add_unique_index('name', str.lower)
+        index = self.person_repo.get_index('name')
+        self.assertIn('VLAD BOGDAN', index)
+        self.assertEqual(index.get('vlad bogdan'), 1)
+        with self.assertRaises(AddException):
+            self.person_repo.add_to_repo(Person(2, 'vlad bogdan', '0241 234 567'))
+        self.person_repo.update(Person(1, 'Test Person', '0745 000 111'))
+        self.assertNotIn('Vlad Bogdan', index)
+        self.assertEqual(len(index), 1)
+
+        self.person_repo.add_to_repo(Person(2, 'Vlad Bogdan', '0241 234 567'))
+        with self.assertRaises(RepositoryException):
+            self.person_repo.update(Person(2, 'test person', '0241 234 567'))
+        with self.assertRaises(ValueError):
+            with self.person_repo.transaction():
+                self.person_repo.delete_by_id(1)
+                raise ValueError("Abort the transaction")
+        self.assertEqual(index.get('test person'), 1)
+        self.assertEqual(self.person_repo.find_by_id(1)[0].name, 'Test Person')
+
+    def test_activity_indexes(self):
+        self.activity_repo.add_inverted_index('persons_id')
+        self.activity_repo.add_interval_index('start_date_time', 'end_date_time')
+        with self.assertRaises(RepositoryException):
+            self.activity_repo.add_inverted_index('description')
+        self.add_persons([1, 2, 3])
+        self.add_activity(1, (10, 0), (12, 0), [1, 2])
+        self.add_activity(2, (9, 0), (10, 0), [2])
+        self.add_activity(3, (12, 0), (13, 30), [3])
+        self.activity_repo.update(Activity(3, datetime.datetime(2021, 5, 17, 11, 0),
+                                           datetime.datetime(2021, 5, 17, 13, 30), "Activity 3", [3, 2]))
+
+        persons_index = self.activity_repo.get_index('persons_id')
+        self.assertEqual(persons_index.get(2), [1, 2, 3])
+        self.assertNotIn(4, persons_index)
+
+        interval_index = self.activity_repo.get_index('start_date_time')
+        day = datetime.datetime(2021, 5, 17)
+        self.assertEqual(interval_index.overlapping(day.replace(hour=10), day.replace(hour=11)), [1])
+        self.assertEqual(interval_index.containing(day.replace(hour=10)), [2, 1])
+        self.assertEqual(interval_index.containing(day.replace(hour=10, second=30)), [1])
+        self.assertEqual(interval_index.touching(day, day.replace(hour=23, minute=59, second=59)), [2, 1, 3])
+        self.activity_repo.delete_by_id(1)
+        self.assertEqual(interval_index.containing(day.replace(hour=11, minute=30)), [3])
+        self.assertEqual(persons_index.get(1), [])
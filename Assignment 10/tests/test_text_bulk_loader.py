@@ -0,0 +1,68 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from domain.validators import ActivityDateException
+from text_file_repository import text_bulk_loader
+from text_file_repository.text_file_activity_repo import TextFileActivityRepository
+from text_file_repository.text_file_person_repo import TextFilePersonRepository
+
+
+class TestTextBulkLoader(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.directory, 'activities.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, text):
+        with open(self.file_name, 'wb') as f:
+            f.write(text.encode('utf-8'))
+
+    def test_fast_path(self):
+        activity = text_bulk_loader.activity_from_line('4;2021-05-11 18:30:00;2021-05-21 22:00:00;Funny meeting;[1, 2]')
+        self.assertEqual((activity.id, activity.start_date_time, activity.end_date_time, activity.description,
+                          activity.persons_id),
+                         (4, datetime.datetime(2021, 5, 11, 18, 30), datetime.datetime(2021, 5, 21, 22, 0),
+                          'Funny meeting', [1, 2]))
+        self.assertEqual(text_bulk_loader.parse_int_list('[]'), [])
+        self.assertEqual(text_bulk_loader.parse_int_list('[7]'), [7])
+        for text in ('2021-05-11 18:30', '2021/05/11 18:30:00', '2021-05-11 18:30:xx', '2021-13-11 18:30:00'):
+            self.assertRaises(ValueError, text_bulk_loader.parse_date_time, text)
+        for text in ('1, 2', '[1, a]', '[1,, 2]'):
+            self.assertRaises(ValueError, text_bulk_loader.parse_int_list, text)
+
+    def test_bulk_load(self):
+        self.write('4;2021-05-11 18:30:00;2021-05-21 22:00:00;Funny meeting;[1, 2]\r\n'
+                   '\n'
+                   '5;2021-05-10 10:00;2021-05-18 12:00:00;Hiking ăîș;[]\n'
+                   '6;2021-05-11 14:45:00;2021-05-21 17:00:00;football;[3]')
+        activities, statistics = text_bulk_loader.bulk_load(self.file_name, text_bulk_loader.activity_from_line,
+                                                            TextFileActivityRepository.activity_from_line)
+        self.assertEqual([(activity.id, activity.start_date_time, activity.description, activity.persons_id)
+                          for activity in activities],
+                         [(4, datetime.datetime(2021, 5, 11, 18, 30), 'Funny meeting', [1, 2]),
+                          (5, datetime.datetime(2021, 5, 10, 10, 0), 'Hiking ăîș', []),
+                          (6, datetime.datetime(2021, 5, 11, 14, 45), 'football', [3])])
+        # The start of activity 5 is not in the 'YYYY-MM-DD HH:MM:SS' format, so it went through the validator
+        self.assertEqual((statistics.records, statistics.fallbacks), (3, 1))
+        self.assertGreater(statistics.records_per_second, 0)
+
+    def test_malformed_line(self):
+        self.write('4;2021-05-32 18:30:00;2021-05-21 22:00:00;Funny meeting;[1, 2]\n')
+        self.assertRaises(ActivityDateException, TextFileActivityRepository, self.file_name)
+
+    def test_repositories(self):
+        self.write('')
+        repo = TextFileActivityRepository(self.file_name)
+        self.assertEqual(repo.load_statistics.records, 0)
+        file_name = os.path.join(self.directory, 'persons.txt')
+        with open(file_name, 'wb') as f:
+            f.write(b'1;Vlad Bogdan;0745 000 111\r\n2;Test Person;0241 234 567\r\n')
+        repo = TextFilePersonRepository(file_name)
+        self.assertEqual([(person.id, person.phone_number) for person in repo.elements],
+                         [(1, '0745 000 111'), (2, '0241 234 567')])
+        self.assertEqual((repo.load_statistics.records, repo.load_statistics.fallbacks), (2, 0))
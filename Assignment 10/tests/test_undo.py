@@ -24,13 +24,8 @@ class TestUndo(unittest.TestCase):
                                                   self.__redo_repo)
         self.__person_service = PersonService(self.__person_repo, PersonIDValidator, PhoneNumberValidator,
                                               self.__undo_repo, self.__redo_repo)
-        double_pop_fns = (self.__activity_service.delete_person_from_activities, self.__person_service.add_person)
-        double_pop_fns_counter_part = (self.__person_service.delete_person_by_id,
-                                       self.__activity_service.add_person_to_activities)
-        self.__redo_service = RedoService(self.__redo_repo, double_pop_fns, double_pop_fns_counter_part)
-        self.__undo_service = UndoService(self.__undo_repo, double_pop_fns, double_pop_fns_counter_part)
-        self.__double_undo_fns = (self.__person_service.add_person,
-                                  self.__activity_service.delete_person_from_activities)
+        self.__redo_service = RedoService(self.__redo_repo)
+        self.__undo_service = UndoService(self.__undo_repo)
 
         self.__person_service.add_person(1, "Vlad Bogdan", '0745000222')
         self.__person_service.add_person(2, "Test Person", '0745999111')
@@ -262,3 +257,69 @@ class TestUndo(unittest.TestCase):
         activity1, _ = self.__activity_service.find_activity_by_id(1)
         self.assertEqual(activity1.description, initial_activity1_description)
         self.assertRaises(UndoException, self.__undo_service.apply_undo)
+
+
+    # ----------------------------------------------- #
+    # -------- BOUNDED AND COALESCING STACKS -------- #
+    # ----------------------------------------------- #
+
+    def test_bounded_undo_stack(self):
+        undo_repo = UndoRepository(max_depth=3)
+        for step in range(5):
+            undo_repo.record_inverse_operations(print, step)
+        self.assertEqual(len(undo_repo), 3)
+        # The oldest operations were evicted
+        self.assertEqual([undo_repo.get_reverse_operation()[1] for _ in range(3)], [(4,), (3,), (2,)])
+        self.assertEqual(undo_repo.size_in_bytes, 0)
+
+        undo_repo = UndoRepository(max_bytes=2000)
+        for step in range(100):
+            undo_repo.record_inverse_operations(print, step, list(range(10)))
+        self.assertLessEqual(undo_repo.size_in_bytes, 2000)
+        self.assertGreater(len(undo_repo), 1)
+        self.assertEqual(undo_repo.see_top_of_stack(), (print, (99, list(range(10)))))
+        # The newest operation is kept, even if it is over the budget alone
+        undo_repo.record_inverse_operations(print, list(range(1000)))
+        self.assertEqual(len(undo_repo), 1)
+        undo_repo.clear_stack()
+        self.assertEqual(undo_repo.size_in_bytes, 0)
+
+    def test_undo_coalescing(self):
+        undo_repo = UndoRepository(coalesce=True)
+        redo_repo = RedoRepository()
+        activity_service = ActivityService(self.__activity_repo, self.__person_repo, DateTimeValidator,
+                                           PersonIDValidator, undo_repo, redo_repo)
+        person_service = PersonService(self.__person_repo, PersonIDValidator, PhoneNumberValidator, undo_repo,
+                                       redo_repo)
+        undo_service = UndoService(undo_repo)
+        redo_service = RedoService(redo_repo)
+
+        # Consecutive updates of the same description are undone (and redone) at once
+        for description in ("First", "Second", "Third"):
+            activity_service.update_activity_description(1, description)
+        activity_service.update_activity_description(2, "Other")
+        person_service.update_person_name(1, "New Name")
+        person_service.update_person_name(1, "Newer Name")
+        self.assertEqual(len(undo_repo), 3)
+        undo_service.apply_undo()
+        self.assertEqual(person_service.find_person_by_id(1)[0].name, self.person1.name)
+        undo_service.apply_undo()
+        undo_service.apply_undo()
+        self.assertEqual(activity_service.find_activity_by_id(1)[0].description, self.activity1.description)
+        self.assertEqual(activity_service.find_activity_by_id(2)[0].description, self.activity2.description)
+        redo_service.apply_redo()
+        self.assertEqual(activity_service.find_activity_by_id(1)[0].description, "Third")
+
+        # An update recorded after an undo is not coalesced with the operation below the undone one
+        activity_service.update_activity_description(2, "Another")
+        self.assertEqual(len(undo_repo), 2)
+
+        # A run of additions of persons to the same activity
+        person_service.add_person(3, "Third Person", '0745111333')
+        person_service.add_person(4, "Fourth Person", '0745111444')
+        undo_repo.clear_stack()
+        activity_service.add_persons_by_id_to_activity(2, [3])
+        activity_service.add_persons_by_id_to_activity(2, "4, 1")
+        self.assertEqual(len(undo_repo), 1)
+        undo_service.apply_undo()
+        self.assertEqual(activity_service.find_activity_by_id(2)[0].persons_id, self.activity2.persons_id)
@@ -0,0 +1,112 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from domain.validators import DateTimeValidator, PersonIDValidator, PhoneNumberValidator, UndoException
+from repository.hashed_repo import Repository
+from repository.repository_exceptions import RepositoryException
+from repository.undo_redo_log import UndoRedoLog
+from repository.undo_redo_repo import RedoRepository, UndoRepository
+from services.activity_service import ActivityService
+from services.person_service import PersonService
+from services.redo_service import RedoService
+from services.undo_service import UndoService
+
+
+class TestUndoRedoLog(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.directory, 'undo_redo.log')
+        # The persons and activities outlive the restarts (as if they were in files)
+        self.person_repo = Repository()
+        self.activity_repo = Repository()
+        self.log = None
+        self.start()
+        self.person_service.add_person(1, "Vlad Bogdan", '0745000222')
+        self.person_service.add_person(2, "Test Person", '0745999111')
+        self.activity_service.add_activity(1, "17/5/2030 10:30", "17/5/2030 17:00", "Hiking", "1, 2")
+
+    def tearDown(self):
+        self.log.close()
+        shutil.rmtree(self.directory)
+
+    def start(self, tail=None, compaction_min_records=1000):
+        """
+        Starts (or restarts) the application: new services and stacks, with the history loaded from the log
+        """
+        if self.log is not None:
+            self.log.close()
+        self.undo_repo = UndoRepository(coalesce=True)
+        self.redo_repo = RedoRepository()
+        self.activity_service = ActivityService(self.activity_repo, self.person_repo, DateTimeValidator,
+                                                PersonIDValidator, self.undo_repo, self.redo_repo)
+        self.person_service = PersonService(self.person_repo, PersonIDValidator, PhoneNumberValidator,
+                                            self.undo_repo, self.redo_repo)
+        self.undo_service = UndoService(self.undo_repo)
+        self.redo_service = RedoService(self.redo_repo)
+        self.log = UndoRedoLog(self.file_name, {'persons': self.person_service, 'activities': self.activity_service},
+                               tail, compaction_min_records, sync=False)
+        self.log.attach(self.undo_repo, self.redo_repo)
+
+    def test_restart(self):
+        self.activity_service.update_activity_description(1, "Climbing")
+        self.activity_service.update_activity_description(1, "Skiing")
+        with self.person_service.batch():
+            self.activity_service.delete_person_from_activities(2)
+            self.person_service.delete_person_by_id(2)
+        self.undo_service.apply_undo()
+        self.start()
+        self.assertEqual((len(self.undo_repo), len(self.redo_repo)), (4, 1))
+
+        # The batch is redone (and undone) in one step
+        self.redo_service.apply_redo()
+        self.assertIsNone(self.person_service.find_person_by_id(2)[0])
+        self.start()
+        self.undo_service.apply_undo()
+        self.assertIsNotNone(self.person_service.find_person_by_id(2)[0])
+        self.assertEqual(self.activity_service.find_activity_by_id(1)[0].persons_id, [1, 2])
+        # The coalesced updates of the description
+        self.undo_service.apply_undo()
+        self.assertEqual(self.activity_service.find_activity_by_id(1)[0].description, "Hiking")
+        for _ in range(3):
+            self.undo_service.apply_undo()
+        self.assertEqual(len(self.person_service.get_all_persons()), 0)
+        self.assertRaises(UndoException, self.undo_service.apply_undo)
+        self.start()
+        self.assertEqual((len(self.undo_repo), len(self.redo_repo)), (0, 5))
+
+    def test_tail_and_compaction(self):
+        for step in range(10):
+            self.person_service.update_person_phone_number(1, '07450002%02d' % step)
+            self.person_service.update_person_name(1, "Name " + "ABCDEFGHIJ"[step])
+        self.start(tail=5)
+        self.assertEqual(len(self.undo_repo), 5)
+        self.assertEqual(self.log.records, 5)
+        self.undo_service.apply_undo()
+        self.assertEqual(self.person_service.find_person_by_id(1)[0].name, "Name I")
+
+        self.start(compaction_min_records=3)
+        for step in range(10):
+            self.person_service.update_person_phone_number(1, '07450003%02d' % step)
+        self.assertLessEqual(self.log.records, 3 + len(self.undo_repo))
+        self.start()
+        # The 10 updates were coalesced (and the redo stack was cleared)
+        self.assertEqual((len(self.undo_repo), len(self.redo_repo)), (5, 0))
+        self.undo_service.apply_undo()
+        self.assertEqual(self.person_service.find_person_by_id(1)[0].phone_number, '0745 000 209')
+
+    def test_damaged_log(self):
+        self.log.close()
+        # A record cut off by a crash is dropped
+        with open(self.file_name, 'a') as log:
+            log.write('["undo","pu')
+        self.start()
+        self.assertEqual(len(self.undo_repo), 3)
+        self.log.close()
+        # An operation which cannot be undone is not loaded
+        with open(self.file_name, 'a') as log:
+            log.write(json.dumps(['undo', 'push', ['persons', 'generate_random_ids', [5]]]) + '\n')
+        self.log = None
+        self.assertRaises(RepositoryException, self.start)
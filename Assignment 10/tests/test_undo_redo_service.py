@@ -1,6 +1,6 @@
 import unittest
 
-from domain.validators import DateTimeValidator, PersonIDValidator, PhoneNumberValidator
+from domain.validators import DateTimeValidator, PersonIDException, PersonIDValidator, PhoneNumberValidator
 # from repository.in_memory_repo import Repository
 from repository.custom_repo import Repository
 from repository.undo_redo_repo import RedoRepository, UndoRepository
@@ -32,19 +32,60 @@ class TestUndoRedoService(unittest.TestCase):
         self.person_service.add_person(2, 'Test Person', '0258674536')
         self.activity_service.add_activity(1, "17/5/2021 10:30", "17/5/2021 17:00", "Hiking", "1, 2")
         self.activity_service.add_activity(2, "20/6/2023 9:00", "20/6/2023 20:30", "Vacation", [2])
-        self.double_pop_fns = (self.person_service.add_person, self.activity_service.delete_person_from_activities)
-        self.double_pop_fns_counter_part = (self.person_service.delete_person_by_id,
-                                            self.activity_service.add_person_to_activities)
+        self.undo_repository.clear_stack()
+        self.redo_repository.clear_stack()
 
-        self.undo_service = UndoService(self.undo_repository, self.double_pop_fns, self.double_pop_fns_counter_part)
-        self.redo_service = RedoService(self.redo_repository, self.double_pop_fns, self.double_pop_fns_counter_part)
+        self.undo_service = UndoService(self.undo_repository)
+        self.redo_service = RedoService(self.redo_repository)
 
-    def test_undo_double_pop(self):
-        self.undo_service.record_inverse_operations(self.person_service.delete_person_by_id, 1)
-        self.undo_service.record_inverse_operations(self.activity_service.delete_person_from_activities, 1, '1, 2')
+    def test_undo_batch(self):
+        # The removal of a person from the activities and the deletion of the person are undone together
+        with self.person_service.batch():
+            self.activity_service.delete_person_from_activities(2)
+            self.person_service.delete_person_by_id(2)
+        self.assertEqual(len(self.undo_repository), 1)
         self.undo_service.apply_undo()
+        self.assertIsNotNone(self.person_service.find_person_by_id(2)[0])
+        self.assertIn(2, self.activity_service.find_activity_by_id(1)[0].persons_id)
+        self.assertIn(2, self.activity_service.find_activity_by_id(2)[0].persons_id)
+        self.assertEqual(len(self.undo_repository), 0)
+        self.assertEqual(len(self.redo_repository), 1)
 
-    def test_redo_double_pop(self):
-        self.redo_service.record_inverse_operations(self.person_service.delete_person_by_id, 1)
-        self.redo_service.record_inverse_operations(self.activity_service.delete_person_from_activities, 1, '1, 2')
+        # A bulk import is a single operation, and so is a batch with a single operation
+        with self.person_service.batch():
+            for person_id, name in zip(range(10, 15), "ABCDE"):
+                self.person_service.add_person(person_id, "Person " + name, "07451234%02d" % person_id)
+        self.assertEqual(len(self.undo_repository), 1)
+        with self.activity_service.batch():
+            with self.person_service.batch():
+                self.person_service.update_person_name(1, 'Other Name')
+        self.assertEqual(self.undo_repository.see_top_of_stack(), (self.person_service.update_person_name,
+                                                                   (1, 'Vlad Bogdan')))
+        self.undo_service.apply_undo()
+        self.undo_service.apply_undo()
+        self.assertEqual(len(self.person_service.get_all_persons()), 2)
+
+    def test_redo_batch(self):
+        with self.person_service.batch():
+            self.activity_service.delete_person_from_activities(2)
+            self.person_service.delete_person_by_id(2)
+        self.undo_service.apply_undo()
         self.redo_service.apply_redo()
+        self.assertIsNone(self.person_service.find_person_by_id(2)[0])
+        self.assertNotIn(2, self.activity_service.find_activity_by_id(1)[0].persons_id)
+        self.assertEqual(len(self.redo_repository), 0)
+        # The redo recorded a single undo operation as well
+        self.assertEqual(len(self.undo_repository), 1)
+        self.undo_service.apply_undo()
+        self.assertIsNotNone(self.person_service.find_person_by_id(2)[0])
+        self.assertIn(2, self.activity_service.find_activity_by_id(2)[0].persons_id)
+
+        # The operations done before an exception are recorded
+        try:
+            with self.person_service.batch():
+                self.person_service.update_person_name(1, 'Other Name')
+                self.person_service.delete_person_by_id(50)
+        except PersonIDException:
+            pass
+        self.undo_service.apply_undo()
+        self.assertEqual(self.person_service.find_person_by_id(1)[0].name, 'Vlad Bogdan')
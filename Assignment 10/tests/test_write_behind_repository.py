@@ -0,0 +1,163 @@
+import datetime
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from domain.activity import Activity
+from domain.person import Person
+from json_repository.json_person_repository import JsonPersonRepository
+from repository.hashed_repo import Repository
+from repository.repository_exceptions import RepositoryException
+from repository.write_behind_repo import WriteBehindRepository
+from sql_repository.lazy_sql_person_repository import LazySqlPersonRepository
+from sql_repository.sql_person_repository import SqlPersonRepository
+from text_file_repository.text_file_activity_repo import TextFileActivityRepository
+
+
+class RecordingRepository(Repository):
+    """
+    In-memory repository which records the changes written to it (and can be made to fail)
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.changes = []
+        self.fail = False
+        self.written = threading.Event()
+        self.failed = threading.Event()
+
+    def add_to_repo(self, entity):
+        if self.fail:
+            self.failed.set()
+            raise IOError("disk full")
+        super().add_to_repo(entity)
+        self.changes.append(('add', entity.id))
+        self.written.set()
+
+    def delete_by_id(self, entity_id):
+        super().delete_by_id(entity_id)
+        self.changes.append(('delete', entity_id))
+
+    def update(self, entity):
+        super().update(entity)
+        self.changes.append(('update', entity.id))
+
+
+class TestWriteBehindRepository(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_coalescing(self):
+        target = RecordingRepository()
+        target.add_to_repo(Person(1, 'Vlad Bogdan', '0745 000 111'))
+        target.changes.clear()
+        repo = WriteBehindRepository(target, flush_interval=60)
+        self.assertEqual(repo.get_all_ids(), [1])
+        repo.add_to_repo(Person(2, 'Test Person', '0241 234 567'))
+        repo.update(Person(2, 'Test Person', '0241 234 999'))
+        repo.update(Person(1, 'Vlad Bogdan', '0745 000 222'))
+        repo.add_to_repo(Person(3, 'Temporary', '0241 000 000'))
+        repo.delete_by_id(3)
+        # The changes are applied in memory right away and only marked as dirty
+        self.assertEqual(repo.find_by_id(2)[0].phone_number, '0241 234 999')
+        self.assertEqual((repo.dirty_count, target.changes), (3, []))
+        repo.close()
+        self.assertEqual(target.changes, [('add', 2), ('update', 1)])
+        self.assertEqual(target.find_by_id(2)[0].phone_number, '0241 234 999')
+        self.assertEqual(repo.dirty_count, 0)
+
+    def test_background_flush(self):
+        target = RecordingRepository()
+        repo = WriteBehindRepository(target, flush_interval=60, flush_count=2)
+        repo.add_to_repo(Person(1, 'Vlad Bogdan', '0745 000 111'))
+        self.assertFalse(target.written.wait(0.05))
+        # The second dirty entity triggers a background write
+        repo.add_to_repo(Person(2, 'Test Person', '0241 234 567'))
+        self.assertTrue(target.written.wait(5))
+        repo.close()
+        self.assertEqual(sorted(target.get_all_ids()), [1, 2])
+
+        target = RecordingRepository()
+        repo = WriteBehindRepository(target, flush_interval=0.01)
+        repo.add_to_repo(Person(1, 'Vlad Bogdan', '0745 000 111'))
+        self.assertTrue(target.written.wait(5))
+        repo.close()
+
+    def test_failed_flush(self):
+        target = RecordingRepository()
+        target.fail = True
+        repo = WriteBehindRepository(target, flush_interval=60)
+        repo.add_to_repo(Person(1, 'Vlad Bogdan', '0745 000 111'))
+        self.assertRaises(RepositoryException, repo.flush)
+        self.assertEqual(repo.dirty_count, 1)
+        target.fail = False
+        repo.close()
+        self.assertEqual(target.get_all_ids(), [1])
+
+        # A failed background write is raised by the next flush, even if the entities are written by it
+        target = RecordingRepository()
+        target.fail = True
+        repo = WriteBehindRepository(target, flush_interval=0.01)
+        repo.add_to_repo(Person(1, 'Vlad Bogdan', '0745 000 111'))
+        self.assertTrue(target.failed.wait(5))
+        target.fail = False
+        # (the background thread keeps the failure right after it happens)
+        for _ in range(500):
+            try:
+                repo.flush()
+            except RepositoryException:
+                break
+            time.sleep(0.01)
+        else:
+            self.fail("The background failure was not raised.")
+        self.assertEqual((repo.dirty_count, target.get_all_ids()), (0, [1]))
+        repo.flush()
+        repo.close()
+
+    def test_database_repositories(self):
+        # Their connection belongs to the thread which opened it, so they cannot be written in the background
+        file_name = os.path.join(self.directory, 'data.db')
+        for repository_class in (SqlPersonRepository, LazySqlPersonRepository):
+            target = repository_class(file_name)
+            self.assertRaises(RepositoryException, WriteBehindRepository, target)
+            target.add_to_repo(Person(700, 'Vlad Bogdan', '0745 000 111'))
+            target.delete_by_id(700)
+            if hasattr(target, 'close'):
+                target.close()
+
+    def test_file_repositories(self):
+        file_name = os.path.join(self.directory, 'activities.txt')
+        open(file_name, 'w').close()
+        repo = WriteBehindRepository(TextFileActivityRepository(file_name), flush_interval=60)
+        for activity_id in range(1, 6):
+            repo.add_to_repo(Activity(activity_id, datetime.datetime(2021, 5, 17, 10, 30),
+                                      datetime.datetime(2021, 5, 17, 12, 30), "Hiking", [1]))
+        repo.delete_by_id(3)
+        self.assertEqual(os.path.getsize(file_name), 0)
+        repo.close()
+        self.assertEqual(TextFileActivityRepository(file_name).get_all_ids(), [1, 2, 4, 5])
+
+        file_name = os.path.join(self.directory, 'persons.json')
+        open(file_name, 'w').close()
+        repo = WriteBehindRepository(JsonPersonRepository(file_name), flush_interval=60)
+        repo.add_to_repo(Person(1, 'Vlad Bogdan', '0745 000 111'))
+        repo.flush()
+        self.assertEqual(JsonPersonRepository(file_name).get_all_ids(), [1])
+        repo.close()
+
+    def test_file_repository_transaction(self):
+        file_name = os.path.join(self.directory, 'persons.json')
+        open(file_name, 'w').close()
+        repo = JsonPersonRepository(file_name)
+        with repo.transaction():
+            repo.add_to_repo(Person(1, 'Vlad Bogdan', '0745 000 111'))
+            repo.add_to_repo(Person(2, 'Test Person', '0241 234 567'))
+            # The file is only written at the end of the transaction
+            self.assertEqual(os.path.getsize(file_name), 0)
+        self.assertEqual(JsonPersonRepository(file_name).get_all_ids(), [1, 2])
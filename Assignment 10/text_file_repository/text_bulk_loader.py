@@ -0,0 +1,115 @@
+"""
+Bulk loader for the files of the text file repositories (one entity per line, the fields separated by ';').
+
+The file is memory-mapped and read line by line straight from the mapping. Every line is first parsed by a fast
+path which expects the format the repositories write: the datetimes as 'YYYY-MM-DD HH:MM:SS', sliced at fixed
+positions, and the persons of an activity as a list of integers ('[1, 2]'), split without going through json.
+Only the lines the fast path cannot read go through the original parsers (with the DateTimeValidator), so a
+malformed line is still reported the same way as before.
+"""
+import datetime
+import mmap
+import time
+from collections import namedtuple
+
+from domain.activity import Activity
+from domain.person import Person
+
+
+class LoadStatistics(namedtuple('LoadStatistics', ['records', 'fallbacks', 'seconds'])):
+    """
+    Statistics of a bulk load: the number of records read, how many of them needed the slow parser, and the time
+    the load took (in seconds)
+    """
+
+    @property
+    def records_per_second(self):
+        return self.records / self.seconds if self.seconds > 0 else float('inf')
+
+    def __str__(self):
+        return "%d records in %.3fs (%.0f records/s, %d parsed by the fallback)" % \
+               (self.records, self.seconds, self.records_per_second, self.fallbacks)
+
+
+def iter_lines(file_name):
+    """
+    Generates the non-empty lines of <file_name> (decoded, without the line terminator), reading them from a
+    memory mapping of the file
+    """
+    with open(file_name, 'rb') as f:
+        try:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # an empty file cannot be mapped
+            return
+        with mapping:
+            for line in iter(mapping.readline, b''):
+                line = line.rstrip(b'\r\n')
+                if line:
+                    yield line.decode('utf-8')
+
+
+def parse_date_time(text):
+    """
+    Parses a datetime written as 'YYYY-MM-DD HH:MM:SS' (the seconds are dropped, as they are by the
+    DateTimeValidator)
+    :raise ValueError: If <text> is not in this format
+    """
+    if len(text) != 19 or text[4] != '-' or text[7] != '-' or text[10] != ' ' or text[13] != ':' or \
+            text[16] != ':':
+        raise ValueError("Not a 'YYYY-MM-DD HH:MM:SS' datetime: " + text)
+    int(text[17:])  # only checks the seconds
+    return datetime.datetime(int(text[:4]), int(text[5:7]), int(text[8:10]), int(text[11:13]), int(text[14:16]))
+
+
+def parse_int_list(text):
+    """
+    Parses a list of integers written as '[1, 2, 3]'
+    :raise ValueError: If <text> is not such a list
+    """
+    if text[:1] != '[' or text[-1:] != ']':
+        raise ValueError("Not a list of integers: " + text)
+    inner = text[1:-1]
+    if not inner.strip():
+        return []
+    return [int(number) for number in inner.split(',')]
+
+
+def activity_from_line(line):
+    """
+    The fast path for the lines of the activities file
+    :raise ValueError: If the line is not in the format written by the text file repository
+    """
+    activity_id, start, end, description, persons = line.split(';')
+    return Activity(int(activity_id), parse_date_time(start), parse_date_time(end), description,
+                    parse_int_list(persons))
+
+
+def person_from_line(line):
+    """
+    The fast path for the lines of the persons file
+    :raise ValueError: If the line is not in the format written by the text file repository
+    """
+    person_id, name, phone_number = line.split(';')
+    return Person(int(person_id), name, phone_number)
+
+
+def bulk_load(file_name, parse, fallback):
+    """
+    Reads all the entities of a text repository file
+    :param file_name: The path of the file; string
+    :param parse: The fast parser of a line; raises ValueError if it cannot read the line
+    :param fallback: The parser used for the lines the fast parser could not read
+    :return: The pair (list of entities, LoadStatistics)
+    :raise IOError: If the file could not be opened
+    """
+    start = time.perf_counter()
+    entities = []
+    fallbacks = 0
+    for line in iter_lines(file_name):
+        try:
+            entities.append(parse(line))
+        except (ValueError, IndexError):
+            entities.append(fallback(line))
+            fallbacks += 1
+    return entities, LoadStatistics(len(entities), fallbacks, time.perf_counter() - start)
@@ -1,41 +1,76 @@
 import json
+from contextlib import contextmanager
 
 from domain.activity import Activity
 from domain.validators import DateTimeValidator
 # from repository.in_memory_repo import Repository
-from repository.custom_repo import Repository
+# from repository.custom_repo import Repository
+from repository.hashed_repo import Repository
+from text_file_repository import text_bulk_loader
 
 
 class TextFileActivityRepository(Repository):
     def __init__(self, file_name):
         super().__init__()
         self.__file_name = file_name
+        self.__transaction_depth = 0
+        self.__load_statistics = None
         self._read_from_file()
 
+    @property
+    def load_statistics(self):
+        """
+        The LoadStatistics of the loading of the file (records read, lines parsed by the fallback, records/s)
+        """
+        return self.__load_statistics
+
+    @contextmanager
+    def transaction(self):
+        """
+        Groups a series of changes ('with repo.transaction():'): the file is rewritten once, at the end of the
+        outermost block, instead of after every change
+        """
+        self.__transaction_depth += 1
+        try:
+            yield self
+        finally:
+            self.__transaction_depth -= 1
+            self._write_to_file()
+
     def _write_to_file(self):
+        if self.__transaction_depth != 0:
+            return
         with open(self.__file_name, 'w') as f:
             for activity in self.elements:
-                line = str(activity.id) + ';' + str(activity.start_date_time) + ';' + str(activity.end_date_time) + \
-                       ';' + activity.description + ';' + str(activity.persons_id) + '\n'
-                f.write(line)
+                f.write(self.activity_to_line(activity) + '\n')
 
     def _read_from_file(self):
-        with open(self.__file_name, 'r') as f:
-            for line in f:
-                line = line.rstrip('\n').split(';')
-                activity_id = int(line[0])
-                year_month_day, hour_minute_seconds = line[1].split()
-                date_info = year_month_day.split('-')
-                date = date_info[2] + '-' + date_info[1] + '-' + date_info[0]
-                start_date_time = DateTimeValidator.validate(date, hour_minute_seconds)
-
-                year_month_day, hour_minute_seconds = line[2].split()
-                date_info = year_month_day.split('-')
-                date = date_info[2] + '-' + date_info[1] + '-' + date_info[0]
-                end_date_time = DateTimeValidator.validate(date, hour_minute_seconds)
-                description = line[3]
-                pers_list = json.loads(line[4])
-                super().add_to_repo(Activity(activity_id, start_date_time, end_date_time, description, pers_list))
+        activities, self.__load_statistics = text_bulk_loader.bulk_load(
+            self.__file_name, text_bulk_loader.activity_from_line, self.activity_from_line)
+        for activity in activities:
+            super().add_to_repo(activity)
+
+    @staticmethod
+    def activity_to_line(activity):
+        return str(activity.id) + ';' + str(activity.start_date_time) + ';' + str(activity.end_date_time) + \
+               ';' + activity.description + ';' + str(activity.persons_id)
+
+    @staticmethod
+    def activity_from_line(line):
+        line = line.split(';')
+        activity_id = int(line[0])
+        year_month_day, hour_minute_seconds = line[1].split()
+        date_info = year_month_day.split('-')
+        date = date_info[2] + '-' + date_info[1] + '-' + date_info[0]
+        start_date_time = DateTimeValidator.validate(date, hour_minute_seconds)
+
+        year_month_day, hour_minute_seconds = line[2].split()
+        date_info = year_month_day.split('-')
+        date = date_info[2] + '-' + date_info[1] + '-' + date_info[0]
+        end_date_time = DateTimeValidator.validate(date, hour_minute_seconds)
+        description = line[3]
+        pers_list = json.loads(line[4])
+        return Activity(activity_id, start_date_time, end_date_time, description, pers_list)
 
     def add_to_repo(self, entity):
         super().add_to_repo(entity)
@@ -0,0 +1,74 @@
+from abc import abstractmethod
+
+from repository.journal_repo import DELETE, JournalRepository
+from text_file_repository import text_bulk_loader
+from text_file_repository.text_file_activity_repo import TextFileActivityRepository
+from text_file_repository.text_file_person_repo import TextFilePersonRepository
+
+
+class TextFileJournalRepository(JournalRepository):
+    """
+    Journaled repository in the text format: the snapshot has the format of the text file repositories (one entity
+    per line) and every record of the journal is one line: '<operation>;<entity line>' or 'delete;<entity ID>'
+    """
+
+    def _read_snapshot(self, file_name):
+        return text_bulk_loader.bulk_load(file_name, self._parse_line, self._from_line)[0]
+
+    def _write_snapshot(self, file_name, entities):
+        with open(file_name, 'w') as f:
+            for entity in entities:
+                f.write(self._to_line(entity) + '\n')
+
+    def _encode_record(self, operation, argument):
+        line = str(argument) if operation == DELETE else self._to_line(argument)
+        return (operation + ';' + line + '\n').encode('utf-8')
+
+    def _read_record(self, journal):
+        line = journal.readline()
+        if not line:
+            return None
+        if not line.endswith(b'\n'):
+            raise ValueError("Incomplete journal record.")
+        operation, line = line.decode('utf-8').rstrip('\n').split(';', 1)
+        return operation, int(line) if operation == DELETE else self._from_line(line)
+
+    @abstractmethod
+    def _to_line(self, entity):
+        """
+        Returns the line of <entity> (without the newline)
+        """
+
+    @abstractmethod
+    def _from_line(self, line):
+        """
+        Returns the entity of a line
+        """
+
+    @abstractmethod
+    def _parse_line(self, line):
+        """
+        The fast path of _from_line for the snapshot (see text_bulk_loader)
+        """
+
+
+class TextFileJournalActivityRepository(TextFileJournalRepository):
+    def _to_line(self, entity):
+        return TextFileActivityRepository.activity_to_line(entity)
+
+    def _from_line(self, line):
+        return TextFileActivityRepository.activity_from_line(line)
+
+    def _parse_line(self, line):
+        return text_bulk_loader.activity_from_line(line)
+
+
+class TextFileJournalPersonRepository(TextFileJournalRepository):
+    def _to_line(self, entity):
+        return TextFilePersonRepository.person_to_line(entity)
+
+    def _from_line(self, line):
+        return TextFilePersonRepository.person_from_line(line)
+
+    def _parse_line(self, line):
+        return text_bulk_loader.person_from_line(line)
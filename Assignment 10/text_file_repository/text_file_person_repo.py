@@ -1,25 +1,61 @@
+from contextlib import contextmanager
+
 from domain.person import Person
 # from repository.in_memory_repo import Repository
-from repository.custom_repo import Repository
+# from repository.custom_repo import Repository
+from repository.hashed_repo import Repository
+from text_file_repository import text_bulk_loader
 
 
 class TextFilePersonRepository(Repository):
     def __init__(self, file_name):
         super().__init__()
         self.__file_name = file_name
+        self.__transaction_depth = 0
+        self.__load_statistics = None
         self._read_from_file()
 
+    @property
+    def load_statistics(self):
+        """
+        The LoadStatistics of the loading of the file (records read, lines parsed by the fallback, records/s)
+        """
+        return self.__load_statistics
+
+    @contextmanager
+    def transaction(self):
+        """
+        Groups a series of changes ('with repo.transaction():'): the file is rewritten once, at the end of the
+        outermost block, instead of after every change
+        """
+        self.__transaction_depth += 1
+        try:
+            yield self
+        finally:
+            self.__transaction_depth -= 1
+            self._write_to_file()
+
     def _write_to_file(self):
+        if self.__transaction_depth != 0:
+            return
         with open(self.__file_name, 'w') as f:
             for person in self.elements:
-                line = str(person.id) + ';' + person.name + ';' + person.phone_number + '\n'
-                f.write(line)
+                f.write(self.person_to_line(person) + '\n')
 
     def _read_from_file(self):
-        with open(self.__file_name, 'r') as f:
-            for line in f:
-                line = line.rstrip('\n').split(';')
-                super().add_to_repo(Person(int(line[0]), line[1], line[2]))
+        persons, self.__load_statistics = text_bulk_loader.bulk_load(
+            self.__file_name, text_bulk_loader.person_from_line, self.person_from_line)
+        for person in persons:
+            super().add_to_repo(person)
+
+    @staticmethod
+    def person_to_line(person):
+        return str(person.id) + ';' + person.name + ';' + person.phone_number
+
+    @staticmethod
+    def person_from_line(line):
+        line = line.split(';')
+        return Person(int(line[0]), line[1], line[2])
 
     def add_to_repo(self, entity):
         super().add_to_repo(entity)
@@ -5,6 +5,10 @@ from domain.validators import ConsoleCommandException, PersonIDException, Person
     UndoException, RedoException
 from repository.repository_exceptions import RepositoryException
 
+# The number of results printed at once by the listings which can have many of them; the others are printed only if
+# the user asks for them, so only the first page is selected instead of sorting all of them
+PAGE_SIZE = 20
+
 
 class Console:
     """
@@ -20,6 +24,13 @@ class Console:
         self.__undo_service = undo_service
         self.__redo_service = redo_service
 
+    @staticmethod
+    def __show_more():
+        """
+        Asks the user whether to print the results after the first page as well
+        """
+        return input(f"Only the first {PAGE_SIZE} are shown. Show all of them? (Y/N) ").strip().lower() == 'y'
+
     # def find_act_by_id(self, id_):
     #     return self.__activity_service.find_activity_by_id(id_)
 
@@ -43,10 +54,12 @@ class Console:
         input_id = input("Please give the ID of the person you want to remove: ").strip()
         all_activities_ids = ', '.join(map(str, self.__activity_service.get_all_activity_ids()))
 
-        # must always call these two methods in this order
-        self.__activity_service.delete_person_from_activities(input_id, all_activities_ids,
-                                                              record_undo=True, record_redo=False)
-        removed_person = self.__person_service.delete_person_by_id(input_id, record_undo=True, record_redo=False)
+        # must always call these two methods in this order; the batch makes them a single undo operation
+        with self.__person_service.batch():
+            self.__activity_service.delete_person_from_activities(input_id, all_activities_ids,
+                                                                  record_undo=True, record_redo=False)
+            removed_person = self.__person_service.delete_person_by_id(input_id, record_undo=True,
+                                                                       record_redo=False)
         print(str(removed_person) + "has just been removed from the database.")
 
     def ui_update_person_phone_number(self):
@@ -271,9 +284,14 @@ class Console:
         in that day. Along with the date, it also prints all the time intervals in which that person is free.
         """
         person_info = input("Please give the name or the ID of the person whose busiest days you want to see: ")
-        sorted_dates, free_time_start, free_time_end = self.__activity_service.busiest_days_person(person_info)
+        sorted_dates, free_time_start, free_time_end = \
+            self.__activity_service.busiest_days_person(person_info, PAGE_SIZE + 1)
+        shown = PAGE_SIZE
+        if len(sorted_dates) > PAGE_SIZE and self.__show_more():
+            sorted_dates, free_time_start, free_time_end = self.__activity_service.busiest_days_person(person_info)
+            shown = len(sorted_dates)
         print(f"These are the busiest days of {person_info}, sorted in descending order of free time in the day:")
-        for index, (date, start, end) in enumerate(zip(sorted_dates, free_time_start, free_time_end)):
+        for index, (date, start, end) in enumerate(zip(sorted_dates[:shown], free_time_start, free_time_end)):
             print(f"{index + 1}) {date}")
             for s, e in zip(start, end):
                 print(f"\tFree from {str(s.hour).zfill(2)}:{str(s.minute).zfill(2)} to "
@@ -285,9 +303,13 @@ class Console:
         Accepts string as name or integer as person ID from the console
         """
         given_person = input("Please give the name or the ID of the person: ")
-        sorted_person_activities = self.__activity_service.activities_with_given_person(given_person)
+        sorted_person_activities = self.__activity_service.activities_with_given_person(given_person, PAGE_SIZE + 1)
+        shown = PAGE_SIZE
+        if len(sorted_person_activities) > PAGE_SIZE and self.__show_more():
+            sorted_person_activities = self.__activity_service.activities_with_given_person(given_person)
+            shown = len(sorted_person_activities)
         print(f"These are all the upcoming activities of {given_person}:")
-        for index, activity in enumerate(sorted_person_activities):
+        for index, activity in enumerate(sorted_person_activities[:shown]):
             print(f"{index + 1}) {activity}")
 
     def ui_undo(self):
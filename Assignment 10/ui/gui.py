@@ -1,5 +1,9 @@
 from PyQt5 import QtWidgets, QtCore
 
+# The number of results shown by the filter pages which can have many of them (the label does not scroll), so only
+# the first page is selected instead of sorting all of them
+PAGE_SIZE = 20
+
 
 def screen_size():
     for display in range(QtWidgets.QDesktopWidget().screenCount()):
@@ -103,11 +107,11 @@ class ButtonStack(QtWidgets.QWidget):
                  labels=['Date']),
 
             Item(title='Busiest days of a person', action_type='filter', text_field_count=1,
-                 on_click=lambda text: self._activity_service.get_busiest_days_person_string(text),
+                 on_click=lambda text: self._activity_service.get_busiest_days_person_string(text, PAGE_SIZE),
                  labels=['Person name/ID']),
 
             Item(title='All activities with a person', action_type='filter', text_field_count=1,
-                 on_click=lambda text: self._activity_service.get_activities_with_given_person_string(text),
+                 on_click=lambda text: self._activity_service.get_activities_with_given_person_string(text, PAGE_SIZE),
                  labels=['Person name/ID']),
 
             Item(title='Undo', action_type='undo', action=self._undo_service.apply_undo),
@@ -120,8 +124,9 @@ class ButtonStack(QtWidgets.QWidget):
         self.setLayout(vbox)
 
     def remove_person_helper(self, input_id):
-        self._activity_service.delete_person_from_activities(input_id)
-        self._person_service.delete_person_by_id(input_id)
+        with self._person_service.batch():
+            self._activity_service.delete_person_from_activities(input_id)
+            self._person_service.delete_person_by_id(input_id)
 
     def renderButton(self, item):
         button = QtWidgets.QPushButton(item.title, self)
@@ -1,10 +1,13 @@
 from enum import Enum, unique
 
 from utils.algorithms.bubble_sort import BubbleSort
+from utils.algorithms.external_merge_sort import ExternalMergeSort
 from utils.algorithms.gnome_sort import GnomeSort
 from utils.algorithms.insertion_sort import InsertionSort
 from utils.algorithms.merge_sort import MergeSort
+from utils.algorithms.parallel_merge_sort import ParallelMergeSort
 from utils.algorithms.selection_sort import SelectionSort
+from utils.algorithms.tim_sort import TimSort
 
 
 @unique
@@ -17,3 +20,10 @@ class Algorithm(Enum):
     BUBBLE_SORT = BubbleSort
     INSERTION_SORT = InsertionSort
     MERGE_SORT = MergeSort
+
+    # Adaptive O(n log n) sort, the one used by the services
+    TIM_SORT = TimSort
+    # For very large lists: chunks sorted by worker processes, then merged
+    PARALLEL_MERGE_SORT = ParallelMergeSort
+    # Sorted runs spilled to temporary files, then merged (see external_sort for data larger than the memory)
+    EXTERNAL_MERGE_SORT = ExternalMergeSort
@@ -0,0 +1,117 @@
+import heapq
+import os
+import pickle
+import tempfile
+from operator import itemgetter
+
+from utils.generic_sort import GenericSort
+
+# The number of elements sorted in memory at once (the length of the runs spilled to the disk)
+RUN_SIZE = 100000
+# The maximum number of runs merged at once (and so of files open at once); more runs are merged in several passes
+MAX_FAN_IN = 64
+# The number of (key, element) pairs pickled together in a run file
+BLOCK_SIZE = 1000
+
+
+def _write_run(directory, pairs):
+    """
+    Writes the (key, element) pairs to a new run file, in blocks of BLOCK_SIZE pairs
+    :return: The path of the run file
+    """
+    file_descriptor, file_name = tempfile.mkstemp(suffix='.run', dir=directory)
+    with os.fdopen(file_descriptor, 'wb') as f:
+        block = []
+        for pair in pairs:
+            block.append(pair)
+            if len(block) == BLOCK_SIZE:
+                pickle.dump(block, f, pickle.HIGHEST_PROTOCOL)
+                block = []
+        if block:
+            pickle.dump(block, f, pickle.HIGHEST_PROTOCOL)
+    return file_name
+
+
+def _read_run(file_name):
+    """
+    Generates the (key, element) pairs of a run file, one block in memory at a time
+    """
+    with open(file_name, 'rb') as f:
+        while True:
+            try:
+                block = pickle.load(f)
+            except EOFError:
+                return
+            yield from block
+
+
+def _merge_runs(file_names, reverse):
+    # On equal keys the earlier run goes first, so merging keeps the sort stable
+    return heapq.merge(*(_read_run(file_name) for file_name in file_names), key=itemgetter(0), reverse=reverse)
+
+
+def external_sort(elements, key=lambda x: x, reverse=False, run_size=RUN_SIZE, max_fan_in=MAX_FAN_IN,
+                  directory=None):
+    """
+    Generates the elements of an iterable in sorted order, holding at most <run_size> of them in memory: the
+    elements are read in runs of <run_size>, every run is sorted in memory and spilled to a temporary file as
+    pickled (key, element) pairs, and the runs are streamed back through a k-way heap merge (in several passes
+    if there are more than <max_fan_in> runs). The key of every element is computed once. Stable, also when
+    <reverse> is True. The keys and the elements have to be picklable. The temporary files are removed when the
+    generator is exhausted or closed.
+    :param elements: Iterable with the elements (e.g. a generator reading them from a file or a database)
+    :param key: The function computing the key of an element
+    :param reverse: True for descending order
+    :param run_size: The number of elements sorted in memory at once; positive integer
+    :param max_fan_in: The maximum number of runs merged at once; integer, at least 2
+    :param directory: The directory of the temporary files; None for the default temporary directory
+    """
+    with tempfile.TemporaryDirectory(prefix='external_sort_', dir=directory) as run_directory:
+        run_files = []
+        run = []
+        for elem in elements:
+            run.append((key(elem), elem))
+            if len(run) == run_size:
+                run.sort(key=itemgetter(0), reverse=reverse)
+                run_files.append(_write_run(run_directory, run))
+                run = []
+        run.sort(key=itemgetter(0), reverse=reverse)
+        if not run_files:
+            # Everything fit in a single run, there is nothing to merge
+            for _, elem in run:
+                yield elem
+            return
+        if run:
+            run_files.append(_write_run(run_directory, run))
+        del run
+        while len(run_files) > max_fan_in:
+            merged_files = []
+            for start in range(0, len(run_files), max_fan_in):
+                group = run_files[start:start + max_fan_in]
+                merged_files.append(_write_run(run_directory, _merge_runs(group, reverse)))
+                for file_name in group:
+                    os.remove(file_name)
+            run_files = merged_files
+        for _, elem in _merge_runs(run_files, reverse):
+            yield elem
+
+
+class ExternalMergeSort(GenericSort):
+    # The number of elements sorted in memory at once and the maximum number of runs merged at once
+    run_size = RUN_SIZE
+    max_fan_in = MAX_FAN_IN
+
+    def __init__(self, data, key, reverse):
+        super().__init__(data, key, reverse)
+        self.__key = key
+        self.__reverse = reverse
+
+    def sort(self):
+        """
+        External merge sort (see external_sort): sorted runs of the list are spilled to temporary files and
+        merged back, so the memory used by the sort itself is bounded by the length of the runs, besides the
+        list. For sorting data which does not fit in memory, use external_sort directly on a stream of the
+        elements. Time complexity: O(n log n), plus writing and reading every element once per merge pass.
+        """
+        self.data[:] = list(external_sort(list(self.data), self.__key, self.__reverse, self.run_size,
+                                          self.max_fan_in))
@@ -0,0 +1,60 @@
+import heapq
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from utils.algorithms.tim_sort import TimSort
+from utils.generic_sort import GenericSort
+
+
+def _sort_chunk(keys, offset, reverse):
+    """
+    Sorts a chunk in a worker process
+    :param keys: The keys of the elements of the chunk, in their order
+    :param offset: The position of the first element of the chunk in the whole list
+    :return: The positions (in the whole list) of the elements of the chunk, in sorted order
+    """
+    return [offset + position for position in sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse)]
+
+
+class ParallelMergeSort(GenericSort):
+    # Below this number of elements (or with a single worker) the list is sorted in this process, by Tim sort:
+    # starting the worker processes and sending them the keys costs more than it saves
+    threshold = 100000
+    # The number of worker processes (and of chunks); None for one per CPU
+    workers = None
+
+    def __init__(self, data, key, reverse):
+        super().__init__(data, key, reverse)
+        self.__key = key
+        self.__reverse = reverse
+
+    def sort(self):
+        """
+        Parallel merge sort: the key of every element is computed once, in this process, and the keys (which
+        have to be picklable, e.g. numbers, strings, datetimes or tuples of them, not the elements themselves)
+        are split into one chunk per worker process. Every worker sorts the positions of its chunk by their keys
+        (with the built-in stable sort) and the sorted chunks are merged with a k-way heap merge, which takes
+        the earlier chunk first on equal keys, so the sort is stable, also when <reverse> is True.
+        Falls back to Tim sort for small lists, with a single worker, or if the keys cannot be sent to the
+        worker processes. Time complexity: O(n log n / workers) for the chunks plus O(n log workers) for the merge.
+        """
+        workers = self.workers or os.cpu_count() or 1
+        if len(self.data) < max(self.threshold, 2) or workers < 2:
+            TimSort(self.data, self.__key, self.__reverse).sort()
+            return
+        values = list(self.data)
+        keys = [self.__key(elem) for elem in values]
+        chunk_size = -(-len(keys) // workers)
+        try:
+            with ProcessPoolExecutor(workers) as executor:
+                chunks = [executor.submit(_sort_chunk, keys[offset:offset + chunk_size], offset, self.__reverse)
+                          for offset in range(0, len(keys), chunk_size)]
+                sorted_chunks = [chunk.result() for chunk in chunks]
+        except (pickle.PicklingError, AttributeError, TypeError, BrokenProcessPool, OSError):
+            # The keys could not be pickled, or the worker processes could not be started
+            TimSort(self.data, self.__key, self.__reverse).sort()
+            return
+        self.data[:] = [values[position]
+                        for position in heapq.merge(*sorted_chunks, key=keys.__getitem__, reverse=self.__reverse)]
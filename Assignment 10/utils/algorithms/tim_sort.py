@@ -0,0 +1,213 @@
+import operator
+
+from utils.generic_sort import GenericSort
+
+# The number of consecutive wins of one run after which the merge switches to galloping
+MIN_GALLOP = 7
+
+
+class TimSort(GenericSort):
+    def __init__(self, data, key, reverse):
+        super().__init__(data, key, reverse)
+        self.__key = key
+        self.__less = operator.gt if reverse else operator.lt
+        self.__keys = []
+        self.__values = []
+        self.__min_gallop = MIN_GALLOP
+
+    def sort(self):
+        """
+        Tim sort (decorate-sort-undecorate): the key of every element is computed once, up front, and the keys are
+        sorted together with the elements. The list is split into natural runs (the already ordered or strictly
+        descending - then reversed - stretches of it), the short runs are extended with binary insertion sort, and
+        the runs are merged while keeping their lengths balanced. A merge first skips the elements which are
+        already in place, and when one run keeps winning it gallops (exponential search, then copies the whole
+        stretch at once). Stable, also when <reverse> is True. Time complexity: O(n log n), O(n) on ordered data.
+        """
+        if len(self.data) < 2:
+            return
+        self.__values = list(self.data)
+        self.__keys = [self.__key(elem) for elem in self.__values]
+        self.__min_gallop = MIN_GALLOP
+        length = len(self.__values)
+        min_run = self.__min_run(length)
+        runs = []
+        low = 0
+        while low < length:
+            run_length = self.__count_run(low, length)
+            if run_length < min_run:
+                forced_length = min(min_run, length - low)
+                self.__binary_insertion_sort(low, low + forced_length, low + run_length)
+                run_length = forced_length
+            runs.append([low, run_length])
+            self.__merge_collapse(runs)
+            low += run_length
+        while len(runs) > 1:
+            position = len(runs) - 2
+            if position > 0 and runs[position - 1][1] < runs[position + 1][1]:
+                position -= 1
+            self.__merge_at(runs, position)
+        self.data[:] = self.__values
+        self.__keys, self.__values = [], []
+
+    @staticmethod
+    def __min_run(length):
+        # A length in [32, 64] for which length / min_run is a power of 2, or a bit less than one
+        odd = 0
+        while length >= 64:
+            odd |= length & 1
+            length >>= 1
+        return length + odd
+
+    def __count_run(self, low, high):
+        """
+        Returns the length of the run starting at <low>; a strictly descending run is reversed in place
+        """
+        keys, less = self.__keys, self.__less
+        run_high = low + 1
+        if run_high == high:
+            return 1
+        if less(keys[run_high], keys[low]):
+            while run_high + 1 < high and less(keys[run_high + 1], keys[run_high]):
+                run_high += 1
+            keys[low:run_high + 1] = keys[low:run_high + 1][::-1]
+            self.__values[low:run_high + 1] = self.__values[low:run_high + 1][::-1]
+        else:
+            while run_high + 1 < high and not less(keys[run_high + 1], keys[run_high]):
+                run_high += 1
+        return run_high + 1 - low
+
+    def __binary_insertion_sort(self, low, high, start):
+        """
+        Sorts [low, high), knowing that [low, start) is already sorted
+        """
+        keys, values, less = self.__keys, self.__values, self.__less
+        for position in range(start, high):
+            key = keys[position]
+            left, right = low, position
+            while left < right:
+                middle = (left + right) // 2
+                if less(key, keys[middle]):
+                    right = middle
+                else:
+                    left = middle + 1
+            if left != position:
+                value = values[position]
+                keys[left + 1:position + 1] = keys[left:position]
+                values[left + 1:position + 1] = values[left:position]
+                keys[left], values[left] = key, value
+
+    def __merge_collapse(self, runs):
+        # Merges the runs on top of the stack until the lengths of the runs decrease faster than the Fibonacci
+        # numbers, from the bottom of the stack to its top
+        while len(runs) > 1:
+            position = len(runs) - 2
+            if (position > 0 and runs[position - 1][1] <= runs[position][1] + runs[position + 1][1]) or \
+                    (position > 1 and runs[position - 2][1] <= runs[position - 1][1] + runs[position][1]):
+                if runs[position - 1][1] < runs[position + 1][1]:
+                    position -= 1
+            elif runs[position][1] > runs[position + 1][1]:
+                break
+            self.__merge_at(runs, position)
+
+    def __gallop(self, keys, key, base, length, after_equal):
+        """
+        Returns the number of elements of the sorted stretch keys[base:base + length] which go before an element
+        with the key <key> (the elements with an equal key included if <after_equal>): an exponential search for
+        the range of the answer, then a binary search in it
+        """
+        less = self.__less
+        if after_equal:
+            def goes_before(position):
+                return not less(key, keys[position])
+        else:
+            def goes_before(position):
+                return less(keys[position], key)
+        low, high = 0, 1
+        while high <= length and goes_before(base + high - 1):
+            low = high
+            high = 2 * high + 1
+        high = min(high, length)
+        while low < high:
+            middle = (low + high) // 2
+            if goes_before(base + middle):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def __merge_at(self, runs, position):
+        """
+        Merges the runs at <position> and <position + 1> of the stack
+        """
+        keys = self.__keys
+        base_a, length_a = runs[position]
+        base_b, length_b = runs[position + 1]
+        runs[position][1] = length_a + length_b
+        del runs[position + 1]
+        # The elements of the first run which go before the whole second run are already in place, and so are
+        # the elements of the second run which go after the whole first run
+        already_placed = self.__gallop(keys, keys[base_b], base_a, length_a, True)
+        base_a += already_placed
+        length_a -= already_placed
+        if length_a == 0:
+            return
+        length_b = self.__gallop(keys, keys[base_a + length_a - 1], base_b, length_b, False)
+        if length_b == 0:
+            return
+        self.__merge(base_a, length_a, base_b, length_b)
+
+    def __merge(self, base_a, length_a, base_b, length_b):
+        """
+        Merges the adjacent runs [base_a, base_a + length_a) and [base_b, base_b + length_b): the first run is
+        copied aside and the merged elements are written from base_a on (on equal keys the first run wins, so the
+        merge is stable)
+        """
+        keys, values, less = self.__keys, self.__values, self.__less
+        keys_a, values_a = keys[base_a:base_b], values[base_a:base_b]
+        index_a, index_b, end_b = 0, base_b, base_b + length_b
+        destination = base_a
+        min_gallop = self.__min_gallop
+        while index_a < length_a and index_b < end_b:
+            # One element at a time, until one of the runs wins <min_gallop> times in a row
+            wins_a = wins_b = 0
+            while index_a < length_a and index_b < end_b and wins_a < min_gallop and wins_b < min_gallop:
+                if less(keys[index_b], keys_a[index_a]):
+                    keys[destination], values[destination] = keys[index_b], values[index_b]
+                    index_b += 1
+                    wins_b += 1
+                    wins_a = 0
+                else:
+                    keys[destination], values[destination] = keys_a[index_a], values_a[index_a]
+                    index_a += 1
+                    wins_a += 1
+                    wins_b = 0
+                destination += 1
+            # Galloping, while it pays off (the stretches copied at once are long enough)
+            while index_a < length_a and index_b < end_b:
+                wins_a = self.__gallop(keys_a, keys[index_b], index_a, length_a - index_a, True)
+                keys[destination:destination + wins_a] = keys_a[index_a:index_a + wins_a]
+                values[destination:destination + wins_a] = values_a[index_a:index_a + wins_a]
+                destination += wins_a
+                index_a += wins_a
+                if index_a == length_a:
+                    break
+                wins_b = self.__gallop(keys, keys_a[index_a], index_b, end_b - index_b, False)
+                keys[destination:destination + wins_b] = keys[index_b:index_b + wins_b]
+                values[destination:destination + wins_b] = values[index_b:index_b + wins_b]
+                destination += wins_b
+                index_b += wins_b
+                if index_b == end_b:
+                    break
+                # The next element of the second run does not go before the one of the first run
+                keys[destination], values[destination] = keys_a[index_a], values_a[index_a]
+                destination += 1
+                index_a += 1
+                if wins_a < MIN_GALLOP and wins_b < MIN_GALLOP:
+                    min_gallop += 1
+                    break
+                min_gallop = max(1, min_gallop - 1)
+        # The rest of the second run is already in place
+        keys[destination:destination + length_a - index_a] = keys_a[index_a:]
+        values[destination:destination + length_a - index_a] = values_a[index_a:]
+        self.__min_gallop = min_gallop
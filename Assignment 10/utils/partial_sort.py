@@ -0,0 +1,57 @@
+import heapq
+
+
+class _Reversed:
+    """
+    Wraps a key so that it compares in reverse order
+    """
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+
+class PartialSort:
+    """
+    Heap-based partial sorting, for when only the first elements of the sorted order are needed: the order is the
+    one of Sorting.sort (stable, also when <reverse> is True) and the key of every element is computed once
+    """
+
+    @staticmethod
+    def top_k(data, k, key=lambda x: x, reverse=False):
+        """
+        Returns the first <k> elements of <data> in sorted order, keeping only the best <k> in a heap while
+        going over the data. Time complexity: O(n log k).
+        :param data: Iterable with the elements
+        :param k: The number of elements wanted; integer (all the elements if it is larger than their number)
+        :param key: The function computing the key of an element
+        :param reverse: True for descending order
+        :return: List with (at most) <k> elements
+        """
+        if k <= 0:
+            return []
+        if reverse:
+            return heapq.nlargest(k, data, key)
+        return heapq.nsmallest(k, data, key)
+
+    @staticmethod
+    def iter_sorted(data, key=lambda x: x, reverse=False):
+        """
+        Generates the elements of <data> in sorted order, lazily: the heap is built in O(n) and every element
+        taken from it costs O(log n), so the first <k> elements take O(n + k log n)
+        :param data: Iterable with the elements
+        :param key: The function computing the key of an element
+        :param reverse: True for descending order
+        """
+        wrap = _Reversed if reverse else (lambda elem_key: elem_key)
+        # The position breaks the ties (so the order is stable and the elements are never compared)
+        heap = [(wrap(key(elem)), position, elem) for position, elem in enumerate(data)]
+        heapq.heapify(heap)
+        while heap:
+            yield heapq.heappop(heap)[2]
@@ -23,12 +23,37 @@ def find_apartment_by_nr(apartments, apart_nr):
     return res[0] if len(res) > 0 else None
 
 
-def occupy_new_apartment(apartments, apart_nr):
+def create_changes():
+    """
+    Creates the record of the changes of a command, which the functions modifying the apartments fill in (given
+    as their <changes> parameter) and undo() reverts. It holds the apartments the command changed, each with a
+    copy of the apartment before the command (None if the command occupied it), and the apartments the command
+    occupied or cleared, in this order, each with its position in the list (None if it was occupied).
+
+    :return: The changes; dictionary
+    """
+    return {'apartments': {}, 'moves': []}
+
+
+def record_change(changes, apartment):
+    """
+    Records an apartment before the current command changes it, so that undo() can restore it. Only the first
+    change of an apartment during a command is recorded, as that is the state the apartment had before it.
+
+    :param changes: The changes of the current command, see create_changes(); None if they are not recorded
+    :param apartment: The apartment about to be changed; dictionary
+    """
+    if changes is not None and domain.get_apart_nr(apartment) not in changes['apartments']:
+        changes['apartments'][domain.get_apart_nr(apartment)] = (apartment, deepcopy(apartment))
+
+
+def occupy_new_apartment(apartments, apart_nr, changes=None):
     """
     Adds a new apartment, with 'apart_nr' as the new apartment's number
 
     :param apartments: The list of apartments; list of dictionaries
     :param apart_nr: The number we want the newly added apartment to have; positive integer <= max_apart_nr
+    :param changes: The changes of the current command, see create_changes(); None if they are not recorded
     :return: -
     :raise ValueError: if apart_nr is not a positive integer, is greater than 200, or if that apartment number
     is already occupied.
@@ -44,16 +69,21 @@ def occupy_new_apartment(apartments, apart_nr):
         raise ValueError("This apartment is occupied! Try a different apartment number.")
 
     new_apartment = domain.create_apartment(apart_nr)
+    if changes is not None:
+        # The apartment was not occupied before the command, unless the command cleared it
+        changes['apartments'].setdefault(apart_nr, (new_apartment, None))
+        changes['moves'].append((None, new_apartment))
     apartments.append(new_apartment)
     return new_apartment
 
 
-def clear_apartment(apartments, apart_nr):
+def clear_apartment(apartments, apart_nr, changes=None):
     """
     Clears an apartment, removing it from the list (and, implicitly, setting all expenses to 0)
 
     :param apartments: The list of apartments; list of dictionaries
     :param apart_nr: The number of the apartment to be cleared
+    :param changes: The changes of the current command, see create_changes(); None if they are not recorded
     :raise: ValueError if: The number of the apartment to be cleared is not a positive integer in the
     interval [0, <max_apart_nr>]; if the apartment is not occupied (i.e., it's already cleared)
     """
@@ -69,26 +99,30 @@ def clear_apartment(apartments, apart_nr):
     if apartment_to_remove is None:
         raise ValueError(f"Apartment {apart_nr} is not occupied. Nothing to clear.")
 
+    if changes is not None:
+        record_change(changes, apartment_to_remove)
+        changes['moves'].append((apartments.index(apartment_to_remove), apartment_to_remove))
     apartments.remove(apartment_to_remove)
     return apartment_to_remove
 
 
-def clear_range_of_apartments(apartments, start_apart_nr, end_apart_nr):
+def clear_range_of_apartments(apartments, start_apart_nr, end_apart_nr, changes=None):
     """
     Applies the 'clear_apartment()' function over the range of apartments [<start_apart_nr>, <end_apart_nr>]
 
     :param apartments: The list of apartments; list of dictionaries
     :param start_apart_nr: The lower bound of the interval of apartments to clear
     :param end_apart_nr: The upper bound of the interval of apartments to clear
+    :param changes: The changes of the current command, see create_changes(); None if they are not recorded
     """
     for apart_nr in range(start_apart_nr, end_apart_nr + 1):
         try:
-            clear_apartment(apartments, apart_nr)
+            clear_apartment(apartments, apart_nr, changes)
         except ValueError:
             continue
 
 
-def fill_random_apartments(apartments, nr_of_apartments=10, exp_lb=1, exp_ub=1000):
+def fill_random_apartments(apartments, nr_of_apartments=10, exp_lb=1, exp_ub=1000, changes=None):
     """
     Fills 'nr_of_apartments' random apartments with random expenses
 
@@ -96,6 +130,7 @@ def fill_random_apartments(apartments, nr_of_apartments=10, exp_lb=1, exp_ub=100
     :param nr_of_apartments: How many apartments to fill; positive integer
     :param exp_lb: The expenses lower bound to fill; positive integer
     :param exp_ub: The expenses upper bound to fill; positive integer
+    :param changes: The changes of the current command, see create_changes(); None if they are not recorded
     :return: -
     :raise ValueError: if <number_of_apartments>, <expense_lower_bound>, or <expense_upper_bound> are negative
     :raise KeyError: if given a currently not available expense
@@ -109,7 +144,7 @@ def fill_random_apartments(apartments, nr_of_apartments=10, exp_lb=1, exp_ub=100
     apart_nrs = sample(range(1, max_apart_nr + 1), nr_of_apartments)
 
     for apart_nr in apart_nrs:
-        new_apartment = occupy_new_apartment(apartments, apart_nr)
+        new_apartment = occupy_new_apartment(apartments, apart_nr, changes)
         for exp_type in available_expense_types:
             new_exp = randint(exp_lb, exp_ub)
             domain.set_any_expense(new_apartment, exp_type, new_exp)
@@ -270,7 +305,7 @@ def check_not_total(expense_type):
         raise KeyError(f"You cannot change the total expenses directly.")
 
 
-def add_expense(apartments, apart_nr, expense_type, expense_amount, talked_to_user=False):
+def add_expense(apartments, apart_nr, expense_type, expense_amount, talked_to_user=False, changes=None):
     """
     Adds a new expense to an apartment
 
@@ -282,6 +317,7 @@ def add_expense(apartments, apart_nr, expense_type, expense_amount, talked_to_us
     to add an expense to an unoccupied apartment. In this case, if <talked_to_user> is set to True then the
     apartment will be occupied and the expense will be added to it. On the other hand, if <talked_to_user> is False,
     then no action will be taken.
+    :param changes: The changes of the current command, see create_changes(); None if they are not recorded
 
     :raise ValueError: if expense amount is not positive
     :raise KeyError: if unavailable expense type given as argument
@@ -298,14 +334,15 @@ def add_expense(apartments, apart_nr, expense_type, expense_amount, talked_to_us
         raise ValueError("This apartment is not occupied.")
 
     if apart_to_add_to is None and talked_to_user is True:
-        apart_to_add_to = occupy_new_apartment(apartments, apart_nr)
+        apart_to_add_to = occupy_new_apartment(apartments, apart_nr, changes)
 
+    record_change(changes, apart_to_add_to)
     current_exp_amount = domain.get_any_expense(apart_to_add_to, expense_type)
     new_expense_amount = current_exp_amount + expense_amount
     domain.set_any_expense(apart_to_add_to, expense_type, new_expense_amount)
 
 
-def remove_all_from_to(apartments, start_ap_nr, end_ap_nr):
+def remove_all_from_to(apartments, start_ap_nr, end_ap_nr, changes=None):
     """
     Removes all expenses from all apartments from apartment number <start_ap_nr> to apartment number <end_ap_nr>
     (including these two)
@@ -313,6 +350,7 @@ def remove_all_from_to(apartments, start_ap_nr, end_ap_nr):
     :param apartments: The list of all apartments, list of dictionaries
     :param start_ap_nr: The left bound of the interval of apartments to remove all expenses of
     :param end_ap_nr: The left right of the interval of apartments to remove all expenses of
+    :param changes: The changes of the current command, see create_changes(); None if they are not recorded
     :returns: (<start_ap_nr>, <end_ap_nr>) tuple representing the interval of apartments whose
     expenses have been cleared
     """
@@ -330,18 +368,21 @@ def remove_all_from_to(apartments, start_ap_nr, end_ap_nr):
     for apart_nr in range(start_ap_nr, end_ap_nr + 1):
         apartment = find_apartment_by_nr(apartments, apart_nr)
 
-        if apartment is not None:
+        # An apartment without expenses is not changed
+        if apartment is not None and domain.get_apart_total_exp(apartment) != 0:
+            record_change(changes, apartment)
             domain.set_all_expenses(apartment, 0)
 
     return start_ap_nr, end_ap_nr
 
 
-def remove_all_expenses_from_apartment(apartments, apartment_nr):
+def remove_all_expenses_from_apartment(apartments, apartment_nr, changes=None):
     """
     Removes all expenses from the apartment with apartment number <apartment_nr>
 
     :param apartments: The list of apartments; list of dictionaries
     :param apartment_nr: The apartment number whose expenses we want to remove
+    :param changes: The changes of the current command, see create_changes(); None if they are not recorded
     """
     if apartment_nr <= 0 or apartment_nr > domain.get_max_apart_nr():
         raise ValueError(f"Apartment numbers must be positive integers between 1 and {domain.get_max_apart_nr()}!")
@@ -349,27 +390,32 @@ def remove_all_expenses_from_apartment(apartments, apartment_nr):
     apartment = find_apartment_by_nr(apartments, apartment_nr)
 
     if apartment is not None:
+        if domain.get_apart_total_exp(apartment) != 0:
+            record_change(changes, apartment)
         domain.set_all_expenses(apartment, 0)
 
     else:
         raise ValueError(f"Apartment {apartment_nr} is not occupied. All of its expenses are already 0.")
 
 
-def remove_all_type_expenses(apartments, expense_type):
+def remove_all_type_expenses(apartments, expense_type, changes=None):
     """
     Removes all <expense_type> type expenses from all apartments
 
     :param apartments: The list of apartments; list of dictionaries
     :param expense_type: The type of expense we want to remove from all apartments
+    :param changes: The changes of the current command, see create_changes(); None if they are not recorded
     """
     check_available_expense(expense_type)  # Checks to see if the expense is available
     check_not_total(expense_type)
 
     for apartment in apartments:
-        domain.set_any_expense(apartment, expense_type, 0)
+        if domain.get_any_expense(apartment, expense_type) != 0:
+            record_change(changes, apartment)
+            domain.set_any_expense(apartment, expense_type, 0)
 
 
-def replace_expense(apartments, apart_nr, expense_type, expense_amount):
+def replace_expense(apartments, apart_nr, expense_type, expense_amount, changes=None):
     """
     Replaces the expense for the <expense_type> expense of the <apart_nr> apartment with a new expense value.
 
@@ -377,6 +423,7 @@ def replace_expense(apartments, apart_nr, expense_type, expense_amount):
     :param apart_nr: The number of the apartment whose expense we want to change
     :param expense_type: The expense type we want to replace
     :param expense_amount: The new value to give to the expense
+    :param changes: The changes of the current command, see create_changes(); None if they are not recorded
 
     :raise ValueError: if trying to replace expense of unoccupied apartment; if expense amount negative; if
     apartment number negative or greater than the maximum accepted apartment number 'max_apart'
@@ -395,7 +442,9 @@ def replace_expense(apartments, apart_nr, expense_type, expense_amount):
     check_available_expense(expense_type)
     check_not_total(expense_type)
 
-    domain.set_any_expense(apartment, expense_type, expense_amount)
+    if domain.get_any_expense(apartment, expense_type) != expense_amount:
+        record_change(changes, apartment)
+        domain.set_any_expense(apartment, expense_type, expense_amount)
     return "Changed apartment's {} {} expense to {}".format(apart_nr, expense_type, expense_amount)
 
 
@@ -541,13 +590,14 @@ def get_totals_with_condition(apartments, comparison_sign, expense_amount):
     return sorted_filtered_apartments
 
 
-def filter_by_expense_type(apartments, expense_type):
+def filter_by_expense_type(apartments, expense_type, changes=None):
     """
     Removes all expenses from all apartments, with the exception of the expense type given by the argument
     <expense_type>. This function has a filtering effect.
 
     :param apartments: The list of apartments; list of dictionaries
     :param expense_type: The expense type that dictates which expenses are to be kept; string
+    :param changes: The changes of the current command, see create_changes(); None if they are not recorded
     """
     check_available_expense(expense_type)
 
@@ -556,16 +606,17 @@ def filter_by_expense_type(apartments, expense_type):
     expenses_to_remove = [expense for expense in available_expenses if expense != expense_type]
 
     for expense_type in expenses_to_remove:
-        remove_all_type_expenses(apartments, expense_type)
+        remove_all_type_expenses(apartments, expense_type, changes)
 
 
-def filter_by_value(apartments, value):
+def filter_by_value(apartments, value, changes=None):
     """
     Removes all expenses which have a value greater than or equal to <value>.
     This function has a filtering effect.
 
     :param apartments: The list of apartments; list of dictionaries
     :param value: The value against which the function compares the expenses; positive integer
+    :param changes: The changes of the current command, see create_changes(); None if they are not recorded
     :return: -
     :raise ValueError: if <value> given by user is negative
     """
@@ -575,48 +626,59 @@ def filter_by_value(apartments, value):
 
     for apartment in apartments:
         for expense_type in available_expenses:
-            if domain.get_any_expense(apartment, expense_type) >= value:
+            expense = domain.get_any_expense(apartment, expense_type)
+            if expense >= value and expense != 0:
+                record_change(changes, apartment)
                 domain.set_any_expense(apartment, expense_type, 0)
 
 
-def check_state_change(apartments, states, current_state):
+def check_state_change(states, changes):
     """
-    Checks if the state of the data has changed. If the state has changed, the previous state will be added
-    in the list of states, so that we have access to this previous state in the future, if we will ever need it.
-    The last state will be returned, regardless of whether or not the state has changed
+    Checks if the last command has changed the state of the data. If it has, its changes will be added in the
+    list of states, so that we can restore the previous state in the future, if we will ever need it.
+    The changes are recorded by the functions which modify the apartments (see create_changes()), so only the
+    apartments changed by the command are copied, not the whole list of apartments.
 
-    :param apartments: The list of apartments; list of dictionaries
-    :param states: The list of states throughout the program's life; list of lists of dictionaries
-    :param current_state: The current state of the data, has to be aligned with <apartments>; list of dictionaries
-    :return: The last state; list of dictionaries
+    :param states: The changes of the commands throughout the program's life; list of dictionaries
+    :param changes: The changes of the last command; dictionary
+    :return: True if the state has changed; False otherwise
     """
 
-    if apartments != current_state:
-        states.append(current_state)
-        current_state = deepcopy(apartments)
+    if len(changes['apartments']) == 0:
+        return False
 
-    return current_state
+    states.append(changes)
+    return True
 
 
-# noinspection PyUnusedLocal
-def undo(apartments, states, current_state):
+def undo(apartments, states):
     """
-    Restores the state of the data to its form before the last command. If there is no last command, this function
-    does nothing.
+    Restores the state of the data to its form before the last command, restoring only the apartments which
+    the command changed (see create_changes()). If there is no last command, an error is raised.
 
-    :param apartments: The list of apartments; list of dictionaries
-    :param states: The previous states of the data, which have been saved through the lifetime of the program;
-    the datatype of <states> is list of lists of dictionaries
-    :param current_state: The current state of the data before the previous command; this parameter is a helper in
-    recording the state changes during the program's execution. It has to be changed during the undo()
-    function in order to be aligned with the <apartments> parameter; list of dictionaries
-    :return:
+    :param apartments: The list of apartments, which is modified in place; list of dictionaries
+    :param states: The changes of the commands, which have been saved through the lifetime of the program;
+    the datatype of <states> is list of dictionaries
+    :return: The list of apartments; list of dictionaries
+    :raise ValueError: if there is no command to undo
     """
 
     if len(states) == 0:
         raise ValueError("You cannot use the undo command anymore!\n"
                          "The program has the state it had at the beginning.")
 
-    apartments = states.pop()
-    current_state = deepcopy(apartments)
-    return apartments, current_state
+    changes = states.pop()
+    # The occupied and cleared apartments are removed and put back in reverse order, so every apartment goes back
+    # to the position it had (an occupied apartment was the last one)
+    for position, apartment in reversed(changes['moves']):
+        if position is None:
+            apartments.pop()
+        else:
+            apartments.insert(position, apartment)
+
+    for apartment, previous_apartment in changes['apartments'].values():
+        if previous_apartment is not None:
+            apartment.clear()
+            apartment.update(previous_apartment)
+
+    return apartments
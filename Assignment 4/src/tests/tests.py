@@ -407,54 +407,57 @@ def test_filter_by_value():
 
 def test_check_state_change():
     apartments = set_up_test()
-    current_state = deepcopy(apartments)
     states = []
 
-    fns.add_expense(apartments, 1, 'water', 100)
-
-    current_state = fns.check_state_change(apartments, states, current_state)
+    changes = fns.create_changes()
+    fns.add_expense(apartments, 1, 'water', 100, changes=changes)
+    assert fns.check_state_change(states, changes) is True
     assert len(states) == 1
+    assert list(changes['apartments'].keys()) == [1]
 
-    fns.add_expense(apartments, 2, 'gas', 200)
-    current_state = fns.check_state_change(apartments, states, current_state)
+    previous_gas = domain.get_any_expense(fns.find_apartment_by_nr(apartments, 2), 'gas')
+    changes = fns.create_changes()
+    fns.add_expense(apartments, 2, 'gas', 200, changes=changes)
+    fns.add_expense(apartments, 2, 'gas', 50, changes=changes)
+    assert fns.check_state_change(states, changes) is True
     assert len(states) == 2
+    # Only the state before the first change of the apartment is recorded
+    assert domain.get_any_expense(changes['apartments'][2][1], 'gas') == previous_gas
 
-    fns.replace_expense(apartments, 3, 'gas', 150)
-    current_state = fns.check_state_change(apartments, states, current_state)
-    assert len(states) == 3
-
-    assert current_state == apartments
+    # A command which does not change anything is not recorded
+    changes = fns.create_changes()
+    fns.filter_by_value(apartments, 100000, changes)
+    assert fns.check_state_change(states, changes) is False
+    assert len(states) == 2
 
 
 def test_undo():
     apartments = set_up_test()
-    current_state = deepcopy(apartments)
     states = []
 
     initial_state = deepcopy(apartments)
 
-    fns.add_expense(apartments, 1, 'water', 50)
-    current_state = fns.check_state_change(apartments, states, current_state)
-    state_after_change1 = deepcopy(current_state)
-
-    fns.add_expense(apartments, 2, 'gas', 200)
-    current_state = fns.check_state_change(apartments, states, current_state)
-    state_after_change2 = deepcopy(current_state)
-
-    fns.replace_expense(apartments, 3, 'gas', 150)
-    current_state = fns.check_state_change(apartments, states, current_state)
+    changes = fns.create_changes()
+    fns.add_expense(apartments, 1, 'water', 50, changes=changes)
+    fns.check_state_change(states, changes)
+    state_after_change1 = deepcopy(apartments)
 
-    apartments, current_state = fns.undo(apartments, states, current_state)
-    assert apartments == current_state == state_after_change2
+    changes = fns.create_changes()
+    fns.clear_range_of_apartments(apartments, 2, 3, changes)
+    fns.occupy_new_apartment(apartments, 150, changes)
+    fns.check_state_change(states, changes)
+    state_after_change2 = deepcopy(apartments)
 
-    apartments, current_state = fns.undo(apartments, states, current_state)
-    assert apartments == current_state == state_after_change1
+    changes = fns.create_changes()
+    fns.filter_by_expense_type(apartments, 'gas', changes)
+    fns.check_state_change(states, changes)
 
-    apartments, current_state = fns.undo(apartments, states, current_state)
-    assert apartments == current_state == initial_state
+    assert fns.undo(apartments, states) == state_after_change2
+    assert fns.undo(apartments, states) == state_after_change1
+    assert fns.undo(apartments, states) == initial_state
 
     try:
-        fns.undo(apartments, states, current_state)
+        fns.undo(apartments, states)
         assert False
     except ValueError:
         assert True
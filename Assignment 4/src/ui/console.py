@@ -3,8 +3,6 @@ The User Interface module. All print and input functions are handled here.
 These functions call functions from the domain and functions module.
 """
 
-from copy import deepcopy
-
 import src.functions.functions as fns
 from src.domain.entity import get_apart_nr, get_available_expenses
 
@@ -42,18 +40,19 @@ def ui_print_all_options():
           "* - Added in Assignment 4")
 
 
-def ui_occupy_apartment(apartments, apart_nr):
+def ui_occupy_apartment(apartments, apart_nr, changes=None):
     """
     Occupies an apartment (if it is not already occupied) and initialises its expenses (by default to 0)
 
     :param apartments: The current list of apartments; list of dictionaries
     :param apart_nr: The number of the apartment that the client wants to occupy; positive integer
+    :param changes: The changes of the current command, see fns.create_changes(); None if they are not recorded
     """
-    fns.occupy_new_apartment(apartments, apart_nr)  # raises ValueError if 'apart_nr' occupied
+    fns.occupy_new_apartment(apartments, apart_nr, changes)  # raises ValueError if 'apart_nr' occupied
     print("Apartment number {} is now occupied. All of this apartment's expenses have been set at 0.".format(apart_nr))
 
 
-def ui_clear_apartment(apartments, apart_nr):
+def ui_clear_apartment(apartments, apart_nr, changes=None):
     """
     Clears an apartment (if it is occupied). If this command is applied, the apartment will be removed from
     the list of apartments. Note: This is different than the 'remove' command applied on an apartment, as that
@@ -61,20 +60,22 @@ def ui_clear_apartment(apartments, apart_nr):
 
     :param apartments: The list of apartments; list of dictionaries
     :param apart_nr: The number of the apartment which we want to remove; positive integer
+    :param changes: The changes of the current command, see fns.create_changes(); None if they are not recorded
     """
-    fns.clear_apartment(apartments, apart_nr)
+    fns.clear_apartment(apartments, apart_nr, changes)
     print(f"Apartment {apart_nr} has been removed from the list of apartments!")
 
 
-def ui_clear_range_of_apartments(apartments, start_apart_nr, end_apart_nr):
+def ui_clear_range_of_apartments(apartments, start_apart_nr, end_apart_nr, changes=None):
     """
     Clears a range of apartments (or at least the apartments that are occupied from the given range)
 
     :param apartments: The list of apartments; list of dictionaries
     :param start_apart_nr: The lower bound of the range of apartments to be cleared; positive integer
     :param end_apart_nr: The upper bound of the range of apartments to be cleared; positive integer
+    :param changes: The changes of the current command, see fns.create_changes(); None if they are not recorded
     """
-    fns.clear_range_of_apartments(apartments, start_apart_nr, end_apart_nr)
+    fns.clear_range_of_apartments(apartments, start_apart_nr, end_apart_nr, changes)
     print(f"All apartments from apartment {start_apart_nr} to apartment {end_apart_nr} have been cleared.")
 
 
@@ -114,23 +115,25 @@ def ui_print_prompt(msg):
             print(str(type(err)) + ": Please answer with Y(yes) or N(no).")
 
 
-def ui_add_expense(apartments, args):
+def ui_add_expense(apartments, args, changes=None):
     """
     Adds a new expense to an apartment
 
     :param apartments: The list of apartments; list of dictionaries
     :param args: Arguments for the 'add' command in the format [<apartment_nr>, <exp_type>, <exp_amount>]; list
+    :param changes: The changes of the current command, see fns.create_changes(); None if they are not recorded
     """
 
     apart_nr, expense_type, expense_amount = args
     try:
-        fns.add_expense(apartments, apart_nr, expense_type, expense_amount)
+        fns.add_expense(apartments, apart_nr, expense_type, expense_amount, changes=changes)
 
     except ValueError as ve:
         if str(ve) == "This apartment is not occupied.":
             user_answer = ui_add_expense_prompt()
             if user_answer:
-                fns.add_expense(apartments, apart_nr, expense_type, expense_amount, talked_to_user=True)
+                fns.add_expense(apartments, apart_nr, expense_type, expense_amount, talked_to_user=True,
+                                changes=changes)
                 print(f"Apartment number {apart_nr} is now occupied and an expense of {expense_amount} has been added "
                       f"to its {expense_type} expense.")
             else:
@@ -164,7 +167,7 @@ def ui_clear_apartment_prompt():
     return ui_print_prompt(msg)
 
 
-def ui_remove_expense(apartments, args):
+def ui_remove_expense(apartments, args, changes=None):
     """
     Removes expenses. What this function can do: remove all expenses for an apartment, remove all expenses for
     a range of apartments, or remove all expenses of a certain type for all apartments
@@ -172,45 +175,47 @@ def ui_remove_expense(apartments, args):
     :param apartments: The list of apartments; list of dictionaries
     :param args: The arguments of the 'remove' command in one of the accepted formats ([<apartment>],
     [<start_apartment>, <end_apartment>], or [<type>]); list of integers or list of a string
+    :param changes: The changes of the current command, see fns.create_changes(); None if they are not recorded
 
     :raise ValueError: if apartment numbers given are not in the range [0, <max_apartment_number>]
     :raise TypeError: if too many/too few arguments are provided
     """
     if len(args) == 2:
         start, end = args
-        start, end = fns.remove_all_from_to(apartments, start, end)
+        start, end = fns.remove_all_from_to(apartments, start, end, changes)
         print(f"All expenses from all apartments from apartment {start} to apartment {end} have been removed.")
         if ui_clear_apartment_prompt():
-            ui_clear_range_of_apartments(apartments, start, end)
+            ui_clear_range_of_apartments(apartments, start, end, changes)
         else:
             print("The apartments weren't removed from the list of apartments.")
 
     elif len(args) == 1 and isinstance(args[0], int):
-        fns.remove_all_expenses_from_apartment(apartments, args[0])
+        fns.remove_all_expenses_from_apartment(apartments, args[0], changes)
         print(f"All expenses from apartment {args[0]} have been removed.")
         if ui_clear_apartment_prompt():
-            ui_clear_apartment(apartments, args[0])
+            ui_clear_apartment(apartments, args[0], changes)
         else:
             print("The apartment wasn't removed from the list of apartments.")
 
     elif len(args) == 1 and isinstance(args[0], str):
-        fns.remove_all_type_expenses(apartments, args[0])
+        fns.remove_all_type_expenses(apartments, args[0], changes)
         print(f"All {args[0]} expense types from all apartments have been removed.")
 
     else:
         raise TypeError("The 'remove' command can accept one or two arguments!")
 
 
-def ui_replace_expense(apartments, args):
+def ui_replace_expense(apartments, args, changes=None):
     """
     Replaces the expense of a certain apartment (for a given <expense_type>) with a new expense
 
     :param apartments: The list of apartments; list of dictionaries
     :param args: The arguments (given by the user) for the 'remove' command; list
+    :param changes: The changes of the current command, see fns.create_changes(); None if they are not recorded
     """
 
     apart_nr, expense_type, expense_amount = args
-    replace_msg = fns.replace_expense(apartments, apart_nr, expense_type, expense_amount)
+    replace_msg = fns.replace_expense(apartments, apart_nr, expense_type, expense_amount, changes)
     print(replace_msg)
 
 
@@ -354,31 +359,33 @@ def ui_max_apartment_expense(apartments, apart_nr):
           f"with {maximum_expense_value} RON.")
 
 
-def ui_filter_by_expense_type(apartments, expense_type):
+def ui_filter_by_expense_type(apartments, expense_type, changes=None):
     """
     Removes all expenses from all apartments except the expense type given by the argument <expense_type>.
 
     :param apartments: The list of apartments; list of dictionaries
     :param expense_type: The expense type which we want to keep. All other expenses will be removed,
     for all apartments
+    :param changes: The changes of the current command, see fns.create_changes(); None if they are not recorded
     """
-    fns.filter_by_expense_type(apartments, expense_type)
+    fns.filter_by_expense_type(apartments, expense_type, changes)
     print(f"All expenses except the expense '{expense_type}' have been removed from all apartments.")
 
 
-def ui_filter_by_value(apartments, value):
+def ui_filter_by_value(apartments, value, changes=None):
     """
     Filters the expenses, removing all expenses having a value greater than or equal to <value>. Thus, only the
     expenses having an expense value smaller than <value> will be kept.
 
     :param apartments: The list of apartments; list of dictionaries
     :param value: The value against which the expenses will be filtered
+    :param changes: The changes of the current command, see fns.create_changes(); None if they are not recorded
     """
-    fns.filter_by_value(apartments, value)
+    fns.filter_by_value(apartments, value, changes)
     print(f"All expenses that are greater than or equal to {value} have been removed.")
 
 
-def ui_filter(apartments, argument):
+def ui_filter(apartments, argument, changes=None):
     """
     Handles the filtering functions. If the argument is an expense type (so a string), this function will call
     the function responsible for filtering by expense type, and all expenses except this expense type will be
@@ -387,36 +394,32 @@ def ui_filter(apartments, argument):
 
     :param apartments: The list of apartments; list of dictionaries
     :param argument: The argument of the filter function; either an integer or a string
+    :param changes: The changes of the current command, see fns.create_changes(); None if they are not recorded
     """
     if isinstance(argument, str):
-        ui_filter_by_expense_type(apartments, argument)
+        ui_filter_by_expense_type(apartments, argument, changes)
     elif isinstance(argument, int):
-        ui_filter_by_value(apartments, argument)
+        ui_filter_by_value(apartments, argument, changes)
     else:
         raise ValueError("The filter function expects either a string or a positive integer as parameters.")
 
 
-def ui_undo(apartments, states, current_state, commands_through_time):
+def ui_undo(apartments, states, commands_through_time):
     """
     Restores the program to its state before the last performed command. If the program is already at the
     initial state, nothing happens.
 
-    :param apartments: The list of apartments; list of dictionaries
-    :param states: The list of the states of data throughout the program's lifetime. The datatype of this
-    variable is list of lists of dictionaries
-    :param current_state: The current state. This variable also has to be changed during every undo such that it
-    is aligned with the apartments variable (this necessary alignment stems from the fact that this variable
-    is used in detecting when changes in the data have been performed, so that we can keep track of previous states);
-    The datatype of <current_state> is list of dictionaries
+    :param apartments: The list of apartments, which is restored in place; list of dictionaries
+    :param states: The changes of the commands throughout the program's lifetime (see fns.create_changes()).
+    The datatype of this variable is list of dictionaries
     :param commands_through_time: The commands that were given by the user and in one way or another modified the
     state of the program's data. List of strings
     """
-    apartments, current_state = fns.undo(apartments, states, current_state)
+    fns.undo(apartments, states)
     last_command = commands_through_time.pop()
     print("Your last performed command:")
     print("\t'" + last_command + "'")
     print("Was undone.")
-    return apartments, current_state
 
 
 def helper_run_menu_cmd(apartments, commands, cmd, args):
@@ -462,14 +465,15 @@ def run_menu_cmd():
 
     # We need a list that will keep track of all of our states throughout the program's life, so we can undo.
     # Everytime we perform an operation that modifies data in our program (so commands like 'add', 'remove',
-    # 'replace', or 'filter') we need to store the state of the data before the operation, so in case we want
-    # to restore the previous state, we can do it.
+    # 'replace', or 'filter') we need to store the state of the apartments it changed before the operation,
+    # so in case we want to restore the previous state, we can do it.
 
+    modifying_commands = ['add', 'remove', 'replace', 'occupy', 'clear', 'filter']
     states = []
     commands_through_time = []
-    current_state = deepcopy(apartments)
 
     while True:
+        changes = fns.create_changes()
         try:
             cmd_line = input("Please enter your command\n"
                              "(Enter 'info' if you want to see all available commands)\n")
@@ -486,7 +490,10 @@ def run_menu_cmd():
                 return
 
             elif cmd == 'undo':
-                apartments, current_state = ui_undo(apartments, states, current_state, commands_through_time)
+                ui_undo(apartments, states, commands_through_time)
+
+            elif cmd in modifying_commands:
+                commands[cmd](*args, changes)
 
             elif cmd in commands.keys():
                 commands[cmd](*args)
@@ -500,9 +507,8 @@ def run_menu_cmd():
         except KeyError as ke:
             print(str(ke)[1:-1])
 
-        else:
-            if cmd in ['add', 'remove', 'replace', 'occupy', 'clear', 'filter']:
-                commands_through_time.append(cmd_line)
-                current_state = fns.check_state_change(apartments, states, current_state)
+        # A command which failed after changing some apartments can also be undone
+        if fns.check_state_change(states, changes):
+            commands_through_time.append(cmd_line)
 
         print()
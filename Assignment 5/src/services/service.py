@@ -3,7 +3,6 @@
     program must have.
 """
 
-import copy
 import random
 
 from src.domain.entity import ComplexNumber
@@ -28,6 +27,10 @@ class ListService:
         self.__entities = []
         self.__add_validator = add_validator
         self.__filter_validator = filter_validator
+        # The inverse deltas of the operations, from the oldest to the newest: ('add',) for an added number
+        # (undone by removing the last number) and ('filter', prefix, suffix) for a filter (undone by putting back
+        # the numbers it removed from the start and from the end of the list). The numbers are never changed in
+        # place, so the deltas share them with the list instead of copying them
         self.__history = []
 
     def __len__(self):
@@ -71,8 +74,8 @@ class ListService:
         """
         Method used for the adding process. Accepts a real and integer part, creates the new complex number to be
         added to the list, validates it, and if the validation process is successful the new complex number
-        will be added to the list. Also, if the adding process is successful, a copy of the previous state
-        of the list will be saved.
+        will be added to the list. Also, if the adding process is successful, its inverse (removing the last
+        number) will be saved in the history, in O(1).
 
         :param real: The real part of the new complex number; integer
         :param imag: The imaginary part of the new complex number; integer
@@ -82,9 +85,7 @@ class ListService:
         new_number = ComplexNumber(real, imag)
         self.__add_validator.validate(self, new_number, )
 
-        old_list = copy.deepcopy(self.__entities)
-        self.__history.append(old_list)
-
+        self.__history.append(('add',))
         self.__entities.append(new_number)
         return new_number
 
@@ -133,7 +134,8 @@ class ListService:
         Method used for the filtering process. This method accepts two indices <start> and <end>, runs them through
         the filtering validator, and if the validator is successful the list of complex numbers is sliced such
         that it will only contain the numbers between the indices <start> and <end> (including the numbers
-        at the indices <start> and <end>). Also, if successful, a copy of the list is saved in history states.
+        at the indices <start> and <end>). Also, if successful, the numbers removed from the start and from the
+        end of the list are saved in the history (so the memory used is proportional to the numbers removed).
 
         :param start: The starting index of the filter
         :param end: The ending index of the filter
@@ -142,16 +144,17 @@ class ListService:
 
         start, end = self.__filter_validator.validate(self, start, end)
 
-        old_list = copy.deepcopy(self.__entities)
-        self.__history.append(old_list)
+        start, end, _ = slice(start, end).indices(len(self.__entities))
+        end = max(start, end)
+        self.__history.append(('filter', self.__entities[:start], self.__entities[end:]))
 
-        keep_indices = slice(start, end)
-        self.__entities = self.__entities[keep_indices]
+        del self.__entities[end:]
+        del self.__entities[:start]
 
     def undo(self):
         """
         Method for the undo process. 'Reverses' the last operation that modified the state of the data in the
-        list.
+        list, by applying the inverse delta saved for it.
 
         :raise: ValueError if the list is at the initial state, so undo is not possible anymore.
         """
@@ -160,4 +163,10 @@ class ListService:
             raise ValueError("Cannot undo anymore.\n"
                              "The list of numbers has the initial state.")
 
-        self.__entities = self.__history.pop()
+        delta = self.__history.pop()
+        if delta[0] == 'add':
+            self.__entities.pop()
+        else:
+            _, prefix, suffix = delta
+            self.__entities[:0] = prefix
+            self.__entities.extend(suffix)
@@ -222,6 +222,7 @@ def test_list_service_undo():
     service = ListService(add_validator, filter_validator)
     service.fill_list()  # Now the list has 10 random complex numbers
     assert len(service) == 10
+    initial_numbers = list(service)
 
     service.add_number(2, 2)
     assert len(service) == 11
@@ -230,8 +231,21 @@ def test_list_service_undo():
 
     service.filter(2, 6)
     assert len(service) == 5
+    assert list(service) == initial_numbers[1:6]
     service.undo()
     assert len(service) == 10
+    assert list(service) == initial_numbers
+
+    # Several operations are undone in reverse order
+    service.filter(3, 9)
+    service.add_number(300, 300)
+    service.filter(2, 8)
+    assert list(service) == initial_numbers[3:9] + [ComplexNumber(300, 300)]
+    service.undo()
+    service.undo()
+    assert list(service) == initial_numbers[2:9]
+    service.undo()
+    assert list(service) == initial_numbers
 
     try:
         service.undo()